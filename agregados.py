@@ -0,0 +1,340 @@
+"""
+Agregados de sentimento por (canal, vídeo, dia, modelo, rótulo) em SQLite.
+
+Cada análise concluída (dashboard ou lote) soma aqui a contagem de comentários e
+a soma dos scores (compound do VADER, estrelas do BERT). As consultas de
+tendência leem só essas linhas, sem reabrir os CSVs/Parquet de cada execução,
+então o tempo não depende do volume de comentários brutos.
+
+O dia é o da publicação do comentário (UTC). Comentários já agregados são
+reconhecidos por uma impressão digital (vídeo, autor, data e texto) e não
+contam duas vezes quando o mesmo vídeo é analisado de novo; vale o rótulo da
+primeira análise.
+
+Uso pela linha de comando:
+    python agregados.py tendencia UCxxxx --modelo bert --dias 90
+    python agregados.py importar-parquet          # carrega o histórico em data/parquet
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Banco com os agregados (compartilhado entre o dashboard e a CLI)
+ARQUIVO_AGREGADOS = os.getenv("YT_AGREGADOS", os.path.join("data", "agregados.sqlite"))
+
+# Modelo -> (coluna do rótulo, coluna do score) no DataFrame analisado
+MODELOS_AGREGADOS = {
+    "vader": ("vader_label", "vader_compound"),
+    "bert": ("bert_label", "bert_estrelas"),
+}
+
+ROTULOS = ("positivo", "neutro", "negativo")
+
+CHAVE_AGREGADO = ["canal_id", "video_id", "dia", "modelo", "rotulo"]
+
+
+def impressao_comentario(df: pd.DataFrame) -> pd.Series:
+    """Identificador estável de cada comentário (o comment_id não chega às análises)."""
+    partes = [
+        df[c].astype(str).fillna("") if c in df.columns else pd.Series("", index=df.index)
+        for c in ("video_id", "author", "published_at", "comment")
+    ]
+    juntos = partes[0].str.cat(partes[1:], sep="\x1f")
+    return juntos.map(lambda t: hashlib.sha1(t.encode("utf-8")).hexdigest()[:20])
+
+
+# ============================================================
+#   ARMAZÉM DE AGREGADOS (SQLite)
+# ============================================================
+class AgregadosSentimento:
+    """
+    Contagens e somas de score por (canal_id, video_id, dia, modelo, rotulo).
+
+    registrar() agrega o DataFrame em memória e faz um upsert por grupo numa única
+    transação; com vários processos (dashboard e lote) o SQLite em WAL serializa
+    as escritas.
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_AGREGADOS):
+        self.caminho = caminho
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS agregados (
+                    canal_id TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    dia TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    rotulo TEXT NOT NULL,
+                    comentarios INTEGER NOT NULL,
+                    soma_score REAL NOT NULL,
+                    n_score INTEGER NOT NULL,
+                    PRIMARY KEY (canal_id, video_id, dia, modelo, rotulo)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_agregados_canal_dia
+                    ON agregados (canal_id, modelo, dia);
+                CREATE TABLE IF NOT EXISTS comentarios_agregados (
+                    impressao TEXT PRIMARY KEY
+                ) WITHOUT ROWID;
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    # --------------------------------------------------------
+    #   Escrita
+    # --------------------------------------------------------
+    def registrar(self, df: pd.DataFrame, canal_id: str) -> int:
+        """
+        Soma as linhas analisadas de um canal aos agregados. Comentários já
+        agregados antes são ignorados. Devolve quantos comentários entraram.
+        """
+        modelos = {m: cols for m, cols in MODELOS_AGREGADOS.items() if cols[0] in df.columns}
+        if df.empty or not modelos:
+            return 0
+
+        base = pd.DataFrame(
+            {
+                "impressao": impressao_comentario(df).to_numpy(),
+                "video_id": df["video_id"].astype(str).to_numpy() if "video_id" in df.columns else "",
+                "dia": _dia_publicacao(df).to_numpy(),
+            }
+        )
+        for modelo, (col_rotulo, col_score) in modelos.items():
+            rotulos = df[col_rotulo].astype(str)
+            if modelo == "bert" and "modelo_label" in df.columns:
+                # Modo roteado: o BERT só rotulou as linhas encaminhadas a ele
+                rotulos = rotulos.where(df["modelo_label"] == "bert", "")
+            base[f"{modelo}_rotulo"] = rotulos.to_numpy()
+            base[f"{modelo}_score"] = (
+                pd.to_numeric(df[col_score], errors="coerce").to_numpy() if col_score in df.columns else float("nan")
+            )
+        base = base.drop_duplicates("impressao")
+
+        with self._lock:
+            conn = self._conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existentes = self._ja_agregados(conn, base["impressao"].tolist())
+                if existentes:
+                    base = base[~base["impressao"].isin(existentes)]
+                conn.executemany(
+                    "INSERT INTO comentarios_agregados (impressao) VALUES (?)",
+                    ((i,) for i in base["impressao"]),
+                )
+                linhas = self._linhas_agregadas(base, canal_id, modelos)
+                conn.executemany(
+                    "INSERT INTO agregados "
+                    "(canal_id, video_id, dia, modelo, rotulo, comentarios, soma_score, n_score) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (canal_id, video_id, dia, modelo, rotulo) DO UPDATE SET "
+                    "comentarios = comentarios + excluded.comentarios, "
+                    "soma_score = soma_score + excluded.soma_score, "
+                    "n_score = n_score + excluded.n_score",
+                    linhas,
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(base)
+
+    @staticmethod
+    def _ja_agregados(conn: sqlite3.Connection, impressoes: List[str], bloco: int = 500) -> set:
+        existentes: set = set()
+        for i in range(0, len(impressoes), bloco):
+            parte = impressoes[i : i + bloco]
+            existentes.update(
+                r[0]
+                for r in conn.execute(
+                    f"SELECT impressao FROM comentarios_agregados WHERE impressao IN ({','.join('?' * len(parte))})",
+                    parte,
+                )
+            )
+        return existentes
+
+    @staticmethod
+    def _linhas_agregadas(base: pd.DataFrame, canal_id: str, modelos: Dict) -> List[tuple]:
+        linhas: List[tuple] = []
+        for modelo in modelos:
+            rotuladas = base[base[f"{modelo}_rotulo"] != ""]
+            grupos = rotuladas.groupby(["video_id", "dia", f"{modelo}_rotulo"], sort=False).agg(
+                comentarios=("impressao", "size"),
+                soma_score=(f"{modelo}_score", "sum"),
+                n_score=(f"{modelo}_score", "count"),
+            )
+            for video_id, dia, rotulo, comentarios, soma, n in grupos.reset_index().itertuples(index=False):
+                linhas.append((canal_id, video_id, dia, modelo, rotulo, int(comentarios), float(soma), int(n)))
+        return linhas
+
+    # --------------------------------------------------------
+    #   Consultas
+    # --------------------------------------------------------
+    def consultar(
+        self,
+        canal_id: Optional[str] = None,
+        modelo: Optional[str] = None,
+        video_id: Optional[str] = None,
+        desde: Optional[str] = None,
+        ate: Optional[str] = None,
+        por: Tuple[str, ...] = ("dia", "rotulo"),
+    ) -> pd.DataFrame:
+        """
+        Soma os agregados que atendem aos filtros, agrupando pelas colunas 'por'
+        (qualquer subconjunto de canal_id, video_id, dia, modelo, rotulo).
+        desde/ate são dias AAAA-MM-DD (inclusive).
+        """
+        invalidas = set(por) - set(CHAVE_AGREGADO)
+        if invalidas:
+            raise ValueError(f"Colunas de agrupamento inválidas: {sorted(invalidas)}")
+        condicoes, params = [], []
+        for coluna, operador, valor in (
+            ("canal_id", "=", canal_id),
+            ("modelo", "=", modelo),
+            ("video_id", "=", video_id),
+            ("dia", ">=", desde),
+            ("dia", "<=", ate),
+        ):
+            if valor is not None:
+                condicoes.append(f"{coluna} {operador} ?")
+                params.append(valor)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        grupo = ", ".join(por)
+        sql = (
+            f"SELECT {grupo + ', ' if por else ''}SUM(comentarios), SUM(soma_score), SUM(n_score) "
+            f"FROM agregados {where}" + (f" GROUP BY {grupo} ORDER BY {grupo}" if por else "")
+        )
+        with self._lock:
+            linhas = self._conexao().execute(sql, params).fetchall()
+        df = pd.DataFrame(linhas, columns=[*por, "comentarios", "soma_score", "n_score"])
+        df = df[df["comentarios"].notna()]
+        df["score_medio"] = (df["soma_score"] / df["n_score"]).where(df["n_score"] > 0)
+        return df.reset_index(drop=True)
+
+    def tendencia(
+        self,
+        canal_id: str,
+        modelo: str = "bert",
+        dias: int = 90,
+        video_id: Optional[str] = None,
+        ate: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Uma linha por dia com comentários nos últimos 'dias' dias (até 'ate', padrão
+        hoje): contagem e percentual por rótulo, total e score médio do modelo.
+        """
+        fim = ate or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        inicio = (datetime.strptime(fim, "%Y-%m-%d") - timedelta(days=dias - 1)).strftime("%Y-%m-%d")
+        longo = self.consultar(canal_id, modelo, video_id, desde=inicio, ate=fim)
+        if longo.empty:
+            colunas = ["dia", *ROTULOS, "total", *(f"pct_{r}" for r in ROTULOS), "score_medio"]
+            return pd.DataFrame(columns=colunas)
+
+        largo = longo.pivot_table(index="dia", columns="rotulo", values="comentarios", aggfunc="sum", fill_value=0)
+        for rotulo in ROTULOS:
+            if rotulo not in largo.columns:
+                largo[rotulo] = 0
+        largo["total"] = largo.sum(axis=1)
+        for rotulo in ROTULOS:
+            largo[f"pct_{rotulo}"] = largo[rotulo] / largo["total"] * 100
+        scores = longo.groupby("dia")[["soma_score", "n_score"]].sum()
+        largo["score_medio"] = (scores["soma_score"] / scores["n_score"]).where(scores["n_score"] > 0)
+        largo = largo.reset_index()
+        largo.columns.name = None
+        # Rótulos fora dos três principais (ex.: "indefinido") entram só no total
+        return largo[["dia", *ROTULOS, "total", *(f"pct_{r}" for r in ROTULOS), "score_medio"]]
+
+    def canais(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conexao().execute("SELECT DISTINCT canal_id FROM agregados ORDER BY canal_id")]
+
+
+def _dia_publicacao(df: pd.DataFrame) -> pd.Series:
+    """Dia (UTC, AAAA-MM-DD) da publicação de cada comentário; sem data, o dia de hoje."""
+    hoje = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if "published_at" not in df.columns:
+        return pd.Series(hoje, index=df.index)
+    # A API devolve publishedAt em ISO 8601 UTC ("2025-01-31T12:00:00Z"): basta o prefixo
+    dias = df["published_at"].astype(str).str.slice(0, 10)
+    return dias.where(dias.str.fullmatch(r"\d{4}-\d{2}-\d{2}").fillna(False), hoje)
+
+
+_agregados: Optional[AgregadosSentimento] = None
+_agregados_lock = threading.Lock()
+
+
+def obter_agregados() -> AgregadosSentimento:
+    global _agregados
+    if _agregados is None:
+        with _agregados_lock:
+            if _agregados is None:
+                _agregados = AgregadosSentimento()
+    return _agregados
+
+
+# ============================================================
+#   HISTÓRICO EM PARQUET
+# ============================================================
+def importar_parquet(agregados: Optional[AgregadosSentimento] = None) -> int:
+    """
+    Agrega o histórico gravado em Parquet (data/parquet/analises), canal a canal.
+    Pode ser repetido: comentários já agregados são ignorados.
+    """
+    from armazenamento import colunas_parquet, ler_parquet
+
+    agregados = agregados or obter_agregados()
+    colunas = ["canal_id", "video_id", "author", "comment", "published_at", "modelo_label"]
+    for cols in MODELOS_AGREGADOS.values():
+        colunas.extend(cols)
+    # Execuções sem BERT (ou anteriores ao roteamento) não têm todas as colunas
+    existentes = set(colunas_parquet("analises"))
+    if not existentes:
+        return 0
+    df = ler_parquet("analises", colunas=[c for c in colunas if c in existentes])
+    total = 0
+    for canal_id, df_canal in df.groupby("canal_id", sort=False):
+        total += agregados.registrar(df_canal, canal_id)
+    return total
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_tend = sub.add_parser("tendencia", help="sentimento por dia de um canal")
+    p_tend.add_argument("canal_id")
+    p_tend.add_argument("--modelo", choices=sorted(MODELOS_AGREGADOS), default="bert")
+    p_tend.add_argument("--dias", type=int, default=90)
+    p_tend.add_argument("--video", default=None, help="restringe a um vídeo")
+    sub.add_parser("importar-parquet", help="agrega o histórico salvo em Parquet")
+    args = parser.parse_args(argv)
+
+    if args.comando == "importar-parquet":
+        print(f"📥 {importar_parquet()} comentários agregados.")
+        return 0
+
+    tabela = obter_agregados().tendencia(args.canal_id, args.modelo, args.dias, video_id=args.video)
+    if tabela.empty:
+        print("Sem dados agregados para este canal no período.")
+        return 1
+    print(tabela.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,106 @@
+import os
 import re
+import math
+import time
+import platform
+import atexit
+import hashlib
+import heapq
+import multiprocessing
+import threading
 import numpy as np
 import pandas as pd
 import string
-
-# Tentativa de importar VADER
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer  # type: ignore
-    VADER_AVAILABLE = True
-except ImportError:
-    VADER_AVAILABLE = False
-
-# Tentativa de importar BERT (Transformers)
-try:
-    from transformers import pipeline  # type: ignore
-    BERT_AVAILABLE = True
-except ImportError:
-    BERT_AVAILABLE = False
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import chain
+from importlib import metadata
+from importlib.util import find_spec
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import CACHE_DIR, CacheSQLite
+
+# Bibliotecas opcionais: a disponibilidade é verificada sem importá-las (find_spec).
+# VADER, BERT (transformers, que traz o torch) e langdetect só são carregados no
+# primeiro uso, então importar este módulo não paga o custo dos modelos.
+VADER_AVAILABLE = find_spec("vaderSentiment") is not None
+BERT_AVAILABLE = find_spec("transformers") is not None
+LANGDETECT_AVAILABLE = find_spec("langdetect") is not None
+PYARROW_AVAILABLE = find_spec("pyarrow") is not None
+
+# Modelo BERT padrão e parâmetros de inferência (ajustáveis por variável de ambiente)
+MODELO_BERT = "nlptown/bert-base-multilingual-uncased-sentiment"
+BERT_BATCH_SIZE = int(os.getenv("BERT_BATCH_SIZE", 32))
+BERT_MAX_LENGTH = int(os.getenv("BERT_MAX_LENGTH", 512))
+BERT_REVISAO = os.getenv("BERT_REVISAO", "main")
+# Corte prévio em caracteres (max_length * N) antes de tokenizar, para não
+# tokenizar o fim de textos enormes que a truncagem descartaria. É uma
+# aproximação: em texto comum uma wordpiece do mBERT cobre bem menos de 10
+# caracteres, mas há peças mais longas no vocabulário e uma palavra desconhecida
+# longa (URL, sequência sem espaços) vira um único [UNK]. Em textos dominados por
+# essas sequências o corte pode cair antes do token max_length e o modelo lê
+# menos do que leria. 0 desativa o corte (tokenização exata, mais lenta).
+BERT_CARACTERES_POR_TOKEN = int(os.getenv("BERT_CARACTERES_POR_TOKEN", 10))
+# Faixas de comprimento (em tokens) usadas para agrupar os lotes
+BERT_FAIXAS_TOKENS = (16, 32, 64, 128, 256, 512)
+
+# Backend de inferência do BERT: "pytorch" (padrão), "onnx" ou "onnx-int8"
+# (ONNX Runtime via optimum, com quantização dinâmica int8 no último caso)
+BERT_BACKENDS = ("pytorch", "onnx", "onnx-int8")
+BERT_BACKEND = os.getenv("BERT_BACKEND", "pytorch")
+
+# VADER paralelo: nº de processos (0 = todos os núcleos) e tamanho mínimo para paralelizar.
+# O limiar vale por chamada: o lote (executar_lote) acumula comentários até
+# alcançá-lo, enquanto os micro-lotes do painel (pipeline.TAMANHO_LOTE, 200 linhas)
+# ficam abaixo dele e rodam em série, onde o custo de despachar para o pool não compensa.
+VADER_PROCESSOS = int(os.getenv("VADER_PROCESSOS", 0))
+VADER_MIN_PARALELO = int(os.getenv("VADER_MIN_PARALELO", 20_000))
+
+# Detecção de idioma: tamanho mínimo do texto e paralelismo (0 = todos os núcleos)
+IDIOMA_MIN_CARACTERES = int(os.getenv("IDIOMA_MIN_CARACTERES", 10))
+IDIOMA_PROCESSOS = int(os.getenv("IDIOMA_PROCESSOS", 0))
+IDIOMA_MIN_PARALELO = int(os.getenv("IDIOMA_MIN_PARALELO", 5_000))
+
+# Roteamento: VADER decide sozinho nos textos em inglês com |compound| longe dos
+# limiares de ±0.05; os demais (outros idiomas ou casos ambíguos) vão para o BERT
+VADER_LIMIAR = 0.05
+ROTEAMENTO_MARGEM = float(os.getenv("ROTEAMENTO_MARGEM", 0.1))
+ROTEAMENTO_IDIOMAS_VADER = {"en"}
+
+# Cache persistente de scores por (modelo, revisão, hash do texto_limpo)
+USAR_CACHE_SENTIMENTOS = os.getenv("SENTIMENTO_CACHE", "1") == "1"
+MAX_BYTES_CACHE_SENTIMENTOS = int(os.getenv("SENTIMENTO_CACHE_MAX_MB", 64)) * 1024 * 1024
 
 
 # ============================================================
 #   PRÉ-PROCESSAMENTO
 # ============================================================
+# Padrões e tabela de tradução compilados uma única vez
+_RE_URL = re.compile(r"http\S+|www\.\S+")
+_RE_MENCAO = re.compile(r"[@#]\w+")
+_RE_NUMERO = re.compile(r"\d+")
+_RE_ESPACOS = re.compile(r"\s+")
+_TABELA_PONTUACAO = str.maketrans("", "", string.punctuation)
+# Números e pontuação são remoções caractere a caractere, sem contexto: podem ser
+# feitas numa única passada (só precisam vir depois de URLs e menções)
+_RE_NUMERO_PONTUACAO = re.compile(r"[\d" + re.escape(string.punctuation) + r"]+")
+
+# Os mesmos padrões na sintaxe do RE2 (pyarrow.compute), onde \w, \d e \s são só
+# ASCII: as classes Unicode do Python são escritas por extenso. _RE2_ESPACO cobre
+# tudo o que str.isspace() aceita.
+_RE2_ESPACO = r"[\s\x{1c}-\x{1f}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]"
+_RE2_NAO_ESPACO = "[^" + _RE2_ESPACO[1:]
+_RE2_URL = rf"http{_RE2_NAO_ESPACO}+|www\.{_RE2_NAO_ESPACO}+"
+_RE2_MENCAO = r"[@#][\p{L}\p{N}_]+"
+_RE2_NUMERO_PONTUACAO = r"[\p{Nd}" + re.escape(string.punctuation) + r"]+"
+# Caracteres cujo str.lower() depende de contexto ou vira dois caracteres, o que o
+# utf8_lower do Arrow não reproduz (sigma final, I com ponto)
+_RE2_MINUSCULA_ESPECIAL = "[\u03a3\u0130]"
+
+
 def limpar_texto(texto: str) -> str:
     if pd.isna(texto):
         return ""
@@ -28,47 +108,344 @@ def limpar_texto(texto: str) -> str:
     t = str(texto)
 
     # Remove URLs
-    t = re.sub(r"http\S+|www\.\S+", "", t)
+    t = _RE_URL.sub("", t)
 
     # Remove @menções e #hashtags
-    t = re.sub(r"[@#]\w+", "", t)
+    t = _RE_MENCAO.sub("", t)
 
     # Remove números
-    t = re.sub(r"\d+", "", t)
+    t = _RE_NUMERO.sub("", t)
 
     # Remove pontuação
-    t = t.translate(str.maketrans("", "", string.punctuation))
+    t = t.translate(_TABELA_PONTUACAO)
 
     # Espaços extras
-    t = re.sub(r"\s+", " ", t).strip()
+    t = _RE_ESPACOS.sub(" ", t).strip()
 
     return t.lower()
 
 
+def limpar_textos(serie: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de limpar_texto para uma Series inteira, com saída idêntica
+    byte a byte (verificada em tests/test_analise.py). Com o pyarrow, as regex
+    rodam no pyarrow.compute (RE2, em C++) sobre o array inteiro e o resultado
+    sai em dtype string[pyarrow]; números e pontuação saem numa única passada.
+    Sem o pyarrow, cai em _limpar_textos_object.
+    """
+    if not PYARROW_AVAILABLE:
+        return _limpar_textos_object(serie)
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+
+    t = pa.array(serie.where(serie.notna(), "").astype(str), type=pa.string())
+    t = pc.replace_substring_regex(t, _RE2_URL, "")
+    t = pc.replace_substring_regex(t, _RE2_MENCAO, "")
+    t = pc.replace_substring_regex(t, _RE2_NUMERO_PONTUACAO, "")
+    t = pc.utf8_trim(pc.replace_substring_regex(t, _RE2_ESPACO + "+", " "), " ")
+    especiais = pc.match_substring_regex(t, _RE2_MINUSCULA_ESPECIAL).to_numpy(zero_copy_only=False)
+    resultado = pd.Series(pc.utf8_lower(t), index=serie.index, dtype="string[pyarrow]")
+    if especiais.any():
+        # Raros: refeitos com o str.lower() do Python
+        resultado[especiais] = [s.lower() for s in t.filter(pa.array(especiais)).to_pylist()]
+    return resultado
+
+
+def _limpar_textos_object(serie: pd.Series) -> pd.Series:
+    """
+    limpar_textos sem o pyarrow: métodos .str em dtype object, com o módulo 're'
+    do Python (espaços normalizados com split()/join, mesmo critério de '\\s').
+    """
+    t = serie.astype(object).where(serie.notna(), "").map(str).astype(object)
+    t = (
+        t.str.replace(_RE_URL, "", regex=True)
+        .str.replace(_RE_MENCAO, "", regex=True)
+        .str.replace(_RE_NUMERO_PONTUACAO, "", regex=True)
+        .str.split()
+        .str.join(" ")
+        .str.lower()
+    )
+    return t
+
+
 def preprocessar_textos(df: pd.DataFrame) -> pd.DataFrame:
     if "comment" not in df.columns:
         raise ValueError("A coluna 'comment' não existe no DataFrame.")
-    df["texto_limpo"] = df["comment"].apply(limpar_texto)
+    df["texto_limpo"] = limpar_textos(df["comment"])
+    return df
+
+
+# ============================================================
+#   CACHE DE SCORES
+# ============================================================
+_cache_sentimentos = CacheSQLite(
+    os.path.join(CACHE_DIR, "sentimentos.sqlite"),
+    max_itens=None,
+    max_bytes=MAX_BYTES_CACHE_SENTIMENTOS,
+)
+
+
+def _revisao_vader() -> str:
+    try:
+        return metadata.version("vaderSentiment")
+    except metadata.PackageNotFoundError:
+        return "desconhecida"
+
+
+def _pontuar_com_cache(
+    textos: List[str],
+    modelo: str,
+    revisao: str,
+    pontuar: Callable[[List[str]], List],
+    usar_cache: Optional[bool] = None,
+) -> List:
+    """
+    Consulta o cache em lote e só roda 'pontuar' nos textos ausentes (misses),
+    gravando os novos resultados. Devolve os scores na ordem de 'textos'.
+    """
+    if usar_cache is None:
+        usar_cache = USAR_CACHE_SENTIMENTOS
+    if not usar_cache:
+        return pontuar(textos)
+
+    prefixo = f"{modelo}@{revisao}:"
+    chaves = [prefixo + hashlib.sha1(t.encode("utf-8")).hexdigest() for t in textos]
+    encontrados = _cache_sentimentos.get_muitos(chaves)
+
+    faltantes = [i for i, c in enumerate(chaves) if c not in encontrados]
+    if faltantes:
+        novos = pontuar([textos[i] for i in faltantes])
+        calculados = {chaves[i]: r for i, r in zip(faltantes, novos)}
+        _cache_sentimentos.set_muitos(calculados)
+        encontrados.update(calculados)
+
+    return [encontrados[c] for c in chaves]
+
+
+def estatisticas_cache_sentimentos() -> Dict:
+    """Hits, misses, taxa de acerto e tamanho do cache de scores de sentimento."""
+    return _cache_sentimentos.estatisticas()
+
+
+# ============================================================
+#   DEDUPLICAÇÃO ANTES DA PONTUAÇÃO
+# ============================================================
+def _pontuar_deduplicado(
+    df: pd.DataFrame,
+    etapa: str,
+    pontuar_unicos: Callable[[List[str]], List],
+    coluna: str = "texto_limpo",
+) -> List:
+    """
+    Fatora a coluna de texto em valores únicos, pontua cada texto único uma vez e
+    replica o resultado para todas as linhas. A economia (linhas x textos únicos)
+    fica registrada em df.attrs["deduplicacao"][etapa].
+    """
+    codigos, unicos = pd.factorize(df[coluna].fillna("").astype(str))
+    df.attrs.setdefault("deduplicacao", {})[etapa] = {
+        "linhas": len(codigos),
+        "textos_unicos": len(unicos),
+    }
+    scores = pontuar_unicos(list(unicos))
+    return [scores[c] for c in codigos]
+
+
+# ============================================================
+#   PROCESSAMENTO PARALELO
+# ============================================================
+# Pools do processo, um por nº de workers, reaproveitados entre chamadas (VADER e
+# idioma dividem o mesmo). Usa "spawn": um fork no meio das threads de
+# coleta/Streamlit pode herdar locks presos e travar o worker. O lock protege só a
+# criação/remoção dos pools; o map roda fora dele, então chamadores concorrentes
+# dividem os workers em vez de esperar um pelo outro.
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _obter_pool(n_processos: int) -> ProcessPoolExecutor:
+    with _POOL_LOCK:
+        pool = _POOLS.get(n_processos)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=n_processos, mp_context=multiprocessing.get_context("spawn"))
+            _POOLS[n_processos] = pool
+        return pool
+
+
+def _descartar_pool(n_processos: int, pool: ProcessPoolExecutor) -> None:
+    """Remove um pool quebrado (se outra thread ainda não o substituiu)."""
+    with _POOL_LOCK:
+        if _POOLS.get(n_processos) is pool:
+            del _POOLS[n_processos]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _encerrar_pool() -> None:
+    with _POOL_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_encerrar_pool)
+
+
+def _mapear_em_processos(
+    funcao_bloco: Callable[[List[str]], List],
+    textos: List[str],
+    n_processos: int,
+) -> List:
+    """
+    Divide os textos em blocos (cerca de 4 por processo, mínimo 1000), aplica
+    'funcao_bloco' no pool de processos e junta os resultados na ordem original.
+    """
+    tamanho_bloco = max(1_000, math.ceil(len(textos) / (n_processos * 4)))
+    blocos = [textos[i : i + tamanho_bloco] for i in range(0, len(textos), tamanho_bloco)]
+    pool = _obter_pool(n_processos)
+    try:
+        resultados = list(pool.map(funcao_bloco, blocos))
+    except BrokenProcessPool:
+        # Um worker morreu (ex.: falta de memória): recria o pool e tenta de novo
+        _descartar_pool(n_processos, pool)
+        resultados = list(_obter_pool(n_processos).map(funcao_bloco, blocos))
+    return [r for bloco in resultados for r in bloco]
+
+
+# ============================================================
+#   IDIOMA
+# ============================================================
+def _detectar_idiomas_bloco(textos: List[str]) -> List[str]:
+    from langdetect import DetectorFactory, detect  # type: ignore
+    from langdetect.lang_detect_exception import LangDetectException  # type: ignore
+
+    # Semente fixa (o langdetect é probabilístico); vale também dentro dos workers
+    DetectorFactory.seed = 0
+    idiomas = []
+    for t in textos:
+        if len(t.strip()) < IDIOMA_MIN_CARACTERES:
+            idiomas.append("indefinido")
+            continue
+        try:
+            idiomas.append(detect(t))
+        except LangDetectException:
+            idiomas.append("indefinido")
+    return idiomas
+
+
+def _detectar_idiomas(textos: List[str], n_processos: Optional[int] = None) -> List[str]:
+    if n_processos is None:
+        n_processos = IDIOMA_PROCESSOS or os.cpu_count() or 1
+    if n_processos <= 1 or len(textos) < IDIOMA_MIN_PARALELO:
+        return _detectar_idiomas_bloco(textos)
+    return _mapear_em_processos(_detectar_idiomas_bloco, textos, n_processos)
+
+
+def detectar_idiomas(
+    df: pd.DataFrame,
+    coluna: str = "texto_limpo",
+    usar_cache: Optional[bool] = None,
+    n_processos: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Preenche a coluna 'idioma' (códigos ISO 639-1, ex.: 'pt', 'en') para o DataFrame
+    inteiro: textos repetidos são detectados uma vez, resultados ficam no cache por
+    hash do texto, textos curtos demais (< IDIOMA_MIN_CARACTERES) viram 'indefinido'
+    sem passar pelo detector e volumes grandes rodam em vários processos.
+    """
+    if not LANGDETECT_AVAILABLE:
+        df["idioma"] = "indefinido"
+        return df
+
+    try:
+        revisao = metadata.version("langdetect")
+    except metadata.PackageNotFoundError:
+        revisao = "desconhecida"
+
+    df["idioma"] = _pontuar_deduplicado(
+        df,
+        "idioma",
+        lambda unicos: _pontuar_com_cache(
+            unicos,
+            f"langdetect-min{IDIOMA_MIN_CARACTERES}",
+            revisao,
+            partial(_detectar_idiomas, n_processos=n_processos),
+            usar_cache=usar_cache,
+        ),
+        coluna=coluna,
+    )
     return df
 
 
+def idiomas_top5(df: pd.DataFrame) -> str:
+    """Resumo no formato do log de análises, ex.: 'en:72.7%, id:3.0%, es:2.4%'."""
+    if "idioma" not in df.columns or df.empty:
+        return ""
+    pct = df["idioma"].value_counts(normalize=True).head(5) * 100
+    return ", ".join(f"{idioma}:{valor:.1f}%" for idioma, valor in pct.items())
+
+
 # ============================================================
 #   VADER
 # ============================================================
-def aplicar_vader(df: pd.DataFrame) -> pd.DataFrame:
+# Analisador do processo worker (um por processo, criado no primeiro bloco)
+_sia_worker = None
+
+
+def _novo_analisador_vader():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer  # type: ignore
+
+    return SentimentIntensityAnalyzer()
+
+
+def _pontuar_vader_bloco(textos: List[str]) -> List[float]:
+    global _sia_worker
+    if _sia_worker is None:
+        _sia_worker = _novo_analisador_vader()
+    return [_sia_worker.polarity_scores(t)["compound"] for t in textos]
+
+
+def _pontuar_vader(textos: List[str], n_processos: Optional[int] = None) -> List[float]:
+    """
+    Calcula o compound do VADER. Entradas pequenas rodam em série; acima de
+    VADER_MIN_PARALELO textos, os blocos são distribuídos num pool de processos
+    (cerca de 4 blocos por processo) e o resultado volta na ordem original.
+    """
+    if n_processos is None:
+        n_processos = VADER_PROCESSOS or os.cpu_count() or 1
+
+    if n_processos <= 1 or len(textos) < VADER_MIN_PARALELO:
+        sia = _novo_analisador_vader()
+        return [sia.polarity_scores(t)["compound"] for t in textos]
+
+    return _mapear_em_processos(_pontuar_vader_bloco, textos, n_processos)
+
+
+def aplicar_vader(
+    df: pd.DataFrame,
+    usar_cache: Optional[bool] = None,
+    n_processos: Optional[int] = None,
+) -> pd.DataFrame:
     if not VADER_AVAILABLE:
         df["vader_compound"] = np.nan
         df["vader_label"] = "indefinido"
         return df
 
-    sia = SentimentIntensityAnalyzer()
-
-    df["vader_compound"] = df["texto_limpo"].apply(lambda t: sia.polarity_scores(t)["compound"])
+    df["vader_compound"] = _pontuar_deduplicado(
+        df,
+        "vader",
+        lambda unicos: _pontuar_com_cache(
+            unicos,
+            "vader",
+            _revisao_vader(),
+            partial(_pontuar_vader, n_processos=n_processos),
+            usar_cache=usar_cache,
+        ),
+    )
 
     def _classificar(comp):
-        if comp >= 0.05:
+        if comp >= VADER_LIMIAR:
             return "positivo"
-        if comp <= -0.05:
+        if comp <= -VADER_LIMIAR:
             return "negativo"
         return "neutro"
 
@@ -79,25 +456,217 @@ def aplicar_vader(df: pd.DataFrame) -> pd.DataFrame:
 # ============================================================
 #   BERT
 # ============================================================
-def aplicar_bert(df: pd.DataFrame) -> pd.DataFrame:
+# Registro de pipelines do processo por (modelo, backend, max_length); os pesos de
+# cada (modelo, backend) são carregados uma única vez e compartilhados entre eles
+_MODELOS: Dict[tuple, object] = {}
+_MODELOS_LOCK = threading.Lock()
+
+
+def _carregar_pipeline_onnx(modelo: str, quantizado: bool):
+    """
+    Exporta o modelo para ONNX (uma vez, em .cache/onnx/) e, se pedido, gera a versão
+    com quantização dinâmica int8. Devolve um pipeline do transformers rodando no
+    ONNX Runtime, com a mesma interface do pipeline PyTorch.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer  # type: ignore
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig  # type: ignore
+        from transformers import AutoTokenizer, pipeline  # type: ignore
+    except ImportError as e:
+        raise RuntimeError(
+            "Backend ONNX requer o pacote optimum[onnxruntime] instalado."
+        ) from e
+
+    pasta = os.path.join(CACHE_DIR, "onnx", modelo.replace("/", "__"), BERT_REVISAO)
+    if not os.path.exists(os.path.join(pasta, "model.onnx")):
+        ORTModelForSequenceClassification.from_pretrained(
+            modelo, revision=BERT_REVISAO, export=True
+        ).save_pretrained(pasta)
+        AutoTokenizer.from_pretrained(modelo, revision=BERT_REVISAO).save_pretrained(pasta)
+
+    arquivo = "model.onnx"
+    if quantizado:
+        pasta_int8 = pasta + "-int8"
+        if not os.path.exists(os.path.join(pasta_int8, "model_quantized.onnx")):
+            if platform.machine().lower() in ("arm64", "aarch64"):
+                config = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+            else:
+                config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            ORTQuantizer.from_pretrained(pasta).quantize(save_dir=pasta_int8, quantization_config=config)
+            AutoTokenizer.from_pretrained(pasta).save_pretrained(pasta_int8)
+        pasta, arquivo = pasta_int8, "model_quantized.onnx"
+
+    modelo_ort = ORTModelForSequenceClassification.from_pretrained(pasta, file_name=arquivo)
+    return pipeline("sentiment-analysis", model=modelo_ort, tokenizer=AutoTokenizer.from_pretrained(pasta))
+
+
+def _carregar_pipeline(modelo: str, backend: str):
+    if backend == "pytorch":
+        from transformers import pipeline  # type: ignore
+
+        return pipeline("sentiment-analysis", model=modelo, revision=BERT_REVISAO)
+    return _carregar_pipeline_onnx(modelo, quantizado=backend == "onnx-int8")
+
+
+def _com_truncagem(clf, max_length: int):
+    """Pipeline sobre o mesmo modelo e tokenizer, truncando as entradas em max_length tokens."""
+    from transformers import pipeline  # type: ignore
+
+    return pipeline(clf.task, model=clf.model, tokenizer=clf.tokenizer, truncation=True, max_length=max_length)
+
+
+def obter_classificador(
+    modelo: str = MODELO_BERT,
+    backend: Optional[str] = None,
+    max_length: Optional[int] = None,
+):
+    """
+    Devolve o pipeline de classificação do modelo no backend escolhido
+    (padrão: BERT_BACKEND), truncando em 'max_length' tokens (padrão:
+    BERT_MAX_LENGTH). O modelo é carregado só na primeira chamada; outros
+    max_length reaproveitam os mesmos pesos.
+    """
+    backend = backend or BERT_BACKEND
+    if backend not in BERT_BACKENDS:
+        raise ValueError(f"Backend BERT desconhecido: {backend!r} (opções: {', '.join(BERT_BACKENDS)})")
+    max_length = max_length or BERT_MAX_LENGTH
+
+    chave = (modelo, backend, max_length)
+    if chave not in _MODELOS:
+        with _MODELOS_LOCK:
+            if chave not in _MODELOS:
+                base = next((clf for (m, b, _), clf in _MODELOS.items() if (m, b) == (modelo, backend)), None)
+                _MODELOS[chave] = _com_truncagem(base or _carregar_pipeline(modelo, backend), max_length)
+    return _MODELOS[chave]
+
+
+def _id_modelo_cache(modelo: str, backend: Optional[str] = None, max_length: Optional[int] = None) -> str:
+    """
+    Identificador do modelo no cache de scores: backends e truncagens diferentes
+    não se misturam (o max_length entra no id só quando difere de 512, o limite do modelo).
+    """
+    backend = backend or BERT_BACKEND
+    max_length = max_length or BERT_MAX_LENGTH
+    identificador = modelo if backend == "pytorch" else f"{modelo}+{backend}"
+    return identificador if max_length == 512 else f"{identificador}+max{max_length}"
+
+
+def aquecer_modelos(modelos: tuple = (MODELO_BERT,)) -> None:
+    """
+    Carrega os modelos antecipadamente (ex.: na subida do app) e roda uma inferência
+    mínima, para que a primeira análise do usuário não pague o custo de carga.
+    """
+    if not BERT_AVAILABLE:
+        return
+    for modelo in modelos:
+        obter_classificador(modelo)(["ok"])
+
+
+def _classificar_textos(
+    textos: List[str],
+    modelo: str = MODELO_BERT,
+    batch_size: Optional[int] = None,
+    max_length: Optional[int] = None,
+    backend: Optional[str] = None,
+    estatisticas: Optional[Dict] = None,
+) -> List[str]:
+    """
+    Roda o classificador em lotes e devolve os rótulos brutos (ex.: '4 stars') na
+    ordem original.
+
+    1) corta cada texto em max_length * BERT_CARACTERES_POR_TOKEN caracteres (se
+       > 0), para não tokenizar o que a truncagem quase sempre jogaria fora;
+    2) tokeniza tudo de uma vez com o tokenizer rápido, sem padding;
+    3) agrupa os textos por faixa de comprimento em tokens (BERT_FAIXAS_TOKENS) e
+       monta lotes dentro de cada faixa, de modo que o padding fique mínimo;
+    4) roda o modelo lote a lote e devolve os rótulos na ordem de entrada.
+
+    Se 'estatisticas' for informado, recebe por faixa o nº de textos, o tempo e a vazão.
+    """
+    if not textos:
+        return []
+
+    import torch  # type: ignore  # já carregado pelo transformers
+
+    batch_size = batch_size or BERT_BATCH_SIZE
+    max_length = max_length or BERT_MAX_LENGTH
+    clf = obter_classificador(modelo, backend=backend, max_length=max_length)
+    tokenizer, rede = clf.tokenizer, clf.model
+
+    if BERT_CARACTERES_POR_TOKEN > 0:
+        limite = max_length * BERT_CARACTERES_POR_TOKEN
+        textos = [t[:limite] for t in textos]
+    codificados = tokenizer(textos, truncation=True, max_length=max_length)
+    comprimentos = [len(ids) for ids in codificados["input_ids"]]
+
+    faixas: Dict[int, List[int]] = {}
+    for i, n in enumerate(comprimentos):
+        faixa = next((f for f in BERT_FAIXAS_TOKENS if n <= f), max_length)
+        faixas.setdefault(faixa, []).append(i)
+
+    rotulos: List[str] = [""] * len(textos)
+    for faixa in sorted(faixas):
+        indices = sorted(faixas[faixa], key=comprimentos.__getitem__)
+        inicio = time.perf_counter()
+        for j in range(0, len(indices), batch_size):
+            lote = indices[j : j + batch_size]
+            entradas = tokenizer.pad(
+                {chave: [codificados[chave][i] for i in lote] for chave in codificados.keys()},
+                return_tensors="pt",
+            ).to(rede.device)
+            with torch.inference_mode():
+                logits = rede(**entradas).logits
+            for i, classe in zip(lote, logits.argmax(dim=-1).tolist()):
+                rotulos[i] = rede.config.id2label[classe]
+        if estatisticas is not None:
+            segundos = time.perf_counter() - inicio
+            estatisticas[faixa] = {
+                "textos": len(indices),
+                "segundos": segundos,
+                "textos_por_s": len(indices) / segundos if segundos else 0.0,
+            }
+    return rotulos
+
+
+def aplicar_bert(
+    df: pd.DataFrame,
+    batch_size: Optional[int] = None,
+    max_length: Optional[int] = None,
+    usar_cache: Optional[bool] = None,
+    backend: Optional[str] = None,
+) -> pd.DataFrame:
     if not BERT_AVAILABLE:
         df["bert_label_raw"] = "indefinido"
         df["bert_estrelas"] = np.nan
         df["bert_label"] = "indefinido"
         return df
 
-    clf = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
-
-    textos = df["texto_limpo"].fillna("").tolist()
-    resultados = clf(textos, truncation=True)
-
-    df["bert_label_raw"] = [r["label"] for r in resultados]
+    estatisticas_faixas: Dict[int, Dict] = {}
+    df["bert_label_raw"] = _pontuar_deduplicado(
+        df,
+        "bert",
+        lambda unicos: _pontuar_com_cache(
+            unicos,
+            _id_modelo_cache(MODELO_BERT, backend, max_length),
+            BERT_REVISAO,
+            lambda faltantes: _classificar_textos(
+                faltantes,
+                batch_size=batch_size,
+                max_length=max_length,
+                backend=backend,
+                estatisticas=estatisticas_faixas,
+            ),
+            usar_cache=usar_cache,
+        ),
+    )
 
     estrelas = []
     for lab in df["bert_label_raw"]:
         nums = re.findall(r"\d+", lab)
         estrelas.append(int(nums[0]) if nums else np.nan)
     df["bert_estrelas"] = estrelas
+    # Vazão por faixa de comprimento em tokens (só os textos que passaram pelo modelo)
+    df.attrs["bert_faixas"] = estatisticas_faixas
 
     def mapear(e):
         if pd.isna(e):
@@ -113,17 +682,96 @@ def aplicar_bert(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# ============================================================
+#   ROTEAMENTO POR IDIOMA (VADER x BERT)
+# ============================================================
+def aplicar_sentimento_roteado(
+    df: pd.DataFrame,
+    margem: Optional[float] = None,
+    usar_cache: Optional[bool] = None,
+) -> pd.DataFrame:
+    """
+    Roda o VADER em todas as linhas e o BERT apenas onde ele é necessário:
+    textos fora de ROTEAMENTO_IDIOMAS_VADER (inglês) ou com |compound| a menos de
+    'margem' dos limiares de ±0.05 (casos ambíguos).
+
+    Mantém as colunas de sempre (vader_*, bert_label_raw, bert_estrelas, bert_label);
+    nas linhas resolvidas pelo VADER as colunas do BERT ficam vazias. A coluna
+    'modelo_label' indica quem decidiu cada linha ('vader' ou 'bert'), e
+    rotulo_final() devolve o rótulo de quem decidiu. Contagens e tempo economizado
+    (estimado pelo custo médio por linha do BERT nesta execução) ficam em
+    df.attrs["roteamento"].
+
+    Sem o transformers instalado nada é roteado ao BERT: todas as linhas ficam
+    com o rótulo do VADER.
+    """
+    margem = ROTEAMENTO_MARGEM if margem is None else margem
+
+    if "idioma" not in df.columns:
+        df = detectar_idiomas(df, usar_cache=usar_cache)
+    df = aplicar_vader(df, usar_cache=usar_cache)
+
+    ambiguo = df["vader_compound"].abs().fillna(0) < VADER_LIMIAR + margem
+    usa_bert = ~df["idioma"].isin(ROTEAMENTO_IDIOMAS_VADER) | ambiguo
+    if not BERT_AVAILABLE:
+        usa_bert[:] = False
+    elif not VADER_AVAILABLE:
+        usa_bert[:] = True
+
+    df["bert_label_raw"] = ""
+    df["bert_estrelas"] = np.nan
+    df["bert_label"] = ""
+    df["modelo_label"] = np.where(usa_bert, "bert", "vader")
+
+    tempo_bert = 0.0
+    # Máscara posicional: o índice do lote pode ter rótulos repetidos (ex.: concat sem ignore_index)
+    mascara = usa_bert.to_numpy()
+    if mascara.any():
+        inicio = time.perf_counter()
+        parte = aplicar_bert(df.loc[mascara].copy(), usar_cache=usar_cache)
+        tempo_bert = time.perf_counter() - inicio
+        for coluna in ("bert_label_raw", "bert_estrelas", "bert_label"):
+            df.loc[mascara, coluna] = parte[coluna].to_numpy()
+
+    n_bert = int(mascara.sum())
+    n_vader = len(df) - n_bert
+    df.attrs["roteamento"] = {
+        "vader": n_vader,
+        "bert": n_bert,
+        "tempo_bert_s": tempo_bert,
+        "tempo_economizado_s": (tempo_bert / n_bert * n_vader) if n_bert else 0.0,
+    }
+    return df
+
+
+def rotulo_final(df: pd.DataFrame) -> pd.Series:
+    """
+    Rótulo de cada linha segundo o modelo que a decidiu: no modo roteado, o do
+    VADER ou o do BERT conforme 'modelo_label'; fora dele, o do BERT.
+    """
+    if "modelo_label" not in df.columns:
+        return df["bert_label"]
+    return pd.Series(
+        np.where(df["modelo_label"] == "bert", df["bert_label"], df["vader_label"]),
+        index=df.index,
+    )
+
+
 # ============================================================
 #   RESUMO DE SENTIMENTOS
 # ============================================================
 def resumo_sentimentos(df: pd.DataFrame) -> dict:
     """
     Calcula contagens e percentuais de sentimentos para VADER e BERT.
+    No modo roteado, os do BERT contam só as linhas que foram ao BERT.
     """
-    total = len(df) if len(df) > 0 else 1
 
     def _contar(col):
-        cont = df[col].value_counts(dropna=False).to_dict()
+        rotulos = df[col]
+        if col == "bert_label":
+            rotulos = rotulos[rotulos != ""]
+        total = len(rotulos) if len(rotulos) > 0 else 1
+        cont = rotulos.value_counts(dropna=False).to_dict()
         for k in ("positivo", "neutro", "negativo"):
             cont.setdefault(k, 0)
         return {
@@ -138,6 +786,107 @@ def resumo_sentimentos(df: pd.DataFrame) -> dict:
     }
 
 
+# ============================================================
+#   LOG DE EXECUÇÕES (logs/analises.csv)
+# ============================================================
+ARQUIVO_LOG_ANALISES = os.path.join("logs", "analises.csv")
+COLUNAS_LOG_ANALISES = [
+    "data_hora",
+    "modelo_utilizado",
+    "arquivo_entrada",
+    "total_comentarios",
+    "pct_positivo",
+    "pct_neutro",
+    "pct_negativo",
+    "idiomas_top5",
+    "arquivo_saida",
+    # Instrumentação da execução (Instrumentacao.resumo_log)
+    "tempo_total_s",
+    "chamadas_api",
+    "quota_unidades",
+    "cache_hits",
+    "cache_misses",
+    "pico_memoria_mb",
+    "tempos_etapas",
+]
+
+
+def _migrar_cabecalho_log(caminho: str) -> None:
+    """Reescreve um log antigo com as colunas atuais (as novas ficam vazias nas linhas antigas)."""
+    with open(caminho, encoding="utf-8-sig") as f:
+        cabecalho = f.readline().strip().split(",")
+    if cabecalho == COLUNAS_LOG_ANALISES:
+        return
+    antigo = pd.read_csv(caminho, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    antigo.reindex(columns=COLUNAS_LOG_ANALISES, fill_value="").to_csv(
+        caminho + ".tmp", index=False, encoding="utf-8-sig"
+    )
+    os.replace(caminho + ".tmp", caminho)
+
+
+def registrar_execucao(
+    df: pd.DataFrame,
+    arquivo_entrada: str,
+    arquivo_saida: str,
+    idiomas_top5: str = "",
+    caminho: str = ARQUIVO_LOG_ANALISES,
+    metricas: Optional[Dict] = None,
+) -> Dict:
+    """
+    Acrescenta uma linha de resumo da execução ao log de análises.
+    Os percentuais vêm do BERT; se ele não rodou (nem em parte das linhas, no
+    modo roteado), do VADER.
+    'metricas' (Instrumentacao.resumo_log()) preenche as colunas de tempo, API,
+    quota, cache e memória; logs com o cabeçalho antigo são migrados antes.
+    """
+    rotulos, modelo = None, MODELO_BERT
+    saida_bert = df["bert_label_raw"].fillna("") if "bert_label_raw" in df.columns else df.get("bert_label")
+    if saida_bert is None or saida_bert.isin(["", "indefinido"]).all():
+        modelo = "vaderSentiment"
+        rotulos = df.get("vader_label")
+    elif "modelo_label" in df.columns:
+        # Modo roteado: cada linha conta com o rótulo do modelo que a decidiu
+        if (df["modelo_label"] == "vader").any():
+            modelo = f"vaderSentiment + {MODELO_BERT}"
+        rotulos = rotulo_final(df)
+    else:
+        rotulos = df["bert_label"]
+
+    total = len(df)
+    contagens = rotulos.value_counts() if rotulos is not None else pd.Series(dtype=int)
+
+    def _pct(rotulo: str) -> float:
+        return round(contagens.get(rotulo, 0) / total * 100, 3) if total else 0.0
+
+    linha = {
+        "data_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "modelo_utilizado": modelo,
+        "arquivo_entrada": arquivo_entrada,
+        "total_comentarios": total,
+        "pct_positivo": _pct("positivo"),
+        "pct_neutro": _pct("neutro"),
+        "pct_negativo": _pct("negativo"),
+        "idiomas_top5": idiomas_top5,
+        "arquivo_saida": arquivo_saida,
+        **{k: v for k, v in (metricas or {}).items() if k in COLUNAS_LOG_ANALISES},
+    }
+
+    existe = os.path.exists(caminho)
+    if existe:
+        _migrar_cabecalho_log(caminho)
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    pd.DataFrame([linha], columns=COLUNAS_LOG_ANALISES).to_csv(
+        caminho,
+        mode="a",
+        header=not existe,
+        index=False,
+        encoding="utf-8" if existe else "utf-8-sig",
+    )
+    return linha
+
+
 # ============================================================
 #   PALAVRAS MAIS FREQUENTES (insights de texto)
 # ============================================================
@@ -149,33 +898,119 @@ STOPWORDS_PT = {
 }
 
 
+# Colunas pelas quais o índice de palavras separa as contagens
+COLUNAS_INDICE_PALAVRAS = ("video_id", "vader_label", "bert_label")
+
+
+class IndicePalavras:
+    """
+    Contagem de palavras de 'texto_limpo' por grupo de colunas (padrão: vídeo,
+    rótulo VADER e rótulo BERT), montada uma vez por DataFrame analisado.
+
+    top() soma só os grupos que passam nos filtros, então qualquer combinação de
+    sentimento e vídeo sai sem varrer os textos de novo:
+
+        indice = IndicePalavras.de_dataframe(df)
+        indice.top(20)
+        indice.top(20, bert_label="negativo", video_id=["abc", "xyz"])
+
+    adicionar() acrescenta comentários (ex.: cada lote do processamento em fluxo).
+    A contagem vai direto dos textos para o Counter (sem lista intermediária) e
+    stopwords/palavras curtas são descartadas no vocabulário, na hora da consulta.
+    Empates saem na ordem da primeira aparição (como no value_counts) dentro de
+    cada grupo; entre grupos, na ordem em que os grupos apareceram.
+    """
+
+    def __init__(self, colunas: Tuple[str, ...] = COLUNAS_INDICE_PALAVRAS):
+        self.colunas = tuple(colunas)
+        self.linhas = 0
+        self._contagens: Dict[tuple, Counter] = {}
+
+    @classmethod
+    def de_dataframe(
+        cls, df: pd.DataFrame, colunas: Tuple[str, ...] = COLUNAS_INDICE_PALAVRAS
+    ) -> "IndicePalavras":
+        indice = cls(colunas)
+        indice.adicionar(df)
+        return indice
+
+    def adicionar(self, df: pd.DataFrame) -> None:
+        self.linhas += len(df)
+        if df.empty:
+            return
+
+        # Colunas de agrupamento ausentes entram como None (o index explícito cobre
+        # o caso em que nenhuma delas existe e todos os valores seriam escalares)
+        base = pd.DataFrame(
+            {c: (df[c].to_numpy() if c in df.columns else None) for c in self.colunas},
+            index=pd.RangeIndex(len(df)),
+        )
+        textos = df["texto_limpo"]
+        base["_texto"] = textos.astype(str).str.lower().to_numpy()
+        base = base[textos.notna().to_numpy()]
+        if self.colunas:
+            grupos = base.groupby(list(self.colunas), sort=False, dropna=False)
+        else:
+            grupos = [((), base)]
+
+        for chave, grupo in grupos:
+            chave = chave if isinstance(chave, tuple) else (chave,)
+            self._contagens.setdefault(chave, Counter()).update(
+                chain.from_iterable(map(str.split, grupo["_texto"].tolist()))
+            )
+
+    def _grupos(self, filtros: Dict) -> List[tuple]:
+        desconhecidas = set(filtros) - set(self.colunas)
+        if desconhecidas:
+            raise ValueError(f"Colunas fora do índice de palavras: {sorted(desconhecidas)}")
+        aceitos = {
+            self.colunas.index(col): (set(valor) if isinstance(valor, (list, tuple, set)) else {valor})
+            for col, valor in filtros.items()
+            if valor is not None
+        }
+        return [
+            chave for chave in self._contagens
+            if all(chave[i] in valores for i, valores in aceitos.items())
+        ]
+
+    def top(self, n: int = 20, **filtros) -> pd.DataFrame:
+        """
+        As N palavras mais frequentes nos grupos que atendem aos filtros
+        (coluna=valor ou coluna=[valores]); filtro com valor None é ignorado.
+        """
+        grupos = self._grupos(filtros)
+        total: Counter = Counter()
+        for chave in grupos:
+            total.update(self._contagens[chave])
+
+        validas = {p: c for p, c in total.items() if len(p) > 2 and p not in STOPWORDS_PT}
+        if not validas or n <= 0:
+            return pd.DataFrame(columns=["palavra", "frequencia"])
+
+        # nlargest é estável: empates mantêm a ordem de inserção no Counter
+        escolhidas = heapq.nlargest(n, validas.items(), key=lambda item: item[1])
+        return pd.DataFrame(
+            {
+                "palavra": [p for p, _ in escolhidas],
+                "frequencia": np.array([c for _, c in escolhidas], dtype="int64"),
+            }
+        )
+
+
 def palavras_mais_frequentes(
     df: pd.DataFrame,
     n: int = 20,
     filtro_coluna: str | None = None,
     filtro_valor: str | None = None,
+    indice: IndicePalavras | None = None,
 ) -> pd.DataFrame:
     """
     Retorna um DataFrame com as N palavras mais frequentes em 'texto_limpo'.
     Pode filtrar por uma coluna de sentimento (ex: 'bert_label') e valor ('negativo').
+    Com 'indice' (IndicePalavras já montado para este df), não relê os textos.
     """
-    dados = df
-    if filtro_coluna and filtro_valor:
-        dados = dados[dados[filtro_coluna] == filtro_valor]
-
-    todas_palavras: list[str] = []
-    for t in dados["texto_limpo"].dropna().tolist():
-        for p in str(t).split():
-            p = p.strip().lower()
-            if not p or p in STOPWORDS_PT or len(p) <= 2:
-                continue
-            todas_palavras.append(p)
-
-    if not todas_palavras:
-        return pd.DataFrame(columns=["palavra", "frequencia"])
-
-    serie = pd.Series(todas_palavras)
-    freq = serie.value_counts().reset_index()
-    freq.columns = ["palavra", "frequencia"]
-    return freq.head(n)
+    filtros = {filtro_coluna: filtro_valor} if filtro_coluna and filtro_valor else {}
+    if indice is None:
+        indice = IndicePalavras.de_dataframe(df, colunas=tuple(filtros))
+    return indice.top(n, **filtros)
     
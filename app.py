@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 from datetime import datetime
 
 import matplotlib.pyplot as plt
@@ -6,21 +8,11 @@ import pandas as pd
 import seaborn as sns
 import streamlit as st
 
-from coleta import (
-    extrair_video_id,
-    extrair_channel_id,
-    listar_videos_recentes,
-    listar_videos_mais_vistos,
-    listar_videos_mais_comentados,
-    coletar_comentarios_multiplos_videos,
-)
-from analise import (
-    preprocessar_textos,
-    aplicar_vader,
-    aplicar_bert,
-    resumo_sentimentos,
-    palavras_mais_frequentes,
-)
+from analise import resumo_sentimentos
+from armazenamento import arquivo_csv
+from agregados import obter_agregados
+from quota import obter_livro
+from tarefas import ESTADOS_ATIVOS, ExecutorTarefas, carregar_resultado
 
 # ============================================================
 #   CONFIGURAÇÃO BÁSICA
@@ -31,10 +23,20 @@ st.set_page_config(
 )
 sns.set(style="whitegrid")
 
+
 st.title("📊 YouTube Sentiment Dashboard")
 st.markdown("#### Analise comentários de vídeos do YouTube usando *VADER + BERT*")
 
 
+def abrir_tarefa(tarefa_id: str) -> None:
+    """Passa a exibir (ou acompanhar) a análise com este ID nesta sessão."""
+    tarefa_id = tarefa_id.strip()
+    if tarefa_id:
+        st.session_state["tarefa_id"] = tarefa_id
+        st.session_state["chave_analise"] = ("tarefa", tarefa_id)
+        st.query_params["tarefa"] = tarefa_id
+
+
 # ============================================================
 #   SIDEBAR
 # ============================================================
@@ -68,237 +70,469 @@ with st.sidebar:
     max_videos = st.slider("Quantidade de vídeos do canal:", 1, 20, 5)
     max_comments = st.slider("Comentários por vídeo:", 20, 500, 200)
 
+    roteamento = st.checkbox(
+        "⚡ Roteamento por idioma (BERT só em textos não ingleses ou ambíguos)",
+        value=False,
+    )
+
+    incremental = st.checkbox(
+        "📥 Coleta incremental (baixar só os comentários novos desde a última coleta)",
+        value=False,
+    )
+
+    forcar_atualizacao = st.checkbox(
+        "🔄 Forçar nova coleta (ignorar resultados em cache)",
+        value=False,
+    )
+
     iniciar = st.button("🔍 Coletar e Analisar")
 
+    st.text_input(
+        "Abrir análise anterior pelo ID:",
+        key="tarefa_aberta",
+        placeholder="ex.: 3f9c2a71b0de",
+        on_change=lambda: abrir_tarefa(st.session_state["tarefa_aberta"]),
+    )
+
+    livro_quota = obter_livro()
+    if livro_quota.orcamento:
+        st.caption(f"📒 Quota da API hoje: {livro_quota.usado()} de {livro_quota.orcamento} unidades usadas.")
+
+
+# ============================================================
+#   EXECUÇÃO EM SEGUNDO PLANO
+# ============================================================
+CRITERIOS_QUOTA = {
+    "Mais recentes": "recentes",
+    "Mais vistos": "vistos",
+    "Mais comentados (beta)": "comentados",
+}
+
+# De quanto em quanto tempo a página consulta o progresso da tarefa
+INTERVALO_ATUALIZACAO = float(os.getenv("APP_INTERVALO_ATUALIZACAO", 1.0))
+
+
+@st.cache_resource
+def obter_executor_tarefas() -> ExecutorTarefas:
+    """Um pool de processos por servidor, compartilhado por todas as sessões."""
+    return ExecutorTarefas()
+
+
+def parametros_analise(link: str) -> dict:
+    return {
+        "link": link,
+        "modo": "video" if modo_analise == "Apenas este vídeo" else "canal",
+        "criterio": CRITERIOS_QUOTA[criterio_videos],
+        "max_videos": max_videos,
+        "max_comments": max_comments,
+        "roteado": roteamento,
+        "incremental": incremental,
+    }
 
 # ============================================================
-#   SELEÇÃO DE VÍDEOS
+#   CACHE DE RESULTADOS
 # ============================================================
-def selecionar_videos(link: str) -> tuple[str | None, list[dict]]:
+class CacheResultados:
     """
-    Decide se analisa um único vídeo ou múltiplos vídeos do canal.
-    Retorna (channel_id, lista_de_videos)
+    Guarda análises concluídas por (link, modo, critério, max_videos, max_comments),
+    compartilhadas entre reruns e sessões. Cada entrada vale por 'ttl' segundos e o
+    total de memória dos DataFrames fica limitado a 'max_bytes' (sai a mais antiga).
     """
-    # Modo "apenas este vídeo"
-    if modo_analise == "Apenas este vídeo":
-        vid = extrair_video_id(link)
-        if not vid:
-            raise ValueError("Não consegui extrair o ID do vídeo. Verifique o link informado.")
-        canal_id = extrair_channel_id(link)
-        return canal_id, [{"video_id": vid, "video_title": "Vídeo único", "video_published_at": None}]
-
-    # Modos que usam múltiplos vídeos do canal
-    canal_id = extrair_channel_id(link)
-
-    if criterio_videos == "Mais vistos":
-        videos = listar_videos_mais_vistos(canal_id, max_videos=max_videos)
-    elif criterio_videos == "Mais comentados (beta)":
-        videos = listar_videos_mais_comentados(canal_id, max_videos=max_videos)
-    else:
-        videos = listar_videos_recentes(canal_id, max_videos=max_videos)
 
-    return canal_id, videos
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._itens: dict = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave: tuple) -> dict | None:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if time.time() - item["criado_em"] > self.ttl:
+                del self._itens[chave]
+                return None
+            return item["resultado"]
+
+    def descartar(self, chave: tuple) -> None:
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def guardar(self, chave: tuple, resultado: dict) -> None:
+        tamanho = int(resultado["df"].memory_usage(deep=True).sum())
+        with self._lock:
+            self._itens.pop(chave, None)
+            self._itens[chave] = {"resultado": resultado, "criado_em": time.time(), "bytes": tamanho}
+            # dict preserva a ordem de inserção: as primeiras chaves são as mais antigas
+            while len(self._itens) > 1 and sum(i["bytes"] for i in self._itens.values()) > self.max_bytes:
+                del self._itens[next(iter(self._itens))]
+
+
+@st.cache_resource
+def obter_cache_resultados() -> CacheResultados:
+    return CacheResultados(
+        ttl=float(os.getenv("APP_CACHE_TTL", 3600)),
+        max_bytes=int(os.getenv("APP_CACHE_MAX_MB", 512)) * 1024 * 1024,
+    )
 
 
 # ============================================================
-#   LÓGICA PRINCIPAL
+#   ACOMPANHAMENTO DA TAREFA
 # ============================================================
-if iniciar:
-    try:
-        if not link_input.strip():
-            st.error("Informe um link de vídeo ou canal do YouTube.")
-            st.stop()
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def acompanhar_tarefa(tarefa_id: str) -> None:
+    """Consulta a tabela de tarefas a cada INTERVALO_ATUALIZACAO segundos e mostra o progresso."""
+    tarefa = obter_executor_tarefas().tabela.obter(tarefa_id)
+    if tarefa is None or tarefa["estado"] not in ESTADOS_ATIVOS:
+        # Terminou (ou sumiu): a página inteira roda de novo para exibir o resultado
+        st.rerun()
+
+    progresso = tarefa["progresso"]
+    st.subheader("💬 Coletando e analisando comentários...")
+    st.caption(f"🆔 Análise {tarefa_id} — pode ser reaberta depois pelo ID (na barra lateral ou com ?tarefa={tarefa_id}).")
+
+    if tarefa["estado"] == "pendente":
+        st.info("⏳ Na fila: aguardando um processo livre.")
+        return
+
+    estimativa = progresso.get("estimativa") or 0
+    comentarios = progresso.get("comentarios", 0)
+    st.progress(
+        min(1.0, comentarios / estimativa) if estimativa else 0.0,
+        text=f"Etapa: {tarefa['etapa'] or 'iniciando'} — {comentarios} de até {estimativa} comentários",
+    )
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Comentários analisados", comentarios)
+    col2.metric("Positivos (VADER)", f"{progresso.get('positivos_vader', 0):.1f}%")
+    col3.metric("Positivos (BERT)", f"{progresso.get('positivos_bert', 0):.1f}%")
+    if progresso.get("etapas"):
+        st.dataframe(pd.DataFrame(progresso["etapas"]), use_container_width=True)
+
+
+# ============================================================
+#   EXIBIÇÃO DOS RESULTADOS
+# ============================================================
+def exibir_resultado(resultado: dict) -> None:
+    canal_id = resultado["canal_id"]
+    df = resultado["df"]
+
+    plano = resultado["plano"]
+    if plano["degradado"]:
+        st.warning(
+            f"📒 Quota da API quase no fim (restam {plano['restante']} unidades hoje): "
+            f"análise reduzida para {len(resultado['videos'])} vídeo(s) e até {plano['max_comments']} "
+            "comentários por vídeo."
+        )
+
+    st.success(f"✅ {len(df)} comentários coletados e analisados!")
 
-        canal_id, videos = selecionar_videos(link_input)
+    totais = resultado["totais"]
+    if totais.linhas:
+        st.caption(
+            f"♻️ {totais.textos_unicos} textos únicos pontuados para "
+            f"{totais.linhas} comentários."
+        )
 
-        if not videos:
-            st.error("Nenhum vídeo encontrado para este canal.")
-            st.stop()
+    if resultado["roteado"]:
+        rot = totais.roteamento
+        st.caption(
+            f"⚡ Roteamento: {rot['vader']} comentários resolvidos pelo VADER, {rot['bert']} pelo BERT "
+            f"(~{rot['tempo_economizado_s']:.1f}s economizados)."
+        )
 
-        st.info(f"📺 Canal detectado: {canal_id}")
+    st.info(f"📺 Canal detectado: {canal_id}")
+    st.subheader("🎬 Vídeos selecionados para análise")
+    st.dataframe(pd.DataFrame(resultado["videos"]), use_container_width=True)
+
+    resumo = resumo_sentimentos(df)
+
+    # -------------------------------------------
+    # ABAS DO DASHBOARD
+    # -------------------------------------------
+    (
+        tab_geral,
+        tab_vader,
+        tab_bert,
+        tab_comentarios,
+        tab_insights,
+        tab_tendencia,
+        tab_export,
+        tab_diagnostico,
+    ) = st.tabs(
+        [
+            "📌 Visão Geral",
+            "🧪 VADER",
+            "🤖 BERT",
+            "💬 Comentários",
+            "📊 Insights",
+            "📈 Tendência",
+            "💾 Exportação",
+            "🩺 Diagnóstico",
+        ]
+    )
 
-        df_videos = pd.DataFrame(videos)
+    # ---------------- Visão Geral ----------------
+    with tab_geral:
+        st.subheader("📌 Resumo Geral")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total de comentários", resumo["total_comentarios"])
+
+        vader_pos = resumo["vader"]["percents"].get("positivo", 0)
+        bert_pos = resumo["bert"]["percents"].get("positivo", 0)
+        col2.metric("Positivos (VADER)", f"{vader_pos:.1f}%")
+        col3.metric("Positivos (BERT)", f"{bert_pos:.1f}%")
+
+        st.markdown("##### Comparação de distribuição de sentimentos")
+        dist_df = pd.DataFrame(
+            {
+                "sentimento": ["negativo", "neutro", "positivo"],
+                "VADER": [
+                    resumo["vader"]["counts"]["negativo"],
+                    resumo["vader"]["counts"]["neutro"],
+                    resumo["vader"]["counts"]["positivo"],
+                ],
+                "BERT": [
+                    resumo["bert"]["counts"]["negativo"],
+                    resumo["bert"]["counts"]["neutro"],
+                    resumo["bert"]["counts"]["positivo"],
+                ],
+            }
+        ).set_index("sentimento")
+        st.bar_chart(dist_df)
+
+    # ---------------- VADER ----------------
+    with tab_vader:
+        st.subheader("🧪 Distribuição VADER")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Negativos", int(resumo["vader"]["counts"]["negativo"]))
+        col2.metric("Neutros", int(resumo["vader"]["counts"]["neutro"]))
+        col3.metric("Positivos", int(resumo["vader"]["counts"]["positivo"]))
+
+        fig, ax = plt.subplots()
+        sns.countplot(
+            data=df,
+            x="vader_label",
+            order=["negativo", "neutro", "positivo"],
+            ax=ax,
+        )
+        ax.set_title("Distribuição de sentimentos (VADER)")
+        st.pyplot(fig)
+
+    # ---------------- BERT ----------------
+    with tab_bert:
+        st.subheader("🤖 Distribuição BERT")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Negativos", int(resumo["bert"]["counts"]["negativo"]))
+        col2.metric("Neutros", int(resumo["bert"]["counts"]["neutro"]))
+        col3.metric("Positivos", int(resumo["bert"]["counts"]["positivo"]))
+
+        fig2, ax2 = plt.subplots()
+        sns.countplot(
+            data=df,
+            x="bert_label",
+            order=["negativo", "neutro", "positivo"],
+            ax=ax2,
+        )
+        ax2.set_title("Distribuição de sentimentos (BERT)")
+        st.pyplot(fig2)
+
+    # ---------------- Comentários ----------------
+    with tab_comentarios:
+        st.subheader("💬 Comentários classificados")
+        filtro_sent = st.selectbox(
+            "Filtrar por sentimento (BERT):",
+            ["Todos", "positivo", "neutro", "negativo"],
+        )
+        df_filtrado = df
+        if filtro_sent != "Todos":
+            df_filtrado = df[df["bert_label"] == filtro_sent]
 
-        st.subheader("🎬 Vídeos selecionados para análise")
-        st.dataframe(df_videos, use_container_width=True)
+        st.dataframe(
+            df_filtrado[["video_id", "author", "comment", "vader_label", "bert_label"]],
+            use_container_width=True,
+        )
 
-        # -------------------------------------------
-        # COLETA DE COMENTÁRIOS
-        # -------------------------------------------
-        st.subheader("💬 Coletando comentários...")
-        with st.spinner("Buscando comentários na API do YouTube..."):
-            df_comments = coletar_comentarios_multiplos_videos(
-                videos, max_comments_por_video=max_comments
-            )
+    # ---------------- Insights ----------------
+    with tab_insights:
+        st.subheader("📊 Insights de texto")
 
-        if df_comments.empty:
-            st.warning("Nenhum comentário encontrado para os vídeos selecionados.")
-            st.stop()
-
-        st.success(f"✅ {len(df_comments)} comentários coletados!")
-
-        # -------------------------------------------
-        # PRÉ-PROCESSAMENTO
-        # -------------------------------------------
-        st.subheader("🧹 Limpando textos...")
-        df = preprocessar_textos(df_comments)
-        st.dataframe(df.head(), use_container_width=True)
-
-        # -------------------------------------------
-        # ANÁLISE DE SENTIMENTOS
-        # -------------------------------------------
-        st.subheader("🧠 Rodando análises de sentimento...")
-        df = aplicar_vader(df)
-        df = aplicar_bert(df)
-
-        resumo = resumo_sentimentos(df)
-
-        # -------------------------------------------
-        # ABAS DO DASHBOARD
-        # -------------------------------------------
-        tab_geral, tab_vader, tab_bert, tab_comentarios, tab_insights, tab_export = st.tabs(
-            ["📌 Visão Geral", "🧪 VADER", "🤖 BERT", "💬 Comentários", "📊 Insights", "💾 Exportação"]
+        indice = resultado["indice_palavras"]
+        video_palavras = st.selectbox(
+            "Vídeo (palavras mais frequentes):",
+            ["Todos"] + sorted(df["video_id"].dropna().unique().tolist()),
+        )
+        filtro_video = None if video_palavras == "Todos" else video_palavras
+
+        col_a, col_b = st.columns(2)
+
+        with col_a:
+            st.markdown("*Palavras mais frequentes (geral)*")
+            freq_geral = indice.top(20, video_id=filtro_video)
+            st.dataframe(freq_geral, use_container_width=True)
+
+        with col_b:
+            st.markdown("*Palavras mais frequentes em comentários negativos (BERT)*")
+            freq_neg = indice.top(20, video_id=filtro_video, bert_label="negativo")
+            st.dataframe(freq_neg, use_container_width=True)
+
+        st.markdown("---")
+        st.markdown("*Top 5 comentários mais positivos (BERT)*")
+        positivos = df[df["bert_label"] == "positivo"].copy()
+        positivos = positivos.sort_values(by="like_count", ascending=False).head(5)
+        st.dataframe(
+            positivos[["video_id", "author", "comment", "like_count"]],
+            use_container_width=True,
+        )
+
+        st.markdown("*Top 5 comentários mais negativos (BERT)*")
+        negativos = df[df["bert_label"] == "negativo"].copy()
+        negativos = negativos.sort_values(by="like_count", ascending=False).head(5)
+        st.dataframe(
+            negativos[["video_id", "author", "comment", "like_count"]],
+            use_container_width=True,
+        )
+
+    # ---------------- Exportação ----------------
+    with tab_export:
+        st.subheader("💾 Exportar dados")
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        nome_arquivo = f"analise_youtube_{ts}.csv"
+
+        # O CSV só é gerado (em partes) quando o usuário clica no botão
+        st.download_button(
+            label="⬇ Baixar CSV completo",
+            data=lambda: arquivo_csv(df),
+            file_name=nome_arquivo,
+            mime="text/csv",
+        )
+
+        st.info(
+            "O arquivo CSV contém todas as colunas da análise: vídeo, autor, comentário, "
+            "labels de sentimento do VADER e BERT, além de scores numéricos."
+        )
+
+    # ---------------- Tendência ----------------
+    with tab_tendencia:
+        st.subheader("📈 Tendência de sentimento do canal")
+        if not canal_id:
+            st.info("Canal não identificado; sem histórico para exibir.")
+        else:
+            exibir_tendencia(canal_id)
+
+    # ---------------- Diagnóstico ----------------
+    with tab_diagnostico:
+        st.subheader("🩺 Diagnóstico da execução")
+        diagnostico = resultado.get("diagnostico")
+        if not diagnostico:
+            st.info("Sem medições para esta análise.")
+        else:
+            exibir_diagnostico(diagnostico)
+
+
+def exibir_tendencia(canal_id: str) -> None:
+    """Sentimento por dia de publicação, lido dos agregados de todas as análises do canal."""
+    col1, col2 = st.columns(2)
+    modelo = col1.radio("Modelo:", ["bert", "vader"], format_func=str.upper, horizontal=True)
+    dias = col2.slider("Período (dias):", min_value=7, max_value=365, value=90, step=1)
+
+    tabela = obter_agregados().tendencia(canal_id, modelo=modelo, dias=dias)
+    if tabela.empty:
+        st.info("Ainda não há comentários agregados deste canal no período.")
+        return
+
+    serie = tabela.set_index("dia")
+    st.markdown("*Percentual de comentários por sentimento*")
+    st.line_chart(
+        serie[["pct_positivo", "pct_neutro", "pct_negativo"]].rename(
+            columns={"pct_positivo": "positivo", "pct_neutro": "neutro", "pct_negativo": "negativo"}
         )
+    )
+    st.markdown("*Score médio (" + ("estrelas do BERT" if modelo == "bert" else "compound do VADER") + ")*")
+    st.line_chart(serie["score_medio"])
+    st.dataframe(tabela, use_container_width=True)
+    st.caption(
+        "Soma de todas as análises já feitas deste canal (dashboard e lote), pelo dia de "
+        "publicação do comentário; cada comentário conta uma vez."
+    )
 
-        # ---------------- Visão Geral ----------------
-        with tab_geral:
-            st.subheader("📌 Resumo Geral")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total de comentários", resumo["total_comentarios"])
-
-            vader_pos = resumo["vader"]["percents"].get("positivo", 0)
-            bert_pos = resumo["bert"]["percents"].get("positivo", 0)
-            col2.metric("Positivos (VADER)", f"{vader_pos:.1f}%")
-            col3.metric("Positivos (BERT)", f"{bert_pos:.1f}%")
-
-            st.markdown("##### Comparação de distribuição de sentimentos")
-            dist_df = pd.DataFrame(
-                {
-                    "sentimento": ["negativo", "neutro", "positivo"],
-                    "VADER": [
-                        resumo["vader"]["counts"]["negativo"],
-                        resumo["vader"]["counts"]["neutro"],
-                        resumo["vader"]["counts"]["positivo"],
-                    ],
-                    "BERT": [
-                        resumo["bert"]["counts"]["negativo"],
-                        resumo["bert"]["counts"]["neutro"],
-                        resumo["bert"]["counts"]["positivo"],
-                    ],
-                }
-            ).set_index("sentimento")
-            st.bar_chart(dist_df)
-
-        # ---------------- VADER ----------------
-        with tab_vader:
-            st.subheader("🧪 Distribuição VADER")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Negativos", int(resumo["vader"]["counts"]["negativo"]))
-            col2.metric("Neutros", int(resumo["vader"]["counts"]["neutro"]))
-            col3.metric("Positivos", int(resumo["vader"]["counts"]["positivo"]))
-
-            fig, ax = plt.subplots()
-            sns.countplot(
-                data=df,
-                x="vader_label",
-                order=["negativo", "neutro", "positivo"],
-                ax=ax,
-            )
-            ax.set_title("Distribuição de sentimentos (VADER)")
-            st.pyplot(fig)
-
-        # ---------------- BERT ----------------
-        with tab_bert:
-            st.subheader("🤖 Distribuição BERT")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Negativos", int(resumo["bert"]["counts"]["negativo"]))
-            col2.metric("Neutros", int(resumo["bert"]["counts"]["neutro"]))
-            col3.metric("Positivos", int(resumo["bert"]["counts"]["positivo"]))
-
-            fig2, ax2 = plt.subplots()
-            sns.countplot(
-                data=df,
-                x="bert_label",
-                order=["negativo", "neutro", "positivo"],
-                ax=ax2,
-            )
-            ax2.set_title("Distribuição de sentimentos (BERT)")
-            st.pyplot(fig2)
-
-        # ---------------- Comentários ----------------
-        with tab_comentarios:
-            st.subheader("💬 Comentários classificados")
-            filtro_sent = st.selectbox(
-                "Filtrar por sentimento (BERT):",
-                ["Todos", "positivo", "neutro", "negativo"],
-            )
-            df_filtrado = df
-            if filtro_sent != "Todos":
-                df_filtrado = df[df["bert_label"] == filtro_sent]
-
-            st.dataframe(
-                df_filtrado[["video_id", "author", "comment", "vader_label", "bert_label"]],
-                use_container_width=True,
-            )
-
-        # ---------------- Insights ----------------
-        with tab_insights:
-            st.subheader("📊 Insights de texto")
-
-            col_a, col_b = st.columns(2)
-
-            with col_a:
-                st.markdown("*Palavras mais frequentes (geral)*")
-                freq_geral = palavras_mais_frequentes(df, n=20)
-                st.dataframe(freq_geral, use_container_width=True)
-
-            with col_b:
-                st.markdown("*Palavras mais frequentes em comentários negativos (BERT)*")
-                freq_neg = palavras_mais_frequentes(
-                    df,
-                    n=20,
-                    filtro_coluna="bert_label",
-                    filtro_valor="negativo",
-                )
-                st.dataframe(freq_neg, use_container_width=True)
-
-            st.markdown("---")
-            st.markdown("*Top 5 comentários mais positivos (BERT)*")
-            positivos = df[df["bert_label"] == "positivo"].copy()
-            positivos = positivos.sort_values(by="like_count", ascending=False).head(5)
-            st.dataframe(
-                positivos[["video_id", "author", "comment", "like_count"]],
-                use_container_width=True,
-            )
-
-            st.markdown("*Top 5 comentários mais negativos (BERT)*")
-            negativos = df[df["bert_label"] == "negativo"].copy()
-            negativos = negativos.sort_values(by="like_count", ascending=False).head(5)
-            st.dataframe(
-                negativos[["video_id", "author", "comment", "like_count"]],
-                use_container_width=True,
-            )
-
-        # ---------------- Exportação ----------------
-        with tab_export:
-            st.subheader("💾 Exportar dados")
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            nome_arquivo = f"analise_youtube_{ts}.csv"
-
-            csv_bytes = df.to_csv(index=False, encoding="utf-8-sig").encode("utf-8-sig")
-
-            st.download_button(
-                label="⬇ Baixar CSV completo",
-                data=csv_bytes,
-                file_name=nome_arquivo,
-                mime="text/csv",
-            )
-
-            st.info(
-                "O arquivo CSV contém todas as colunas da análise: vídeo, autor, comentário, "
-                "labels de sentimento do VADER e BERT, além de scores numéricos."
-            )
 
+def exibir_diagnostico(diagnostico: dict) -> None:
+    """Tempo, API, quota, cache e memória de cada etapa da análise."""
+    totais = diagnostico["totais"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Tempo total", f"{totais['tempo_total_s']:.1f}s")
+    col2.metric("Chamadas à API", totais["chamadas_api"])
+    col3.metric("Quota gasta (unidades)", totais["quota_unidades"])
+    pico = totais["pico_memoria_mb"]
+    col4.metric("Pico de memória", f"{pico:.0f} MB" if pico is not None else "—")
+
+    st.dataframe(diagnostico["etapas"], use_container_width=True)
+    st.caption(
+        "A coleta roda em paralelo com a limpeza e os modelos; por isso a soma das "
+        "etapas pode passar do tempo total. Chamadas e quota contam todas as sessões do servidor."
+    )
+
+    with st.expander("Métricas no formato Prometheus"):
+        st.code(diagnostico["prometheus"], language="text")
+
+
+# ============================================================
+#   LÓGICA PRINCIPAL
+# ============================================================
+cache_resultados = obter_cache_resultados()
+executor_tarefas = obter_executor_tarefas()
+
+if iniciar:
+    if not link_input.strip():
+        st.error("Informe um link de vídeo ou canal do YouTube.")
+        st.stop()
+
+    chave = (link_input.strip(), modo_analise, criterio_videos, max_videos, max_comments, roteamento, incremental)
+    st.session_state["chave_analise"] = chave
+    if forcar_atualizacao:
+        cache_resultados.descartar(chave)
+    if cache_resultados.obter(chave) is None:
+        # Pedidos iguais de outras sessões ainda em andamento viram a mesma tarefa
+        tarefa_id = executor_tarefas.submeter(parametros_analise(link_input.strip()))
+        st.session_state["tarefa_id"] = tarefa_id
+        st.query_params["tarefa"] = tarefa_id
+    else:
+        st.session_state.pop("tarefa_id", None)
+        st.query_params.pop("tarefa", None)
+elif "chave_analise" not in st.session_state and "tarefa" in st.query_params:
+    # Endereço com ?tarefa=<id>: reabre a análise ao entrar na página
+    abrir_tarefa(st.query_params["tarefa"])
+
+# A análise da sessão continua visível nos reruns (filtros, troca de abas)
+chave_sessao = st.session_state.get("chave_analise")
+tarefa_sessao = st.session_state.get("tarefa_id")
+resultado_sessao = cache_resultados.obter(chave_sessao) if chave_sessao else None
+
+if resultado_sessao is None and tarefa_sessao:
+    tarefa = executor_tarefas.tabela.obter(tarefa_sessao)
+    if tarefa is None:
+        st.error(f"❌ Análise {tarefa_sessao} não encontrada.")
+    elif tarefa["estado"] in ESTADOS_ATIVOS:
+        acompanhar_tarefa(tarefa_sessao)
+    elif tarefa["estado"] == "erro":
+        st.error(f"❌ Erro ao processar: {tarefa['erro']}")
+    elif tarefa["estado"] == "cancelada":
+        st.warning("⏹ Esta análise foi cancelada antes de terminar. Clique em Coletar e Analisar novamente.")
+    else:
+        resultado_sessao = carregar_resultado(tarefa)
+        if resultado_sessao is None:
+            st.info("O resultado desta análise já foi removido. Clique em Coletar e Analisar novamente.")
+        elif resultado_sessao["df"] is None:
+            st.warning("Nenhum comentário encontrado para os vídeos selecionados.")
+            resultado_sessao = None
+        else:
+            cache_resultados.guardar(chave_sessao, resultado_sessao)
+
+if resultado_sessao is not None:
+    try:
+        exibir_resultado(resultado_sessao)
     except Exception as e:
-        st.error(f"❌ Erro ao processar: {e}")
-        
+        st.error(f"❌ Erro ao exibir resultados: {e}")
+elif chave_sessao and not tarefa_sessao:
+    st.info("A análise anterior expirou do cache. Clique em Coletar e Analisar novamente.")
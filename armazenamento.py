@@ -0,0 +1,148 @@
+import io
+import os
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# Tentativa de importar PyArrow (Parquet)
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.dataset as ds  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Raiz dos datasets Parquet particionados (um subdiretório por tipo de dado)
+DIR_PARQUET = os.getenv("YT_DIR_PARQUET", os.path.join("data", "parquet"))
+
+# Colunas com poucos valores distintos: gravadas com dicionário (categorias)
+COLUNAS_DICIONARIO = [
+    "video_id",
+    "vader_label",
+    "bert_label_raw",
+    "bert_label",
+    "idioma",
+]
+
+PARTICOES = ["canal_id", "data"]
+
+
+# ============================================================
+#   ESCRITA
+# ============================================================
+def _exigir_parquet() -> None:
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("pyarrow não está instalado; instale-o para usar o armazenamento Parquet.")
+
+
+def salvar_parquet(
+    df: pd.DataFrame,
+    canal_id: str,
+    tipo: str = "analises",
+    data: Optional[str] = None,
+    raiz: str = DIR_PARQUET,
+) -> str:
+    """
+    Grava o DataFrame como Parquet particionado por canal e data
+    (raiz/tipo/canal_id=.../data=AAAA-MM-DD/<arquivo>.parquet).
+
+    'tipo' separa os datasets (ex.: 'comentarios' para a coleta bruta e
+    'analises' para as linhas já pontuadas). Cada chamada cria um arquivo novo
+    dentro da partição, sem reescrever o que já existe. Devolve a pasta do dataset.
+    """
+    _exigir_parquet()
+    destino = os.path.join(raiz, tipo)
+    if df.empty:
+        return destino
+
+    tabela_df = df.copy()
+    tabela_df["canal_id"] = canal_id
+    tabela_df["data"] = data or datetime.now().strftime("%Y-%m-%d")
+    for coluna in COLUNAS_DICIONARIO:
+        if coluna in tabela_df.columns:
+            tabela_df[coluna] = tabela_df[coluna].astype("category")
+
+    tabela = pa.Table.from_pandas(tabela_df, preserve_index=False)
+    ds.write_dataset(
+        tabela,
+        destino,
+        format="parquet",
+        partitioning=PARTICOES,
+        partitioning_flavor="hive",
+        basename_template=f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}_{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return destino
+
+
+# ============================================================
+#   LEITURA
+# ============================================================
+def colunas_parquet(tipo: str = "analises", raiz: str = DIR_PARQUET) -> List[str]:
+    """Colunas do dataset (incluindo as de partição), lidas só do esquema; vazio se não existir."""
+    _exigir_parquet()
+    destino = os.path.join(raiz, tipo)
+    if not os.path.isdir(destino):
+        return []
+    return ds.dataset(destino, format="parquet", partitioning="hive").schema.names
+
+
+def ler_parquet(
+    tipo: str = "analises",
+    colunas: Optional[List[str]] = None,
+    filtros: Optional[List[Tuple[str, str, object]]] = None,
+    raiz: str = DIR_PARQUET,
+) -> pd.DataFrame:
+    """
+    Lê o dataset lendo só as colunas pedidas (projeção) e aplicando os filtros no
+    próprio Parquet (predicate pushdown). Filtros por canal_id/data descartam
+    partições inteiras sem abri-las.
+
+    Exemplo:
+        ler_parquet(colunas=["video_id", "bert_label"],
+                    filtros=[("canal_id", "=", "UC..."), ("data", ">=", "2025-10-01")])
+    """
+    _exigir_parquet()
+    destino = os.path.join(raiz, tipo)
+    if not os.path.isdir(destino):
+        return pd.DataFrame(columns=colunas or [])
+
+    tabela = pq.read_table(destino, columns=colunas, filters=filtros, partitioning="hive")
+    df = tabela.to_pandas()
+    # Partições voltam como categorias; devolvemos texto simples como no CSV
+    for coluna in PARTICOES:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(str)
+    return df
+
+
+# ============================================================
+#   EXPORTAÇÃO CSV EM PARTES
+# ============================================================
+def csv_em_partes(df: pd.DataFrame, linhas_por_parte: int = 50_000) -> Iterator[bytes]:
+    """
+    Gera o CSV (UTF-8 com BOM, como os arquivos do projeto) em blocos de bytes.
+    Só um bloco de texto existe por vez; quem consome decide se grava os blocos
+    num arquivo/resposta à medida que chegam ou se os junta.
+    """
+    yield "\ufeff".encode("utf-8")
+    for inicio in range(0, max(len(df), 1), linhas_por_parte):
+        parte = df.iloc[inicio : inicio + linhas_por_parte]
+        buffer = io.StringIO()
+        parte.to_csv(buffer, index=False, header=(inicio == 0))
+        yield buffer.getvalue().encode("utf-8")
+
+
+def arquivo_csv(df: pd.DataFrame) -> bytes:
+    """
+    CSV completo em bytes, pronto para o st.download_button.
+
+    O arquivo inteiro fica na memória: o Streamlit guarda o conteúdo do download
+    no servidor (MediaFileManager) e não aceita um gerador, então não há como
+    transmiti-lo em partes. Montar a partir de csv_em_partes evita apenas as
+    cópias intermediárias (texto inteiro + bytes inteiros) do to_csv direto.
+    """
+    return b"".join(csv_em_partes(df))
@@ -0,0 +1,345 @@
+"""
+Servidor local que imita a YouTube Data API v3 para os benchmarks da coleta.
+
+Três modos de resposta:
+  - sintético: as páginas são montadas a partir de um corpus de comentários
+    (ex.: os CSVs gravados do repositório), com IDs e datas determinísticos;
+  - gravação: com 'gravar_em', cada resposta servida é salva em JSON
+    (pasta/<recurso>/<hash dos parâmetros>.json); com 'origem', as requisições
+    são repassadas à API real e as respostas dela é que são gravadas. Ao parar,
+    o servidor grava pasta/manifesto.json com os vídeos e o handle consultados;
+  - reprodução: com 'pasta', as respostas gravadas são devolvidas tal como estão
+    (os vídeos vêm do manifesto ou, sem ele, das respostas de commentThreads).
+
+Em todos os modos é possível acrescentar latência fixa + jitter por requisição,
+e o servidor conta as chamadas por recurso.
+
+Uso típico:
+    with ApiSimulada.de_textos(textos, n_videos=20, latencia_ms=30) as api:
+        definir_cliente(ClienteYouTube(api_key="bench", base_url=api.base_url))
+        ...
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+CANAL_ID = "UCbenchmarkbenchmark0001"
+MANIFESTO = "manifesto.json"
+HANDLE = "canalbenchmark"
+DATA_BASE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _iso(momento: datetime) -> str:
+    return momento.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def chave_requisicao(params: Dict[str, str]) -> str:
+    """Identifica uma requisição pelos parâmetros (sem a API key)."""
+    texto = urlencode(sorted((k, v) for k, v in params.items() if k != "key"))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class ApiSimulada:
+    def __init__(
+        self,
+        comentarios_por_video: Dict[str, List[str]],
+        canal_id: str = CANAL_ID,
+        handle: str = HANDLE,
+        latencia_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        pasta: Optional[str] = None,
+        gravar_em: Optional[str] = None,
+        origem: Optional[str] = None,
+        semente: int = 0,
+    ):
+        self.comentarios_por_video = comentarios_por_video
+        self.video_ids = list(comentarios_por_video)
+        self._posicao = {v: i for i, v in enumerate(self.video_ids)}
+        self.canal_id = canal_id
+        self.handle = handle
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.pasta = pasta
+        self.gravar_em = gravar_em
+        self.origem = origem.rstrip("/") if origem else None
+        self.chamadas: Counter = Counter()
+        self._gravados: Dict[str, set] = {"video_ids": set(), "handles": set()}
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._servidor: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def de_textos(cls, textos: List[str], n_videos: int = 20, **kwargs) -> "ApiSimulada":
+        """Distribui os textos em n_videos vídeos sintéticos (fatias contíguas)."""
+        n_videos = max(1, min(n_videos, len(textos) or 1))
+        por_video = -(-len(textos) // n_videos) if textos else 0
+        videos = {
+            f"vid{i:08d}": list(textos[i * por_video : (i + 1) * por_video])
+            for i in range(n_videos)
+        }
+        return cls(videos, **kwargs)
+
+    @classmethod
+    def de_pasta(cls, pasta: str, **kwargs) -> "ApiSimulada":
+        """
+        Apenas reproduz as respostas gravadas em 'pasta'. Os vídeos (e o handle)
+        vêm do manifesto da gravação; sem ele, os vídeos são lidos do videoId das
+        respostas de commentThreads gravadas.
+        """
+        manifesto = os.path.join(pasta, MANIFESTO)
+        if os.path.exists(manifesto):
+            with open(manifesto, encoding="utf-8") as f:
+                dados = json.load(f)
+            video_ids, handle = dados.get("video_ids", []), dados.get("handle")
+        else:
+            video_ids, handle = cls.videos_gravados(pasta), None
+        if handle:
+            kwargs.setdefault("handle", handle)
+        api = cls({}, pasta=pasta, **kwargs)
+        api.video_ids = list(video_ids)
+        return api
+
+    @staticmethod
+    def videos_gravados(pasta: str) -> List[str]:
+        """IDs dos vídeos presentes nas respostas de commentThreads gravadas em 'pasta'."""
+        video_ids = set()
+        destino = os.path.join(pasta, "commentThreads")
+        for nome in sorted(os.listdir(destino)) if os.path.isdir(destino) else []:
+            if not nome.endswith(".json"):
+                continue
+            with open(os.path.join(destino, nome), encoding="utf-8") as f:
+                itens = json.load(f).get("items", [])
+            video_ids.update(i["snippet"]["videoId"] for i in itens if i.get("snippet", {}).get("videoId"))
+        return sorted(video_ids)
+
+    # --------------------------------------------------------
+    #   Ciclo de vida
+    # --------------------------------------------------------
+    @property
+    def base_url(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self) -> "ApiSimulada":
+        api = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como na API real
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # noqa: N802
+                partes = urlsplit(self.path)
+                recurso = partes.path.strip("/").split("/")[-1]
+                params = dict(parse_qsl(partes.query))
+                status, corpo = api.responder(recurso, params)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._servidor.daemon_threads = True
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        if self.gravar_em and self._gravados["video_ids"]:
+            self._gravar_manifesto()
+
+    def _gravar_manifesto(self) -> None:
+        """Acrescenta ao manifesto da pasta os vídeos e o handle desta gravação."""
+        caminho = os.path.join(self.gravar_em, MANIFESTO)
+        anterior: Dict = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                anterior = json.load(f)
+        handles = sorted(self._gravados["handles"])
+        manifesto = {
+            "video_ids": sorted(set(anterior.get("video_ids", [])) | self._gravados["video_ids"]),
+            "handle": handles[0] if handles else anterior.get("handle"),
+        }
+        os.makedirs(self.gravar_em, exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self) -> "ApiSimulada":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
+
+    # --------------------------------------------------------
+    #   Respostas
+    # --------------------------------------------------------
+    def _esperar(self) -> None:
+        if not (self.latencia_ms or self.jitter_ms):
+            return
+        with self._lock:
+            jitter = self._aleatorio.uniform(0, self.jitter_ms)
+        time.sleep((self.latencia_ms + jitter) / 1000)
+
+    def responder(self, recurso: str, params: Dict[str, str]) -> Tuple[int, bytes]:
+        with self._lock:
+            self.chamadas[recurso] += 1
+        self._esperar()
+
+        chave = chave_requisicao(params)
+        if self.pasta:
+            caminho = os.path.join(self.pasta, recurso, f"{chave}.json")
+            if not os.path.exists(caminho):
+                return 404, self._erro(404, f"Resposta não gravada: {recurso} ({chave})")
+            with open(caminho, "rb") as f:
+                return 200, f.read()
+
+        if self.origem:
+            try:
+                with urlopen(f"{self.origem}/{recurso}?{urlencode(params)}") as resp:
+                    status, corpo = resp.status, resp.read()
+            except HTTPError as erro:
+                status, corpo = erro.code, erro.read()
+        else:
+            gerador = getattr(self, f"_{recurso}", None)
+            if gerador is None:
+                return 404, self._erro(404, f"Recurso não simulado: {recurso}")
+            status, corpo = 200, json.dumps(gerador(params), ensure_ascii=False).encode("utf-8")
+
+        if self.gravar_em and status == 200:
+            with self._lock:
+                if recurso == "commentThreads" and params.get("videoId"):
+                    self._gravados["video_ids"].add(params["videoId"])
+                if recurso == "channels" and params.get("forHandle"):
+                    self._gravados["handles"].add(params["forHandle"].lstrip("@"))
+            pasta = os.path.join(self.gravar_em, recurso)
+            os.makedirs(pasta, exist_ok=True)
+            with open(os.path.join(pasta, f"{chave}.json"), "wb") as f:
+                f.write(corpo)
+        return status, corpo
+
+    @staticmethod
+    def _erro(codigo: int, mensagem: str) -> bytes:
+        return json.dumps({"error": {"code": codigo, "message": mensagem, "errors": []}}).encode("utf-8")
+
+    @staticmethod
+    def _pagina(itens: List, params: Dict[str, str], maximo: int) -> Tuple[List, Dict]:
+        inicio = int(params.get("pageToken") or 0)
+        tamanho = min(int(params.get("maxResults", maximo)), maximo)
+        extra = {"nextPageToken": str(inicio + tamanho)} if inicio + tamanho < len(itens) else {}
+        return itens[inicio : inicio + tamanho], extra
+
+    def _data_video(self, video_id: str) -> datetime:
+        return DATA_BASE + timedelta(days=self._posicao.get(video_id, 0))
+
+    def _snippet_video(self, video_id: str) -> Dict:
+        return {
+            "channelId": self.canal_id,
+            "title": f"Vídeo {video_id}",
+            "publishedAt": _iso(self._data_video(video_id)),
+        }
+
+    def _estatisticas_video(self, video_id: str) -> Dict:
+        n = len(self.comentarios_por_video.get(video_id, []))
+        return {"viewCount": str(n * 37 + 1000), "likeCount": str(n * 3), "commentCount": str(n)}
+
+    # Um método por recurso da API (nome = _<recurso>)
+    def _commentThreads(self, params: Dict[str, str]) -> Dict:  # noqa: N802
+        video_id = params.get("videoId", "")
+        textos = self.comentarios_por_video.get(video_id, [])
+        itens, extra = self._pagina(list(range(len(textos))), params, 100)
+        fim = self._data_video(video_id) + timedelta(days=30)
+        items = []
+        for i in itens:
+            # Mais recentes primeiro, como em order=time
+            comment_id = f"{video_id}.c{i:07d}"
+            items.append(
+                {
+                    "id": comment_id,
+                    "snippet": {
+                        "videoId": video_id,
+                        "topLevelComment": {
+                            "id": comment_id,
+                            "snippet": {
+                                "authorDisplayName": f"@autor{i % 997}",
+                                "textDisplay": textos[i],
+                                "likeCount": i % 50,
+                                "publishedAt": _iso(fim - timedelta(minutes=i)),
+                            },
+                        },
+                    },
+                }
+            )
+        return {"kind": "youtube#commentThreadListResponse", "items": items, **extra}
+
+    def _search(self, params: Dict[str, str]) -> Dict:
+        if params.get("type") == "channel":
+            return {"items": [{"snippet": {"channelId": self.canal_id, "title": self.handle}}]}
+        ordem = list(self.video_ids)
+        if params.get("order") == "viewCount":
+            ordem.sort(key=lambda v: int(self._estatisticas_video(v)["viewCount"]), reverse=True)
+        else:
+            ordem.reverse()
+        itens, extra = self._pagina(ordem, params, 50)
+        items = [{"id": {"kind": "youtube#video", "videoId": v}, "snippet": self._snippet_video(v)} for v in itens]
+        return {"items": items, **extra}
+
+    def _videos(self, params: Dict[str, str]) -> Dict:
+        partes = params.get("part", "snippet").split(",")
+        items = []
+        for v in params.get("id", "").split(",")[:50]:
+            if v not in self.comentarios_por_video:
+                continue
+            item: Dict = {"id": v}
+            if "snippet" in partes:
+                item["snippet"] = self._snippet_video(v)
+            if "statistics" in partes:
+                item["statistics"] = self._estatisticas_video(v)
+            items.append(item)
+        return {"items": items}
+
+    def _channels(self, params: Dict[str, str]) -> Dict:
+        nome = (params.get("forHandle") or params.get("forUsername") or "").lstrip("@")
+        if nome and nome.lower() != self.handle.lower():
+            return {"items": []}
+        if params.get("id") and params["id"] != self.canal_id:
+            return {"items": []}
+        return {
+            "items": [
+                {
+                    "id": self.canal_id,
+                    "contentDetails": {"relatedPlaylists": {"uploads": "UU" + self.canal_id[2:]}},
+                    "statistics": {"videoCount": str(len(self.video_ids))},
+                }
+            ]
+        }
+
+    def _playlistItems(self, params: Dict[str, str]) -> Dict:  # noqa: N802
+        itens, extra = self._pagina(list(reversed(self.video_ids)), params, 50)
+        items = []
+        for v in itens:
+            snippet = self._snippet_video(v)
+            items.append(
+                {
+                    "snippet": {**snippet, "resourceId": {"kind": "youtube#video", "videoId": v}},
+                    "contentDetails": {"videoId": v, "videoPublishedAt": snippet["publishedAt"]},
+                }
+            )
+        return {"items": items, **extra}
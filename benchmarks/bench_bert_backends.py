@@ -0,0 +1,109 @@
+"""
+Backends do BERT (pytorch, onnx, onnx-int8): concordância e desempenho.
+
+1) Concordância: rótulos de cada backend, obtidos pelo mesmo caminho do
+   aplicar_bert (_classificar_textos), comparados com os do PyTorch em
+   comentarios_sentimentos_pt.csv (estrelas exatas e sentimento em 3 classes),
+   e com a coluna 'label' gravada no próprio CSV.
+2) Desempenho: latência por lote (p50/p95) e vazão em textos/s.
+3) Vazão por faixa de comprimento em tokens no caminho usado pelo aplicar_bert
+   (truncagem prévia + lotes agrupados por faixa).
+
+O cache de scores é desligado para medir só a inferência.
+
+Uso:
+    python benchmarks/bench_bert_backends.py [--backends pytorch onnx onnx-int8] [--repeticoes 3]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from corpus import RAIZ
+
+os.environ["SENTIMENTO_CACHE"] = "0"
+
+import pandas as pd  # noqa: E402
+
+from analise import (  # noqa: E402
+    BERT_BACKENDS,
+    BERT_BATCH_SIZE,
+    BERT_MAX_LENGTH,
+    _classificar_textos,
+    limpar_textos,
+)
+
+
+def estrelas_para_sentimento(rotulo: str) -> str:
+    estrelas = int(rotulo.split()[0])
+    if estrelas <= 2:
+        return "negativo"
+    if estrelas == 3:
+        return "neutro"
+    return "positivo"
+
+
+def rotular(backend: str, textos, batch_size: int):
+    """Rótulos pelo caminho de produção (truncagem prévia + lotes por faixa), lote a lote."""
+    latencias = []
+    rotulos = []
+    for i in range(0, len(textos), batch_size):
+        lote = textos[i : i + batch_size]
+        inicio = time.perf_counter()
+        rotulos.extend(
+            _classificar_textos(lote, batch_size=batch_size, max_length=BERT_MAX_LENGTH, backend=backend)
+        )
+        latencias.append(time.perf_counter() - inicio)
+    return rotulos, latencias
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BERT_BACKENDS, default=list(BERT_BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=BERT_BATCH_SIZE)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_csv(os.path.join(RAIZ, "comentarios_sentimentos_pt.csv"), encoding="utf-8-sig")
+    textos = limpar_textos(base["comentario"]).tolist()
+    gravados = base["label"].tolist()
+
+    # O PyTorch roda primeiro para servir de referência aos demais
+    referencia = None
+    for backend in sorted(args.backends, key=lambda b: b != "pytorch"):
+        _classificar_textos(["aquecimento"], backend=backend)
+
+        latencias = []
+        for _ in range(args.repeticoes):
+            rotulos, lat = rotular(backend, textos, args.batch_size)
+            latencias.extend(lat)
+        if backend == "pytorch":
+            referencia = rotulos
+
+        total = sum(latencias) / args.repeticoes
+        linha = (
+            f"{backend:>10} | lote p50: {percentil(latencias, 50) * 1000:7.1f} ms "
+            f"| p95: {percentil(latencias, 95) * 1000:7.1f} ms | vazão: {len(textos) / total:7.1f} textos/s"
+            f" | = CSV gravado: {statistics.mean(a == b for a, b in zip(rotulos, gravados)) * 100:5.1f}%"
+        )
+        if referencia is not None:
+            exatos = statistics.mean(a == b for a, b in zip(rotulos, referencia))
+            sentimento = statistics.mean(
+                estrelas_para_sentimento(a) == estrelas_para_sentimento(b) for a, b in zip(rotulos, referencia)
+            )
+            linha += f" | = PyTorch: {exatos * 100:5.1f}% (estrelas), {sentimento * 100:5.1f}% (sentimento)"
+        print(linha)
+
+        faixas = {}
+        _classificar_textos(textos, batch_size=args.batch_size, backend=backend, estatisticas=faixas)
+        for faixa, est in sorted(faixas.items()):
+            print(f"{'':>10}   ≤{faixa:>3} tokens: {est['textos']:6d} textos | {est['textos_por_s']:7.1f} textos/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Detecção de idioma: detectar_idiomas (lote + deduplicação + cache + processos)
+contra a linha de base dos notebooks (langdetect.detect comentário a comentário).
+
+Uso:
+    python benchmarks/bench_idioma.py [--tamanhos 1000 10000 100000] [--processos N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from corpus import corpus_tamanho
+
+# Cache isolado: a medição "fria" não pode reaproveitar execuções anteriores
+os.environ["YT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_idioma_")
+
+import pandas as pd  # noqa: E402
+from langdetect import DetectorFactory, detect  # noqa: E402
+
+from analise import detectar_idiomas, limpar_textos  # noqa: E402
+
+
+def linha_de_base(textos):
+    DetectorFactory.seed = 0
+    saida = []
+    for t in textos:
+        try:
+            saida.append(detect(t))
+        except Exception:
+            saida.append("indefinido")
+    return saida
+
+
+def medir(tamanhos, n_processos):
+    for n in tamanhos:
+        df = pd.DataFrame({"texto_limpo": limpar_textos(corpus_tamanho(n, semente=n))})
+
+        inicio = time.perf_counter()
+        linha_de_base(df["texto_limpo"].tolist())
+        t_base = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        detectar_idiomas(df, n_processos=n_processos)
+        t_frio = time.perf_counter() - inicio
+        dedup = df.attrs["deduplicacao"]["idioma"]
+
+        inicio = time.perf_counter()
+        detectar_idiomas(df, n_processos=n_processos)
+        t_quente = time.perf_counter() - inicio
+
+        print(
+            f"{n:>8} textos ({dedup['textos_unicos']} únicos) | por comentário: {n / t_base:9.0f}/s "
+            f"| lote (cache frio): {n / t_frio:9.0f}/s | lote (cache quente): {n / t_quente:9.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+    medir(args.tamanhos, args.processos)
@@ -0,0 +1,201 @@
+"""
+Tempo de importação "a frio" de cada módulo do projeto (python -X importtime).
+
+Cada módulo é importado num processo novo, 'repeticoes' vezes; são reportados a
+mediana do tempo acumulado do import, o RSS ao final, os pacotes mais pesados
+puxados por ele e se algum módulo pesado que deveria ser carregado só no
+primeiro uso (streamlit, transformers/torch, VADER, langdetect, gráficos) entrou
+já na importação.
+
+Cada módulo tem uma meta em ms (METAS). O piso de quase todos é o pandas, que
+sozinho leva algumas centenas de ms. O script sai com código 1 se alguma meta
+for estourada ou algum módulo proibido for carregado, o que permite usá-lo como
+verificação. O resultado vai para um JSON em benchmarks/resultados, que pode
+ser comparado com o de outro commit.
+
+Uso:
+    python benchmarks/bench_importacao.py [--modulos coleta analise] [--repeticoes 5]
+    python benchmarks/bench_importacao.py --comparar resultados/importacao_<anterior>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+# Meta de importação a frio (ms) por módulo; app.py fica de fora (é o script do Streamlit)
+METAS = {
+    "cache": 50,
+    "quota": 50,
+    "instrumentacao": 800,
+    "armazenamento": 900,
+    "coleta": 1000,
+    "analise": 900,
+    "agregados": 900,
+    "pipeline": 1200,
+    "tarefas": 900,
+    "executar_lote": 1300,
+}
+
+# Pacotes que nenhum desses módulos deve carregar só por ser importado
+PROIBIDOS = ("streamlit", "transformers", "torch", "vaderSentiment", "langdetect", "matplotlib", "seaborn")
+
+_CODIGO = """
+import {modulo}
+try:
+    import resource
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+except ImportError:
+    pass
+"""
+
+
+def _ler_importtime(saida: str) -> List[Dict]:
+    """Linhas do -X importtime: [{'nome', 'nivel', 'proprio_us', 'acumulado_us'}, ...]."""
+    linhas = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        proprio, acumulado, nome = linha.split(":", 1)[1].split("|")
+        if not proprio.strip().isdigit():
+            continue  # cabeçalho
+        recuo = len(nome) - len(nome.lstrip())
+        linhas.append(
+            {
+                "nome": nome.strip(),
+                "nivel": (recuo - 1) // 2,
+                "proprio_us": int(proprio),
+                "acumulado_us": int(acumulado),
+            }
+        )
+    return linhas
+
+
+def medir_modulo(modulo: str, repeticoes: int) -> Dict:
+    env = {**os.environ, "PYTHONPATH": RAIZ}
+    tempos_ms: List[float] = []
+    rss_mb: List[float] = []
+    pesados: Dict[str, int] = {}
+    carregados: set = set()
+    for _ in range(repeticoes):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _CODIGO.format(modulo=modulo)],
+            cwd=RAIZ,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            erro = (proc.stderr.strip().splitlines() or ["?"])[-1]
+            return {"modulo": modulo, "erro": erro}
+
+        linhas = _ler_importtime(proc.stderr)
+        # Descarta o que o interpretador importa na inicialização (site e dependências)
+        inicio = next((i + 1 for i, l in enumerate(linhas) if l["nome"] == "site" and l["nivel"] == 0), 0)
+        linhas = linhas[inicio:]
+        raiz = next(l for l in reversed(linhas) if l["nome"] == modulo and l["nivel"] == 0)
+        tempos_ms.append(raiz["acumulado_us"] / 1000)
+        if proc.stdout.strip():
+            # ru_maxrss vem em KB no Linux e em bytes no macOS
+            rss = int(proc.stdout.split()[-1])
+            rss_mb.append(rss / 1024 / 1024 if platform.system() == "Darwin" else rss / 1024)
+        for l in linhas:
+            pacote = l["nome"].split(".")[0]
+            carregados.add(pacote)
+            if pacote != modulo:
+                pesados[pacote] = max(pesados.get(pacote, 0), l["acumulado_us"])
+
+    mediana = statistics.median(tempos_ms)
+    return {
+        "modulo": modulo,
+        "importacao_ms": mediana,
+        "tempos_ms": tempos_ms,
+        "meta_ms": METAS.get(modulo),
+        "dentro_da_meta": METAS.get(modulo) is None or mediana <= METAS[modulo],
+        "rss_mb": statistics.median(rss_mb) if rss_mb else None,
+        "mais_pesados": {
+            p: round(us / 1000, 1) for p, us in sorted(pesados.items(), key=lambda i: -i[1])[:4]
+        },
+        "proibidos": sorted(p for p in PROIBIDOS if p in carregados),
+    }
+
+
+def imprimir(r: Dict) -> None:
+    if "erro" in r:
+        print(f"{r['modulo']:>15} | erro: {r['erro']}")
+        return
+    situacao = "ok" if r["dentro_da_meta"] and not r["proibidos"] else "FALHOU"
+    pesados = ", ".join(f"{p} {ms:.0f}" for p, ms in r["mais_pesados"].items())
+    linha = (
+        f"{r['modulo']:>15} | {r['importacao_ms']:7.1f} ms (meta {r['meta_ms'] or '-':>5}) "
+        f"| RSS {r['rss_mb'] or 0:6.1f} MB | {situacao:>6} | mais pesados (ms): {pesados}"
+    )
+    if r["proibidos"]:
+        linha += f" | carregou: {', '.join(r['proibidos'])}"
+    print(linha)
+
+
+def comparar(anterior: Dict, atual: Dict) -> None:
+    """Razão atual/anterior do tempo de importação e do RSS (<1 é melhor)."""
+    base = {r["modulo"]: r for r in anterior["resultados"] if "erro" not in r}
+    print(f"\nComparação {anterior.get('commit') or '?'} -> {atual.get('commit') or '?'}")
+    for r in atual["resultados"]:
+        b = base.get(r["modulo"])
+        if b is None or "erro" in r:
+            continue
+        rss = r["rss_mb"] / b["rss_mb"] if r.get("rss_mb") and b.get("rss_mb") else float("nan")
+        print(f"{r['modulo']:>15} | importação x{r['importacao_ms'] / b['importacao_ms']:5.2f} | RSS x{rss:5.2f}")
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulos", nargs="+", default=list(METAS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", default=DIR_RESULTADOS, help="pasta dos JSON de resultado")
+    parser.add_argument("--comparar", metavar="JSON", help="resultado anterior para comparar")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for modulo in args.modulos:
+        resultado = medir_modulo(modulo, args.repeticoes)
+        imprimir(resultado)
+        resultados.append(resultado)
+
+    relatorio = {
+        "commit": _commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+        "resultados": resultados,
+    }
+    os.makedirs(args.saida, exist_ok=True)
+    caminho = os.path.join(args.saida, f"importacao_{datetime.now():%Y%m%d_%H%M%S}_{relatorio['commit'] or 'sem_git'}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\n📦 Resultados salvos em {caminho}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), relatorio)
+
+    falhas = [r for r in resultados if "erro" in r or not r["dentro_da_meta"] or r["proibidos"]]
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Limpeza de texto: microbenchmark.
+
+Mede limpar_texto aplicada linha a linha (apply), a versão vetorizada em dtype
+object (fallback sem pyarrow) e limpar_textos (pyarrow.compute) em 10k, 100k e
+1M comentários. A equivalência byte a byte das três é verificada em
+tests/test_analise.py.
+
+Uso:
+    python benchmarks/bench_limpeza.py [--tamanhos 10000 100000 1000000]
+"""
+import argparse
+import time
+
+from corpus import corpus_tamanho
+
+from analise import _limpar_textos_object, limpar_texto, limpar_textos
+
+
+def _cronometrar(funcao, serie) -> float:
+    inicio = time.perf_counter()
+    funcao(serie)
+    return time.perf_counter() - inicio
+
+
+def medir(tamanhos):
+    for n in tamanhos:
+        serie = corpus_tamanho(n)
+        t_apply = _cronometrar(lambda s: s.apply(limpar_texto), serie)
+        t_object = _cronometrar(_limpar_textos_object, serie)
+        t_arrow = _cronometrar(limpar_textos, serie)
+        print(
+            f"{n:>9} comentários | apply: {t_apply:8.3f}s | object: {t_object:8.3f}s "
+            f"| pyarrow: {t_arrow:8.3f}s | speedup: {t_apply / t_arrow:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    medir(args.tamanhos)
@@ -0,0 +1,348 @@
+"""
+Suíte de benchmarks dos caminhos quentes da coleta e da análise.
+
+Etapas:
+  limpeza   preprocessar_textos
+  idioma    detectar_idiomas (sem cache)
+  vader     aplicar_vader (sem cache)
+  bert      aplicar_bert (sem cache; só se o transformers estiver instalado)
+  palavras  IndicePalavras: montagem + top 20 (todas as linhas e só as negativas)
+  canal     extrair_channel_id + listar_videos_recentes contra a API simulada
+  coleta    coletar_comentarios_multiplos_videos contra a API simulada
+
+Cada combinação (etapa, tamanho) roda num processo novo, para que o pico de
+memória (RSS) seja só daquela etapa. Para cada uma são reportados a vazão
+(itens/s), a latência p50/p95 das repetições (e, na coleta, de cada requisição)
+e o pico de RSS. O resultado vai para um JSON com o commit atual, que pode ser
+comparado com o de outro commit.
+
+A API simulada (api_simulada.py) monta as páginas a partir do mesmo corpus,
+com latência configurável; com --gravacoes, reproduz respostas JSON gravadas.
+
+Uso:
+    python benchmarks/bench_suite.py [--etapas limpeza vader coleta] [--tamanhos 1000 10000 100000]
+                                     [--corpus gravado|sintetico] [--latencia-ms 20]
+    python benchmarks/bench_suite.py --comparar resultados/<anterior>.json            # roda e compara
+    python benchmarks/bench_suite.py --comparar resultados/<a>.json resultados/<b>.json  # só compara
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from corpus import RAIZ, corpus
+
+# Caches isolados e desligados: cada medição é "fria" e só mede o cálculo.
+# Definido no topo do módulo para valer também nos processos filhos (spawn).
+os.environ.setdefault("YT_CACHE_DIR", tempfile.mkdtemp(prefix="bench_suite_"))
+os.environ["SENTIMENTO_CACHE"] = "0"
+os.environ.setdefault("YOUTUBE_API_KEY", "benchmark")
+# A API simulada não gasta quota de verdade: contabiliza à parte e sem limite
+os.environ["YT_QUOTA_DIARIA"] = "0"
+os.environ["YT_LIVRO_QUOTA"] = os.path.join(os.environ["YT_CACHE_DIR"], "quota.sqlite")
+
+try:
+    import resource  # type: ignore  # indisponível no Windows
+except ImportError:
+    resource = None
+
+ETAPAS = ["limpeza", "idioma", "vader", "bert", "palavras", "canal", "coleta"]
+ETAPAS_API = {"canal", "coleta"}
+DIR_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+
+# ============================================================
+#   MEMÓRIA
+# ============================================================
+def _zerar_pico_rss() -> bool:
+    """Zera o pico de RSS do processo (Linux: VmHWM); devolve False se não der."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb(campo: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    if campo == "VmHWM" and resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+# ============================================================
+#   ETAPAS (executadas no processo filho)
+# ============================================================
+def _preparar(etapa: str, n: int, opcoes: Dict) -> Tuple[Callable[[], int], Dict]:
+    """Monta a entrada da etapa e devolve (função que roda a etapa e devolve nº de itens, extras)."""
+    import pandas as pd
+
+    import analise
+    import coleta
+
+    extras: Dict = {}
+
+    if etapa in ETAPAS_API:
+        latencias: List[float] = []
+
+        class ClienteCronometrado(coleta.ClienteYouTube):
+            def get(self, recurso, params, limitador=None):
+                inicio = time.perf_counter()
+                try:
+                    return super().get(recurso, params, limitador=limitador)
+                finally:
+                    latencias.append(time.perf_counter() - inicio)
+
+        coleta.definir_cliente(
+            ClienteCronometrado(
+                api_key="benchmark",
+                base_url=opcoes["base_url"],
+                limitador=coleta.LimitadorTaxa(0),
+            )
+        )
+        extras["latencias_requisicao"] = latencias
+
+        if etapa == "canal":
+            def rodar() -> int:
+                coleta._cache_coleta.limpar()
+                canal_id = coleta.extrair_channel_id(f"@{opcoes['handle']}")
+                return len(coleta.listar_videos_recentes(canal_id, max_videos=50))
+            return rodar, extras
+
+        videos = [{"video_id": v} for v in opcoes["video_ids"]]
+        por_video = math.ceil(n / max(1, len(videos)))
+
+        def rodar() -> int:
+            df = coleta.coletar_comentarios_multiplos_videos(
+                videos, por_video, max_workers=opcoes["workers"], requisicoes_por_segundo=0
+            )
+            if df.empty:
+                # Vazão de zero itens não mede nada (ex.: gravações de outros vídeos/parâmetros)
+                raise ValueError(f"a coleta de {len(videos)} vídeos não devolveu nenhum comentário")
+            return len(df)
+        return rodar, extras
+
+    df = pd.DataFrame({"comment": corpus(n, opcoes["corpus"])})
+    if etapa == "limpeza":
+        return lambda: len(analise.preprocessar_textos(df)), extras
+
+    df = analise.preprocessar_textos(df)
+    if etapa == "idioma":
+        return lambda: len(analise.detectar_idiomas(df, usar_cache=False)), extras
+    if etapa == "vader":
+        return lambda: len(analise.aplicar_vader(df, usar_cache=False)), extras
+    if etapa == "bert":
+        if not analise.BERT_AVAILABLE:
+            raise RuntimeError("transformers não instalado")
+        return lambda: len(analise.aplicar_bert(df, usar_cache=False)), extras
+    if etapa == "palavras":
+        # Rótulo fixo e reprodutível (1 em cada 3 linhas 'negativo') para o filtro da aba Insights
+        df["bert_label"] = ["negativo" if i % 3 == 0 else "positivo" for i in range(len(df))]
+
+        def rodar() -> int:
+            # Como na aba Insights: um índice por DataFrame e as duas consultas sobre ele
+            indice = analise.IndicePalavras.de_dataframe(df)
+            indice.top(20)
+            indice.top(20, bert_label="negativo")
+            return len(df)
+        return rodar, extras
+    raise ValueError(f"Etapa desconhecida: {etapa}")
+
+
+def executar_etapa(etapa: str, n: int, opcoes: Dict) -> Dict:
+    """Roda uma etapa 'repeticoes' vezes (após um aquecimento) e resume as medições."""
+    resultado: Dict = {"etapa": etapa, "tamanho": n}
+    try:
+        rodar, extras = _preparar(etapa, n, opcoes)
+    except RuntimeError as erro:
+        return {**resultado, "ignorada": str(erro)}
+
+    rodar()  # aquecimento: imports tardios, modelos, conexões
+    if "latencias_requisicao" in extras:
+        extras["latencias_requisicao"].clear()
+
+    rss_antes = _rss_mb("VmRSS")
+    pico_isolado = _zerar_pico_rss()
+    tempos: List[float] = []
+    itens = 0
+    for _ in range(opcoes["repeticoes"]):
+        inicio = time.perf_counter()
+        itens = rodar()
+        tempos.append(time.perf_counter() - inicio)
+
+    mediana = statistics.median(tempos)
+    resultado.update(
+        {
+            "itens": itens,
+            "itens_por_s": itens / mediana if mediana else None,
+            "p50_s": percentil(tempos, 50),
+            "p95_s": percentil(tempos, 95),
+            "tempos_s": tempos,
+            "rss_antes_mb": rss_antes,
+            "pico_rss_mb": _rss_mb("VmHWM"),
+            # Sem clear_refs o pico é o do processo inteiro (inclui a preparação)
+            "pico_isolado": pico_isolado,
+        }
+    )
+    latencias = extras.get("latencias_requisicao")
+    if latencias:
+        resultado.update(
+            {
+                "requisicoes": len(latencias) // opcoes["repeticoes"],
+                "requisicao_p50_ms": percentil(latencias, 50) * 1000,
+                "requisicao_p95_ms": percentil(latencias, 95) * 1000,
+            }
+        )
+    return resultado
+
+
+# ============================================================
+#   ORQUESTRAÇÃO (processo principal)
+# ============================================================
+def _commit_atual() -> Dict:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=RAIZ, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "alterado": bool(git("status", "--porcelain", "--", "*.py"))}
+
+
+def _api_para(etapa: str, n: int, args: argparse.Namespace):
+    from api_simulada import MANIFESTO, ApiSimulada
+
+    kwargs = {"latencia_ms": args.latencia_ms, "jitter_ms": args.jitter_ms}
+    if args.gravacoes:
+        api = ApiSimulada.de_pasta(args.gravacoes, **kwargs)
+        if etapa == "coleta" and not api.video_ids:
+            raise SystemExit(
+                f"Nenhum vídeo encontrado nas gravações de {args.gravacoes} "
+                f"(sem {MANIFESTO} nem respostas de commentThreads); a etapa coleta não teria o que medir."
+            )
+        return api
+    return ApiSimulada.de_textos(corpus(n, args.corpus).tolist(), n_videos=args.videos, **kwargs)
+
+
+def rodar_suite(args: argparse.Namespace) -> Dict:
+    contexto = multiprocessing.get_context("spawn")
+    resultados = []
+    for etapa in args.etapas:
+        for n in args.tamanhos:
+            opcoes = {"corpus": args.corpus, "repeticoes": args.repeticoes, "workers": args.workers}
+            api = None
+            if etapa in ETAPAS_API:
+                api = _api_para(etapa, n, args).iniciar()
+                opcoes.update({"base_url": api.base_url, "handle": api.handle, "video_ids": api.video_ids})
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                    resultado = executor.submit(executar_etapa, etapa, n, opcoes).result()
+            finally:
+                if api is not None:
+                    api.parar()
+            imprimir(resultado)
+            resultados.append(resultado)
+
+    return {
+        **_commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+        "parametros": {k: v for k, v in vars(args).items() if k not in {"comparar", "saida"}},
+        "resultados": resultados,
+    }
+
+
+def imprimir(r: Dict) -> None:
+    if "ignorada" in r:
+        print(f"{r['etapa']:>9} {r['tamanho']:>9} | ignorada: {r['ignorada']}")
+        return
+    linha = (
+        f"{r['etapa']:>9} {r['tamanho']:>9} | {r['itens_por_s']:12,.0f} itens/s "
+        f"| p50 {r['p50_s'] * 1000:9.1f} ms | p95 {r['p95_s'] * 1000:9.1f} ms "
+        f"| pico RSS {r['pico_rss_mb'] or 0:7.1f} MB"
+    )
+    if "requisicoes" in r:
+        linha += (
+            f" | {r['requisicoes']} req, p50 {r['requisicao_p50_ms']:.1f} ms, p95 {r['requisicao_p95_ms']:.1f} ms"
+        )
+    print(linha)
+
+
+def comparar(anterior: Dict, atual: Dict) -> None:
+    """Razões atual/anterior por (etapa, tamanho): vazão (>1 é melhor), p95 e pico de RSS (<1 é melhor)."""
+    base = {(r["etapa"], r["tamanho"]): r for r in anterior["resultados"] if "ignorada" not in r}
+    print(f"\nComparação {anterior.get('commit') or '?'} -> {atual.get('commit') or '?'}")
+    for r in atual["resultados"]:
+        b = base.get((r["etapa"], r["tamanho"]))
+        if b is None or "ignorada" in r:
+            continue
+
+        def razao(campo):
+            return r[campo] / b[campo] if r.get(campo) and b.get(campo) else float("nan")
+
+        print(
+            f"{r['etapa']:>9} {r['tamanho']:>9} | vazão x{razao('itens_por_s'):5.2f} "
+            f"| p95 x{razao('p95_s'):5.2f} | pico RSS x{razao('pico_rss_mb'):5.2f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=[e for e in ETAPAS if e != "bert"])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="linhas do corpus (até 1.000.000)")
+    parser.add_argument("--corpus", choices=["gravado", "sintetico"], default="gravado")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="latência por requisição da API simulada")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--videos", type=int, default=20, help="vídeos em que o corpus é distribuído na API simulada")
+    parser.add_argument("--workers", type=int, default=4, help="vídeos coletados ao mesmo tempo")
+    parser.add_argument("--gravacoes", help="pasta com respostas JSON gravadas (api_simulada) para reproduzir")
+    parser.add_argument("--saida", default=DIR_RESULTADOS, help="pasta dos JSON de resultado")
+    parser.add_argument("--comparar", nargs="+", metavar="JSON",
+                        help="resultado anterior (e, opcionalmente, o atual, sem rodar nada)")
+    args = parser.parse_args(argv)
+
+    if args.comparar and len(args.comparar) > 1:
+        with open(args.comparar[0], encoding="utf-8") as f1, open(args.comparar[1], encoding="utf-8") as f2:
+            comparar(json.load(f1), json.load(f2))
+        return
+
+    relatorio = rodar_suite(args)
+    os.makedirs(args.saida, exist_ok=True)
+    nome = f"bench_{datetime.now():%Y%m%d_%H%M%S}_{relatorio['commit'] or 'sem_git'}.json"
+    caminho = os.path.join(args.saida, nome)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\n📦 Resultados salvos em {caminho}")
+
+    if args.comparar:
+        with open(args.comparar[0], encoding="utf-8") as f:
+            comparar(json.load(f), relatorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Corpora usados nos benchmarks: comentários reais do repositório
+(comentarios_sentimentos_pt.csv, data/*.csv e resultados/*.csv), reamostrados
+até o tamanho desejado com semente fixa para que as execuções sejam comparáveis,
+ou comentários sintéticos montados com o vocabulário desses mesmos arquivos.
+"""
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Arquivo -> coluna com o texto do comentário
+ARQUIVOS_GRAVADOS = [
+    ("comentarios_sentimentos_pt.csv", "comentario"),
+    (os.path.join("data", "*.csv"), "comentario"),
+    (os.path.join("resultados", "*.csv"), "comment"),
+]
+
+
+def carregar_comentarios_gravados() -> pd.Series:
+    """Todos os comentários gravados no repositório, na ordem dos arquivos."""
+    partes = []
+    for padrao, coluna in ARQUIVOS_GRAVADOS:
+        for caminho in sorted(glob.glob(os.path.join(RAIZ, padrao))):
+            df = pd.read_csv(caminho, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+            if coluna in df.columns:
+                partes.append(df[coluna])
+    return pd.concat(partes, ignore_index=True)
+
+
+def corpus_tamanho(n: int, semente: int = 42) -> pd.Series:
+    """Reamostra (com reposição) os comentários gravados até n linhas."""
+    base = carregar_comentarios_gravados()
+    return base.sample(n=n, replace=True, random_state=semente).reset_index(drop=True)
+
+
+# Ruído típico de comentários, misturado aos sintéticos para exercitar a limpeza
+EXTRAS_SINTETICOS = ["https://youtu.be/abc123", "@canal", "❤️", "😂😂", "!!!", "10/10", "kkkk", "#shorts"]
+
+
+def corpus_sintetico(n: int, semente: int = 42) -> pd.Series:
+    """
+    Gera n comentários sorteando palavras do vocabulário gravado, com o número de
+    palavras seguindo a distribuição real e ~10% de URLs, menções, emojis etc.
+    """
+    gerador = np.random.default_rng(semente)
+    base = carregar_comentarios_gravados()
+    palavras_por_texto = base.str.split()
+    vocabulario = np.array([p for ps in palavras_por_texto for p in ps] + EXTRAS_SINTETICOS * 50, dtype=object)
+    tamanhos = gerador.choice(palavras_por_texto.str.len().clip(lower=1).to_numpy(), size=n)
+
+    sorteadas = vocabulario[gerador.integers(0, len(vocabulario), size=int(tamanhos.sum()))]
+    cortes = np.cumsum(tamanhos)[:-1]
+    return pd.Series([" ".join(ps) for ps in np.split(sorteadas, cortes)], dtype=object)
+
+
+def corpus(n: int, tipo: str = "gravado", semente: int = 42) -> pd.Series:
+    """Corpus de n linhas: 'gravado' (reamostragem) ou 'sintetico'."""
+    if tipo == "sintetico":
+        return corpus_sintetico(n, semente=semente)
+    return corpus_tamanho(n, semente=semente)
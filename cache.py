@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import weakref
+from typing import Any, Dict, Iterable, Optional
+
+# Pasta padrão dos caches locais (SQLite)
+CACHE_DIR = os.getenv("YT_CACHE_DIR", ".cache")
+
+# Todas as instâncias vivas, para a instrumentação somar hits/misses
+_instancias: "weakref.WeakSet[CacheSQLite]" = weakref.WeakSet()
+
+
+# ============================================================
+#   CACHE PERSISTENTE (SQLite) COM TTL E DESPEJO LRU
+# ============================================================
+class CacheSQLite:
+    """
+    Cache chave -> valor (serializado em JSON) persistido em um arquivo SQLite.
+
+    - cada item pode ter um TTL próprio (em segundos); itens vencidos contam como miss
+    - tamanho limitado por número de itens e/ou bytes: ao estourar, os itens
+      acessados há mais tempo são removidos primeiro (LRU)
+    - contadores de hits/misses por instância, expostos em estatisticas()
+
+    A conexão só é aberta no primeiro uso, então instanciar não cria arquivos.
+    """
+
+    def __init__(
+        self,
+        caminho: str,
+        max_itens: Optional[int] = 10_000,
+        max_bytes: Optional[int] = None,
+    ):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        _instancias.add(self)
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    expira_em REAL,
+                    acessado_em REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_acesso ON cache (acessado_em)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, chave: str) -> Optional[Any]:
+        encontrados = self.get_muitos([chave])
+        return encontrados.get(chave)
+
+    def get_muitos(self, chaves: Iterable[str]) -> Dict[str, Any]:
+        """Busca várias chaves de uma vez; devolve só as encontradas e válidas."""
+        chaves = list(dict.fromkeys(chaves))
+        if not chaves:
+            return {}
+
+        agora = time.time()
+        encontrados: Dict[str, Any] = {}
+        with self._lock:
+            conn = self._conexao()
+            # O SQLite limita o número de parâmetros por consulta
+            for i in range(0, len(chaves), 500):
+                lote = chaves[i : i + 500]
+                marcadores = ",".join("?" * len(lote))
+                linhas = conn.execute(
+                    f"SELECT chave, valor, expira_em FROM cache WHERE chave IN ({marcadores})",
+                    lote,
+                ).fetchall()
+                for chave, valor, expira_em in linhas:
+                    if expira_em is not None and expira_em < agora:
+                        continue
+                    encontrados[chave] = json.loads(valor)
+            if encontrados:
+                conn.executemany(
+                    "UPDATE cache SET acessado_em = ? WHERE chave = ?",
+                    [(agora, c) for c in encontrados],
+                )
+                conn.commit()
+
+            self.hits += len(encontrados)
+            self.misses += len(chaves) - len(encontrados)
+        return encontrados
+
+    def set(self, chave: str, valor: Any, ttl: Optional[float] = None) -> None:
+        self.set_muitos({chave: valor}, ttl=ttl)
+
+    def set_muitos(self, itens: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not itens:
+            return
+        agora = time.time()
+        expira_em = agora + ttl if ttl is not None else None
+        linhas = []
+        for chave, valor in itens.items():
+            texto = json.dumps(valor, ensure_ascii=False)
+            linhas.append((chave, texto, len(texto.encode("utf-8")), expira_em, agora))
+
+        with self._lock:
+            conn = self._conexao()
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (chave, valor, tamanho, expira_em, acessado_em) "
+                "VALUES (?, ?, ?, ?, ?)",
+                linhas,
+            )
+            self._despejar(conn)
+            conn.commit()
+
+    def _despejar(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache WHERE expira_em IS NOT NULL AND expira_em < ?", (time.time(),))
+
+        if self.max_itens is not None:
+            total = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            excesso = total - self.max_itens
+            if excesso > 0:
+                conn.execute(
+                    "DELETE FROM cache WHERE chave IN "
+                    "(SELECT chave FROM cache ORDER BY acessado_em LIMIT ?)",
+                    (excesso,),
+                )
+
+        if self.max_bytes is not None:
+            total_bytes = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+            if total_bytes > self.max_bytes:
+                remover = []
+                for chave, tamanho in conn.execute("SELECT chave, tamanho FROM cache ORDER BY acessado_em"):
+                    if total_bytes <= self.max_bytes:
+                        break
+                    remover.append((chave,))
+                    total_bytes -= tamanho
+                conn.executemany("DELETE FROM cache WHERE chave = ?", remover)
+
+    def limpar(self) -> None:
+        with self._lock:
+            conn = self._conexao()
+            conn.execute("DELETE FROM cache")
+            conn.commit()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            itens, total_bytes = self._conexao().execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache"
+            ).fetchone()
+        consultas = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": (self.hits / consultas) if consultas else 0.0,
+            "itens": itens,
+            "bytes": total_bytes,
+        }
+
+
+def totais_caches() -> Dict[str, int]:
+    """Hits e misses somados de todos os caches SQLite do processo."""
+    caches = list(_instancias)
+    return {
+        "cache_hits": sum(c.hits for c in caches),
+        "cache_misses": sum(c.misses for c in caches),
+    }
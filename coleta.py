@@ -1,21 +1,254 @@
+import heapq
 import os
 import re
 import time
+import random
+import sqlite3
+import sys
+import threading
 import requests
 import pandas as pd
-from typing import List, Dict, Optional
+from email.utils import parsedate_to_datetime
+from importlib.util import find_spec
+from requests.adapters import BaseAdapter, HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 
-# Tenta pegar a API Key do Streamlit Cloud; se não houver, usa variável de ambiente
-try:
-    import streamlit as st  # type: ignore
-    YOUTUBE_API_KEY = st.secrets["YOUTUBE_API_KEY"]
-except Exception:
-    YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+from cache import CACHE_DIR, CacheSQLite
+from instrumentacao import registrar_chamada_api
+from quota import LivroQuota, QuotaExcedida, ajustar_ao_saldo, custo_requisicao, obter_livro, paginas
 
-if not YOUTUBE_API_KEY:
-    # Não levantamos erro aqui para permitir import do módulo;
-    # o app fará a validação e mostrará mensagem amigável.
-    print("⚠ YOUTUBE_API_KEY não encontrada. Configure em st.secrets ou variável de ambiente.")
+# Streamlit só é carregado para ler st.secrets, e só quando a chave é pedida
+STREAMLIT_AVAILABLE = find_spec("streamlit") is not None
+
+_api_key: Optional[str] = None
+_api_key_lida = False
+
+
+def obter_api_key() -> Optional[str]:
+    """
+    API Key do YouTube, lida no primeiro uso (não na importação do módulo).
+
+    Dentro do app (streamlit já carregado) vale st.secrets, como no Streamlit
+    Cloud, e depois a variável de ambiente. Fora dele (CLI, workers, testes) vale
+    a variável de ambiente; st.secrets só é consultado se ela faltar.
+    """
+    global _api_key, _api_key_lida
+    if _api_key_lida:
+        return _api_key
+
+    def _de_secrets() -> Optional[str]:
+        if not STREAMLIT_AVAILABLE:
+            return None
+        try:
+            import streamlit as st  # type: ignore
+
+            return st.secrets["YOUTUBE_API_KEY"]
+        except Exception:
+            return None
+
+    if "streamlit" in sys.modules:
+        _api_key = _de_secrets() or os.getenv("YOUTUBE_API_KEY")
+    else:
+        _api_key = os.getenv("YOUTUBE_API_KEY") or _de_secrets()
+    _api_key_lida = True
+
+    if not _api_key:
+        # Não levantamos erro aqui; a requisição falha com mensagem clara
+        print("⚠ YOUTUBE_API_KEY não encontrada. Configure em st.secrets ou variável de ambiente.")
+    return _api_key
+
+# Paralelismo da coleta de comentários e limite global de requisições à API
+MAX_WORKERS_COLETA = int(os.getenv("YT_MAX_WORKERS", 4))
+REQUISICOES_POR_SEGUNDO = float(os.getenv("YT_REQUISICOES_POR_SEGUNDO", 10))
+
+# Cliente HTTP: endereço base (permite apontar para um servidor stub local),
+# timeout por requisição e número máximo de tentativas
+YOUTUBE_API_BASE_URL = os.getenv("YT_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
+TIMEOUT_REQUISICAO = float(os.getenv("YT_TIMEOUT", 15))
+MAX_TENTATIVAS = int(os.getenv("YT_MAX_TENTATIVAS", 5))
+
+# Cache em disco: canal resolvido muda raramente (TTL longo); listagens de vídeos, TTL curto
+TTL_CACHE_CANAL = int(os.getenv("YT_CACHE_TTL_CANAL", 30 * 24 * 3600))
+TTL_CACHE_VIDEOS = int(os.getenv("YT_CACHE_TTL_VIDEOS", 15 * 60))
+MAX_ITENS_CACHE_COLETA = int(os.getenv("YT_CACHE_MAX_ITENS", 5000))
+
+# Corpus local de comentários usado pela sincronização incremental
+ARMAZEM_COMENTARIOS = os.getenv("YT_ARMAZEM_COMENTARIOS", os.path.join("data", "comentarios.sqlite"))
+
+
+# ============================================================
+#   LIMITADOR DE TAXA
+# ============================================================
+class LimitadorTaxa:
+    """
+    Limita o número de requisições por segundo, compartilhado entre threads.
+    Cada chamada a aguardar() reserva o próximo horário livre e dorme até ele.
+    """
+
+    def __init__(self, requisicoes_por_segundo: float):
+        self.intervalo = 1.0 / requisicoes_por_segundo if requisicoes_por_segundo > 0 else 0.0
+        self._lock = threading.Lock()
+        self._proximo = 0.0
+
+    def aguardar(self) -> None:
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+_limitador = LimitadorTaxa(REQUISICOES_POR_SEGUNDO)
+
+
+# ============================================================
+#   CLIENTE HTTP DA API DO YOUTUBE
+# ============================================================
+class ClienteYouTube:
+    """
+    Cliente único para a YouTube Data API v3.
+
+    - Session com pool de conexões (keep-alive reaproveitado entre chamadas e threads)
+    - timeout em toda requisição
+    - novas tentativas com backoff exponencial + jitter em 403 rateLimitExceeded,
+      429, 5xx e falhas de conexão, respeitando o header Retry-After
+    - transporte plugável: qualquer requests.adapters.BaseAdapter (ex.: um adapter
+      falso em testes) e base_url configurável (ex.: http://127.0.0.1:8000 com stub)
+    - cada tentativa é lançada no livro de quota antes de sair; sem saldo no dia,
+      a requisição não é feita e sobe QuotaExcedida
+    """
+
+    MOTIVOS_403_REPETIVEIS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = YOUTUBE_API_BASE_URL,
+        timeout: float = TIMEOUT_REQUISICAO,
+        max_tentativas: int = MAX_TENTATIVAS,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        limitador: Optional[LimitadorTaxa] = None,
+        transporte: Optional[BaseAdapter] = None,
+        livro: Optional[LivroQuota] = None,
+    ):
+        self.api_key = api_key if api_key is not None else obter_api_key()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_tentativas = max(1, max_tentativas)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limitador = limitador or _limitador
+        self.livro = livro
+
+        self.session = requests.Session()
+        adapter = transporte or HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(10, MAX_WORKERS_COLETA * 2),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _deve_repetir(self, resp: requests.Response) -> bool:
+        if resp.status_code == 429 or resp.status_code >= 500:
+            return True
+        if resp.status_code == 403:
+            try:
+                erros = resp.json().get("error", {}).get("errors", [])
+            except ValueError:
+                return False
+            return any(e.get("reason") in self.MOTIVOS_403_REPETIVEIS for e in erros)
+        return False
+
+    def _tempo_espera(self, tentativa: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    try:
+                        restante = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                        return min(max(restante, 0.0), self.backoff_max)
+                    except (TypeError, ValueError):
+                        pass
+        # Backoff exponencial com "full jitter"
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** tentativa)))
+
+    def get(
+        self,
+        recurso: str,
+        params: Dict,
+        limitador: Optional[LimitadorTaxa] = None,
+    ) -> requests.Response:
+        """
+        Faz GET em base_url/recurso (ex.: 'search', 'videos', 'commentThreads').
+        Devolve a última resposta obtida; erros de conexão só sobem após esgotar as tentativas.
+        """
+        if not self.api_key:
+            raise ValueError("YOUTUBE_API_KEY não configurada.")
+
+        limitador = limitador or self.limitador
+        url = f"{self.base_url}/{recurso}"
+        params = {"key": self.api_key, **params}
+
+        tentativa = 0
+        while True:
+            esgotou = tentativa + 1 >= self.max_tentativas
+            limitador.aguardar()
+            (self.livro or obter_livro()).reservar(recurso)
+            registrar_chamada_api(recurso, custo_requisicao(recurso))
+            try:
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if esgotou:
+                    raise
+                resp = None
+            else:
+                if esgotou or not self._deve_repetir(resp):
+                    return resp
+            time.sleep(self._tempo_espera(tentativa, resp))
+            tentativa += 1
+
+
+_cliente: Optional[ClienteYouTube] = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente() -> ClienteYouTube:
+    """Devolve o cliente compartilhado do processo, criando-o na primeira chamada."""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClienteYouTube()
+    return _cliente
+
+
+def definir_cliente(cliente: Optional[ClienteYouTube]) -> None:
+    """Substitui o cliente compartilhado (ex.: por um apontado para um stub local)."""
+    global _cliente
+    with _cliente_lock:
+        _cliente = cliente
+
+
+# ============================================================
+#   CACHE DE RESOLUÇÃO DE CANAL E LISTAGENS
+# ============================================================
+_cache_coleta = CacheSQLite(
+    os.path.join(CACHE_DIR, "coleta.sqlite"),
+    max_itens=MAX_ITENS_CACHE_COLETA,
+)
+
+
+def estatisticas_cache_coleta() -> Dict:
+    """Hits/misses e tamanho do cache de canais e listagens de vídeos."""
+    return _cache_coleta.estatisticas()
 
 
 # ============================================================
@@ -62,34 +295,46 @@ def extrair_channel_id(link_ou_id: str) -> str:
     if re.fullmatch(r"UC[\w-]{20,}", texto):
         return texto
 
+    chave = f"channel_id:{texto}"
+    channel_id = _cache_coleta.get(chave)
+    if channel_id is None:
+        channel_id = _resolver_channel_id(texto)
+        _cache_coleta.set(chave, channel_id, ttl=TTL_CACHE_CANAL)
+    return channel_id
+
+
+def _resolver_channel_id(texto: str) -> str:
+    """
+    Resolve o channel_id consultando a API quando necessário (vídeos, handles, /user/, /c/).
+    Chamada apenas em caso de miss no cache.
+    """
     # Se for link de vídeo, usa API de vídeos para descobrir o canal
     video_id = extrair_video_id(texto)
     if video_id:
-        url = "https://www.googleapis.com/youtube/v3/videos"
         params = {
-            "key": YOUTUBE_API_KEY,
             "part": "snippet",
             "id": video_id,
         }
-        resp = requests.get(url, params=params)
+        resp = obter_cliente().get("videos", params)
         data = resp.json()
         items = data.get("items", [])
         if not items:
             raise ValueError("Não foi possível obter informações do vídeo para descobrir o canal.")
         return items[0]["snippet"]["channelId"]
 
-    # Handle @nome
+    # Handle @nome: channels.list com forHandle (1 unidade) antes do search (100)
     if "youtube.com/@" in texto or texto.startswith("@"):
         handle = texto.split("@")[1].split("/")[0]
-        url = "https://www.googleapis.com/youtube/v3/search"
+        channel_id = _canal_por("forHandle", f"@{handle}")
+        if channel_id:
+            return channel_id
         params = {
-            "key": YOUTUBE_API_KEY,
             "part": "snippet",
             "type": "channel",
             "q": handle,
             "maxResults": 1,
         }
-        resp = requests.get(url, params=params)
+        resp = obter_cliente().get("search", params)
         data = resp.json()
         items = data.get("items", [])
         if not items:
@@ -107,16 +352,20 @@ def extrair_channel_id(link_ou_id: str) -> str:
     elif "/c/" in texto:
         termo = texto.split("/c/")[1].split("/")[0]
 
+    # /user/ ainda tem consulta direta (forUsername); /c/ só pelo search
+    if termo and "/user/" in texto:
+        channel_id = _canal_por("forUsername", termo)
+        if channel_id:
+            return channel_id
+
     if termo:
-        url = "https://www.googleapis.com/youtube/v3/search"
         params = {
-            "key": YOUTUBE_API_KEY,
             "part": "snippet",
             "type": "channel",
             "q": termo,
             "maxResults": 1,
         }
-        resp = requests.get(url, params=params)
+        resp = obter_cliente().get("search", params)
         data = resp.json()
         items = data.get("items", [])
         if not items:
@@ -126,156 +375,626 @@ def extrair_channel_id(link_ou_id: str) -> str:
     raise ValueError("Não foi possível identificar o canal a partir do texto informado.")
 
 
+def _canal_por(filtro: str, valor: str) -> Optional[str]:
+    """channels.list por forHandle/forUsername (1 unidade); None se não achar."""
+    resp = obter_cliente().get("channels", {"part": "id", filtro: valor})
+    if resp.status_code != 200:
+        return None
+    items = resp.json().get("items", [])
+    return items[0]["id"] if items else None
+
+
 # ============================================================
 #   LISTAGEM DE VÍDEOS DO CANAL
 # ============================================================
+# Custos (unidades de quota) de cada forma de listar vídeos:
+#   search (qualquer ordenação)            100 por página de até 50 vídeos
+#   playlistItems na playlist de uploads     1 por página de até 50 vídeos
+#   videos.list (estatísticas)               1 por lote de até 50 IDs
+# Por isso "recentes" e "mais comentados" usam a playlist de uploads, e "mais
+# vistos" só recorre ao search quando varrer o catálogo inteiro sairia mais caro.
+CUSTO_BUSCA = 100
+
+# Limite opcional de vídeos varridos no ranking por estatísticas (0 = catálogo inteiro)
+MAX_VIDEOS_VARREDURA = int(os.getenv("YT_MAX_VIDEOS_VARREDURA", 0))
+
+
 def _listar_videos(channel_id: str, max_videos: int, order: str) -> List[Dict]:
     """
     Função interna que lista vídeos de um canal usando diferentes ordenações.
     order pode ser: 'date', 'viewCount', 'relevance'
+    Segue o nextPageToken (50 vídeos por página) até somar max_videos.
+    O resultado fica em cache por (channel_id, order, max_videos) durante TTL_CACHE_VIDEOS.
     """
-    if not YOUTUBE_API_KEY:
-        raise ValueError("YOUTUBE_API_KEY não configurada.")
+    chave = f"videos:{channel_id}:{order}:{max_videos}"
+    videos = _cache_coleta.get(chave)
+    if videos is not None:
+        return videos
 
-    url = "https://www.googleapis.com/youtube/v3/search"
+    cliente = obter_cliente()
     params = {
-        "key": YOUTUBE_API_KEY,
         "channelId": channel_id,
         "part": "snippet",
         "order": order,
-        "maxResults": max_videos,
+        "maxResults": min(max_videos, 50),
         "type": "video",
     }
-    resp = requests.get(url, params=params)
+    videos = []
+    while len(videos) < max_videos:
+        resp = cliente.get("search", params)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Erro ao listar vídeos: {resp.status_code} - {resp.text}")
+
+        data = resp.json()
+        for item in data.get("items", []):
+            videos.append(
+                {
+                    "video_id": item["id"]["videoId"],
+                    "video_title": item["snippet"]["title"],
+                    "video_published_at": item["snippet"]["publishedAt"],
+                }
+            )
+        if not data.get("nextPageToken"):
+            break
+        params["pageToken"] = data["nextPageToken"]
+
+    videos = videos[:max_videos]
+    _cache_coleta.set(chave, videos, ttl=TTL_CACHE_VIDEOS)
+    return videos
+
+
+def info_canal(channel_id: str) -> Dict:
+    """
+    Playlist de uploads e total de vídeos do canal (channels.list, 1 unidade),
+    em cache por TTL_CACHE_VIDEOS.
+    """
+    chave = f"canal:{channel_id}"
+    info = _cache_coleta.get(chave)
+    if info is not None:
+        return info
+
+    resp = obter_cliente().get("channels", {"part": "contentDetails,statistics", "id": channel_id})
     if resp.status_code != 200:
-        raise RuntimeError(f"Erro ao listar vídeos: {resp.status_code} - {resp.text}")
+        raise RuntimeError(f"Erro ao consultar o canal: {resp.status_code} - {resp.text}")
+    items = resp.json().get("items", [])
+    if not items:
+        raise ValueError(f"Canal não encontrado: {channel_id}")
+    info = {
+        "uploads": items[0]["contentDetails"]["relatedPlaylists"]["uploads"],
+        "video_count": int(items[0].get("statistics", {}).get("videoCount", 0)),
+    }
+    _cache_coleta.set(chave, info, ttl=TTL_CACHE_VIDEOS)
+    return info
 
-    data = resp.json()
-    videos = []
-    for item in data.get("items", []):
-        videos.append(
-            {
-                "video_id": item["id"]["videoId"],
+
+def iterar_uploads(channel_id: str, max_videos: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Gera os vídeos do canal do mais recente ao mais antigo, página a página
+    (playlistItems na playlist de uploads, 50 por requisição, 1 unidade cada).
+    Sem max_videos, percorre o catálogo inteiro; só uma página fica em memória.
+    """
+    cliente = obter_cliente()
+    params = {
+        "part": "snippet,contentDetails",
+        "playlistId": info_canal(channel_id)["uploads"],
+        "maxResults": 50,
+    }
+    entregues = 0
+    while max_videos is None or entregues < max_videos:
+        resp = cliente.get("playlistItems", params)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Erro ao listar uploads: {resp.status_code} - {resp.text}")
+        data = resp.json()
+        for item in data.get("items", []):
+            if max_videos is not None and entregues >= max_videos:
+                return
+            entregues += 1
+            yield {
+                "video_id": item["contentDetails"]["videoId"],
                 "video_title": item["snippet"]["title"],
-                "video_published_at": item["snippet"]["publishedAt"],
+                "video_published_at": item["contentDetails"].get(
+                    "videoPublishedAt", item["snippet"]["publishedAt"]
+                ),
             }
-        )
+        if not data.get("nextPageToken"):
+            return
+        params["pageToken"] = data["nextPageToken"]
+
+
+def _listar_uploads(channel_id: str, max_videos: int) -> List[Dict]:
+    """Os max_videos uploads mais recentes, em cache por TTL_CACHE_VIDEOS."""
+    chave = f"uploads:{channel_id}:{max_videos}"
+    videos = _cache_coleta.get(chave)
+    if videos is None:
+        videos = list(iterar_uploads(channel_id, max_videos))
+        _cache_coleta.set(chave, videos, ttl=TTL_CACHE_VIDEOS)
+    return videos
+
+
+def iterar_com_estatisticas(videos: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Acrescenta viewCount/likeCount/commentCount (inteiros) a cada vídeo, consultando
+    videos.list em lotes de 50 IDs (1 unidade por lote) à medida que os vídeos chegam.
+    """
+    cliente = obter_cliente()
+    iterador = iter(videos)
+    while True:
+        lote = list(islice(iterador, 50))
+        if not lote:
+            return
+        resp = cliente.get("videos", {"part": "statistics", "id": ",".join(v["video_id"] for v in lote)})
+        if resp.status_code != 200:
+            raise RuntimeError(f"Erro ao consultar estatísticas: {resp.status_code} - {resp.text}")
+        stats = {item["id"]: item.get("statistics", {}) for item in resp.json().get("items", [])}
+        for v in lote:
+            stt = stats.get(v["video_id"], {})
+            yield {**v, **{campo: int(stt.get(campo, 0)) for campo in ("viewCount", "likeCount", "commentCount")}}
+
+
+def estatisticas_videos(video_ids: List[str]) -> Dict[str, Dict]:
+    """Estatísticas por vídeo (ver iterar_com_estatisticas), indexadas pelo ID."""
+    return {
+        v["video_id"]: v for v in iterar_com_estatisticas({"video_id": vid} for vid in video_ids)
+    }
+
+
+def _mais_por_estatistica(channel_id: str, campo: str, max_videos: int) -> List[Dict]:
+    """
+    Top max_videos do canal por 'campo' (viewCount, commentCount...) varrendo o
+    catálogo inteiro (ou MAX_VIDEOS_VARREDURA vídeos) pela playlist de uploads.
+    Custa 2 unidades a cada 50 vídeos e guarda só o top em memória (heap).
+    """
+    chave = f"top:{channel_id}:{campo}:{max_videos}:{MAX_VIDEOS_VARREDURA}"
+    videos = _cache_coleta.get(chave)
+    if videos is None:
+        catalogo = iterar_uploads(channel_id, MAX_VIDEOS_VARREDURA or None)
+        videos = heapq.nlargest(max_videos, iterar_com_estatisticas(catalogo), key=lambda v: v[campo])
+        _cache_coleta.set(chave, videos, ttl=TTL_CACHE_VIDEOS)
     return videos
 
 
+def _videos_varridos(channel_id: str) -> int:
+    total = info_canal(channel_id)["video_count"]
+    return min(total, MAX_VIDEOS_VARREDURA) if MAX_VIDEOS_VARREDURA else total
+
+
+def custo_listagem(channel_id: str, criterio: str, max_videos: int) -> int:
+    """Unidades de quota que a listagem de vídeos do critério vai gastar (sem contar cache)."""
+    varredura = 2 * paginas(_videos_varridos(channel_id), 50) if criterio in ("vistos", "comentados") else 0
+    if criterio == "vistos":
+        return min(CUSTO_BUSCA * paginas(max_videos, 50), varredura)
+    if criterio == "comentados":
+        return varredura
+    return paginas(max_videos, 50)
+
+
 def listar_videos_recentes(channel_id: str, max_videos: int) -> List[Dict]:
-    return _listar_videos(channel_id, max_videos, order="date")
+    try:
+        return _listar_uploads(channel_id, max_videos)
+    except (RuntimeError, ValueError, KeyError):
+        return _listar_videos(channel_id, max_videos, order="date")
 
 
 def listar_videos_mais_vistos(channel_id: str, max_videos: int) -> List[Dict]:
-    # 'viewCount' só funciona em algumas combinações; se der erro, recai para recentes
+    """
+    Escolhe o caminho mais barato em quota: varrer o catálogo pelos uploads e
+    ordenar pelas estatísticas (2 unidades a cada 50 vídeos) ou o search ordenado
+    por viewCount (100 unidades a cada 50 vídeos pedidos).
+    """
     try:
+        varredura = 2 * paginas(_videos_varridos(channel_id), 50)
+        if varredura < CUSTO_BUSCA * paginas(max_videos, 50):
+            return _mais_por_estatistica(channel_id, "viewCount", max_videos)
         return _listar_videos(channel_id, max_videos, order="viewCount")
+    except QuotaExcedida:
+        raise
     except Exception:
-        return _listar_videos(channel_id, max_videos, order="date")
+        # 'viewCount' só funciona em algumas combinações; se der erro, recai para recentes
+        return listar_videos_recentes(channel_id, max_videos)
 
 
 def listar_videos_mais_comentados(channel_id: str, max_videos: int) -> List[Dict]:
     """
     A API não ordena direto por comentários.
     Estratégia:
-      1) pega até 20 vídeos recentes
-      2) consulta estatísticas
-      3) ordena por commentCount
-      4) devolve os top max_videos
+      1) percorre os uploads do canal (50 por requisição)
+      2) consulta as estatísticas em lotes de 50 IDs
+      3) mantém os max_videos com mais commentCount
+    Em caso de erro, devolve os vídeos mais recentes.
     """
-    if not YOUTUBE_API_KEY:
-        raise ValueError("YOUTUBE_API_KEY não configurada.")
+    try:
+        return _mais_por_estatistica(channel_id, "commentCount", max_videos)
+    except (RuntimeError, ValueError, KeyError):
+        return listar_videos_recentes(channel_id, max_videos)  # fallback
+
+
+def planejar_quota(
+    channel_id: Optional[str],
+    criterio: Optional[str],
+    max_videos: int,
+    max_comments: int,
+    livro: Optional[LivroQuota] = None,
+) -> Dict:
+    """
+    Estima o custo de uma análise (listagem do critério + páginas de comentários)
+    e a encaixa no saldo de quota do dia (veja quota.ajustar_ao_saldo).
+    criterio=None indica um único vídeo, sem listagem. Devolve o plano com
+    n_videos/max_comments possivelmente reduzidos e 'degradado'.
+    """
+    custo_fixo = custo_listagem(channel_id, criterio, max_videos) if criterio else 0
+    return ajustar_ao_saldo(
+        custo_fixo, max_videos, max_comments, (livro or obter_livro()).restante()
+    )
+
+
+# ============================================================
+#   COLETA DE COMENTÁRIOS
+# ============================================================
+COLUNAS_COMENTARIOS = ["video_id", "author", "comment", "like_count", "published_at"]
+
+
+def _linha_comentario(item: Dict, video_id: str) -> Dict:
+    """Converte um item de commentThreads em uma linha do DataFrame (mais o comment_id)."""
+    top = item["snippet"]["topLevelComment"]
+    snippet = top["snippet"]
+    return {
+        "comment_id": top.get("id") or item.get("id", ""),
+        "video_id": video_id,
+        "author": snippet.get("authorDisplayName", ""),
+        "comment": snippet.get("textDisplay", ""),
+        "like_count": snippet.get("likeCount", 0),
+        "published_at": snippet.get("publishedAt", ""),
+    }
 
-    base = _listar_videos(channel_id, max_videos=20, order="date")
-    if not base:
-        return []
 
-    ids = ",".join(v["video_id"] for v in base)
-    url = "https://www.googleapis.com/youtube/v3/videos"
+def iterar_paginas_comentarios(
+    video_id: str,
+    max_comments: int = 200,
+    limitador: Optional[LimitadorTaxa] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Gera os comentários de um vídeo página a página (commentThreads), até somar
+    'max_comments'. Cada página é entregue assim que chega, sem esperar as demais.
+    """
+    cliente = obter_cliente()
     params = {
-        "key": YOUTUBE_API_KEY,
-        "part": "statistics",
-        "id": ids,
+        "part": "snippet",
+        "videoId": video_id,
+        "maxResults": 100,
+        "textFormat": "plainText",
+        "order": "relevance",
     }
-    resp = requests.get(url, params=params)
-    if resp.status_code != 200:
-        return base  # fallback
 
-    stats = {item["id"]: item["statistics"] for item in resp.json().get("items", [])}
+    restantes = max_comments
+    page_token: Optional[str] = None
+
+    while restantes > 0:
+        if page_token:
+            params["pageToken"] = page_token
+
+        resp = cliente.get("commentThreads", params, limitador=limitador)
+        if resp.status_code != 200:
+            print(f"Erro ao coletar comentários do vídeo {video_id}: {resp.text}")
+            break
+
+        data = resp.json()
+        pagina: List[Dict] = []
+        for item in data.get("items", [])[:restantes]:
+            comentario = _linha_comentario(item, video_id)
+            comentario.pop("comment_id")
+            pagina.append(comentario)
+        restantes -= len(pagina)
+        if pagina:
+            yield pagina
 
-    for v in base:
-        stt = stats.get(v["video_id"], {})
-        v["commentCount"] = int(stt.get("commentCount", 0))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
 
-    base.sort(key=lambda x: x.get("commentCount", 0), reverse=True)
-    return base[:max_videos]
+
+def coletar_comentarios_video(
+    video_id: str,
+    max_comments: int = 200,
+    limitador: Optional[LimitadorTaxa] = None,
+) -> List[Dict]:
+    """
+    Coleta até 'max_comments' comentários de um vídeo usando commentThreads.
+    Cada página respeita o limitador de taxa global (ou o informado).
+    """
+    comentarios: List[Dict] = []
+    for pagina in iterar_paginas_comentarios(video_id, max_comments=max_comments, limitador=limitador):
+        comentarios.extend(pagina)
+    return comentarios
 
 
 # ============================================================
-#   COLETA DE COMENTÁRIOS
+#   SINCRONIZAÇÃO INCREMENTAL
 # ============================================================
-def coletar_comentarios_video(video_id: str, max_comments: int = 200) -> List[Dict]:
+class ArmazemComentarios:
     """
-    Coleta até 'max_comments' comentários de um vídeo usando commentThreads.
+    Corpus local de comentários em SQLite, com uma marca d'água por vídeo
+    (published_at e comment_id do comentário mais recente até o qual o vídeo
+    está completo).
+
+    Quando uma sincronização é cortada antes de alcançar a marca d'água, fica
+    uma lacuna entre os comentários novos e os antigos: a marca não avança e o
+    vídeo guarda um cursor (o pageToken de onde continuar; "" = do início), e a
+    próxima sincronização percorre a lacuna até fechá-la.
+    """
+
+    def __init__(self, caminho: str = ARMAZEM_COMENTARIOS):
+        self.caminho = caminho
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS comentarios (
+                    comment_id TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    author TEXT,
+                    comment TEXT,
+                    like_count INTEGER,
+                    published_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_comentarios_video
+                    ON comentarios (video_id, published_at);
+                CREATE TABLE IF NOT EXISTS marcas (
+                    video_id TEXT PRIMARY KEY,
+                    published_at TEXT,
+                    comment_id TEXT,
+                    sincronizado_em REAL,
+                    cursor TEXT
+                );
+                """
+            )
+            # Armazéns criados antes do cursor de retomada
+            if "cursor" not in {c[1] for c in conn.execute("PRAGMA table_info(marcas)")}:
+                conn.execute("ALTER TABLE marcas ADD COLUMN cursor TEXT")
+            self._conn = conn
+        return self._conn
+
+    def marca(self, video_id: str) -> Optional[Dict]:
+        with self._lock:
+            linha = self._conexao().execute(
+                "SELECT published_at, comment_id, cursor FROM marcas WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        if linha is None:
+            return None
+        return {"published_at": linha[0], "comment_id": linha[1], "cursor": linha[2]}
+
+    def ids_existentes(self, comment_ids: List[str]) -> set:
+        if not comment_ids:
+            return set()
+        marcadores = ",".join("?" * len(comment_ids))
+        with self._lock:
+            linhas = self._conexao().execute(
+                f"SELECT comment_id FROM comentarios WHERE comment_id IN ({marcadores})",
+                comment_ids,
+            ).fetchall()
+        return {l[0] for l in linhas}
+
+    def adicionar(self, video_id: str, linhas: List[Dict], cursor: Optional[str] = None) -> None:
+        """
+        Mescla novas linhas no corpus. Com cursor=None o vídeo está completo e a
+        marca d'água avança até o comentário mais recente; com um cursor, a marca
+        fica onde está e o cursor é guardado para retomar a lacuna.
+        """
+        with self._lock:
+            conn = self._conexao()
+            if linhas:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO comentarios "
+                    "(comment_id, video_id, author, comment, like_count, published_at) "
+                    "VALUES (:comment_id, :video_id, :author, :comment, :like_count, :published_at)",
+                    linhas,
+                )
+            if cursor is None:
+                ultima = conn.execute(
+                    "SELECT published_at, comment_id FROM comentarios WHERE video_id = ? "
+                    "ORDER BY published_at DESC LIMIT 1",
+                    (video_id,),
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO marcas (video_id, published_at, comment_id, sincronizado_em, cursor) "
+                    "VALUES (?, ?, ?, ?, NULL)",
+                    (video_id, ultima[0] if ultima else None, ultima[1] if ultima else None, time.time()),
+                )
+            else:
+                conn.execute(
+                    "UPDATE marcas SET cursor = ?, sincronizado_em = ? WHERE video_id = ?",
+                    (cursor, time.time(), video_id),
+                )
+            conn.commit()
+
+    def carregar(self, video_ids: List[str], max_por_video: Optional[int] = None) -> pd.DataFrame:
+        """Devolve os comentários armazenados, na ordem dos vídeos e do mais recente ao mais antigo."""
+        linhas: List[tuple] = []
+        with self._lock:
+            conn = self._conexao()
+            for vid in video_ids:
+                linhas.extend(
+                    conn.execute(
+                        "SELECT video_id, author, comment, like_count, published_at FROM comentarios "
+                        "WHERE video_id = ? ORDER BY published_at DESC, comment_id LIMIT ?",
+                        (vid, max_por_video if max_por_video is not None else -1),
+                    ).fetchall()
+                )
+        return pd.DataFrame(linhas, columns=COLUNAS_COMENTARIOS)
+
+
+_armazem: Optional[ArmazemComentarios] = None
+
+
+def obter_armazem() -> ArmazemComentarios:
+    global _armazem
+    if _armazem is None:
+        _armazem = ArmazemComentarios()
+    return _armazem
+
+
+def sincronizar_comentarios_video(
+    video_id: str,
+    max_novos: Optional[int] = None,
+    armazem: Optional[ArmazemComentarios] = None,
+    limitador: Optional[LimitadorTaxa] = None,
+) -> int:
+    """
+    Busca apenas os comentários publicados depois da última sincronização do vídeo.
+    Pagina com order="time" (mais recentes primeiro) e para no primeiro comentário
+    já conhecido, de modo que o custo acompanha a atividade nova, não o total.
+    Devolve o número de comentários novos adicionados ao armazém.
+
+    Se 'max_novos' (ou um erro da API) interromper a paginação antes da marca
+    d'água, a marca não avança: fica um cursor, e a próxima sincronização pula
+    os comentários já armazenados e continua dali até alcançar a marca. Na
+    primeira sincronização de um vídeo não há marca a alcançar: como na coleta
+    comum, ficam só os 'max_novos' mais recentes.
     """
-    if not YOUTUBE_API_KEY:
-        raise ValueError("YOUTUBE_API_KEY não configurada.")
+    armazem = armazem or obter_armazem()
+    cliente = obter_cliente()
+    marca = armazem.marca(video_id)
+    limite_data = marca["published_at"] if marca else None
+    cursor = marca["cursor"] if marca else None
 
-    url = "https://www.googleapis.com/youtube/v3/commentThreads"
     params = {
-        "key": YOUTUBE_API_KEY,
         "part": "snippet",
         "videoId": video_id,
         "maxResults": 100,
         "textFormat": "plainText",
-        "order": "relevance",
+        "order": "time",
     }
 
-    comentarios: List[Dict] = []
+    novos: List[Dict] = []
     page_token: Optional[str] = None
+    completo = True
+    # Dentro de uma lacuna, comentários já armazenados são pulados em vez de encerrar
+    na_lacuna = False
 
     while True:
         if page_token:
             params["pageToken"] = page_token
+        else:
+            params.pop("pageToken", None)
 
-        resp = requests.get(url, params=params)
+        resp = cliente.get("commentThreads", params, limitador=limitador)
         if resp.status_code != 200:
-            print(f"Erro ao coletar comentários do vídeo {video_id}: {resp.text}")
+            print(f"Erro ao sincronizar comentários do vídeo {video_id}: {resp.text}")
+            if novos or na_lacuna:
+                # Um cursor antigo que falhou pode ter expirado: a lacuna recomeça do início
+                completo, cursor = False, ("" if page_token == cursor else page_token or "")
             break
 
         data = resp.json()
-        for item in data.get("items", []):
-            snippet = item["snippet"]["topLevelComment"]["snippet"]
-            comentarios.append(
-                {
-                    "video_id": video_id,
-                    "author": snippet.get("authorDisplayName", ""),
-                    "comment": snippet.get("textDisplay", ""),
-                    "like_count": snippet.get("likeCount", 0),
-                    "published_at": snippet.get("publishedAt", ""),
-                }
-            )
-            if len(comentarios) >= max_comments:
-                return comentarios
-
-        page_token = data.get("nextPageToken")
+        pagina = [_linha_comentario(item, video_id) for item in data.get("items", [])]
+        conhecidos = armazem.ids_existentes([c["comment_id"] for c in pagina]) if marca else set()
+
+        alcancou_marca = cortado = False
+        salto: Optional[str] = None
+        for comentario in pagina:
+            if limite_data and (
+                comentario["comment_id"] == marca["comment_id"] or comentario["published_at"] < limite_data
+            ):
+                alcancou_marca = True
+                break
+            if comentario["comment_id"] in conhecidos:
+                if na_lacuna:
+                    continue
+                if cursor is None:
+                    alcancou_marca = True  # sem lacuna: daqui para trás já está tudo armazenado
+                    break
+                # Chegou ao trecho já armazenado: segue para a lacuna pendente
+                na_lacuna = True
+                if cursor:
+                    salto = cursor
+                    break
+                continue
+            novos.append(comentario)
+            if max_novos is not None and len(novos) >= max_novos:
+                cortado = True
+                break
+
+        if alcancou_marca:
+            break
+        if cortado:
+            # Retoma desta mesma página (os já armazenados serão pulados)
+            completo, cursor = marca is None, page_token or ""
+            break
+        page_token = salto or data.get("nextPageToken")
         if not page_token:
             break
 
-        time.sleep(0.3)
-
-    return comentarios
+    armazem.adicionar(video_id, novos, cursor=None if completo else cursor)
+    return len(novos)
 
 
-def coletar_comentarios_multiplos_videos(videos: List[Dict], max_comments_por_video: int) -> pd.DataFrame:
+def coletar_comentarios_incremental(
+    video_id: str,
+    max_comments: int = 200,
+    armazem: Optional[ArmazemComentarios] = None,
+    limitador: Optional[LimitadorTaxa] = None,
+) -> List[Dict]:
+    """
+    Sincroniza o vídeo com o armazém local e devolve os 'max_comments'
+    comentários mais recentes dele, no mesmo formato de coletar_comentarios_video.
+    """
+    armazem = armazem or obter_armazem()
+    sincronizar_comentarios_video(video_id, max_novos=max_comments, armazem=armazem, limitador=limitador)
+    return armazem.carregar([video_id], max_por_video=max_comments).to_dict("records")
+
+
+def coletar_comentarios_multiplos_videos(
+    videos: List[Dict],
+    max_comments_por_video: int,
+    max_workers: Optional[int] = None,
+    requisicoes_por_segundo: Optional[float] = None,
+    incremental: bool = False,
+    armazem: Optional[ArmazemComentarios] = None,
+) -> pd.DataFrame:
     """
     Recebe uma lista de vídeos (dicts com 'video_id') e coleta comentários de todos.
+    Os vídeos são coletados em paralelo (até 'max_workers' ao mesmo tempo), mas o
+    DataFrame final mantém a ordem da lista de vídeos recebida.
+
+    Com incremental=True, só os comentários novos de cada vídeo são baixados e
+    mesclados no armazém local; o DataFrame devolvido traz os 'max_comments_por_video'
+    comentários mais recentes de cada vídeo a partir do armazém.
     """
+    max_workers = max_workers or MAX_WORKERS_COLETA
+    limitador = (
+        LimitadorTaxa(requisicoes_por_segundo) if requisicoes_por_segundo is not None else _limitador
+    )
+
+    if incremental:
+        armazem = armazem or obter_armazem()
+
+    def _coletar(v: Dict) -> List[Dict]:
+        if incremental:
+            sincronizar_comentarios_video(
+                v["video_id"], max_novos=max_comments_por_video, armazem=armazem, limitador=limitador
+            )
+            return []
+        return coletar_comentarios_video(
+            v["video_id"], max_comments=max_comments_por_video, limitador=limitador
+        )
+
     all_comments: List[Dict] = []
-    for v in videos:
-        vid = v["video_id"]
-        comments = coletar_comentarios_video(vid, max_comments=max_comments_por_video)
-        all_comments.extend(comments)
+    if max_workers <= 1 or len(videos) <= 1:
+        for v in videos:
+            all_comments.extend(_coletar(v))
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(videos))) as executor:
+            # map devolve os resultados na ordem de entrada (saída determinística)
+            for comments in executor.map(_coletar, videos):
+                all_comments.extend(comments)
+
+    if incremental:
+        return armazem.carregar([v["video_id"] for v in videos], max_por_video=max_comments_por_video)
     return pd.DataFrame(all_comments)
-    
@@ -0,0 +1,373 @@
+"""
+Execução em lote (sem navegador) da coleta + análise de sentimentos.
+
+Lê um arquivo com um canal ou vídeo por linha (link, @handle ou ID; linhas
+vazias e iniciadas por '#' são ignoradas), coleta os comentários de vários
+vídeos em paralelo, pontua com VADER + BERT e grava:
+  - resultados/analise_lote_<timestamp>.csv  (todas as linhas analisadas)
+  - uma linha de resumo em logs/analises.csv
+  - em Parquet particionado por canal/data (a menos que se use --sem-parquet):
+    os comentários coletados em data/parquet/comentarios/canal_id=.../data=.../
+    e as linhas pontuadas em data/parquet/analises/canal_id=.../data=.../
+  - contagens e scores por canal/vídeo/dia em data/agregados.sqlite (veja agregados.py)
+
+Ao final, imprime o tempo, as chamadas à API, a quota e o pico de memória de cada
+etapa (também gravados em logs/analises.csv e, se PROMETHEUS_ARQUIVO estiver
+definido, exportados no formato do Prometheus).
+
+O progresso é salvo por vídeo em resultados/checkpoints/<nome_do_arquivo>/: a
+coleta bruta de cada vídeo vai para brutos/ assim que termina de baixar, e o
+resultado pontuado substitui a coleta ao fim da análise. Uma execução
+interrompida retoma de onde parou ao ser chamada de novo com o mesmo arquivo,
+sem baixar de novo o que já foi coletado (use --reiniciar para descartar o progresso).
+
+Os vídeos coletados (já gravados no checkpoint) são pontuados em grupos de --lote-pontuacao comentários
+(padrão: VADER_MIN_PARALELO), grandes o bastante para o VADER e a detecção de
+idioma rodarem em vários processos.
+
+Com --incremental, cada vídeo é sincronizado com o armazém local de comentários
+(YT_ARMAZEM_COMENTARIOS): reexecuções baixam só os comentários novos.
+
+Exemplo:
+    python executar_lote.py canais.txt --max-videos 10 --max-comments 500 --paralelo 8
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from coleta import (
+    COLUNAS_COMENTARIOS,
+    coletar_comentarios_incremental,
+    coletar_comentarios_video,
+    extrair_channel_id,
+    extrair_video_id,
+    listar_videos_mais_comentados,
+    listar_videos_mais_vistos,
+    listar_videos_recentes,
+)
+from analise import (
+    aplicar_bert,
+    aplicar_vader,
+    detectar_idiomas,
+    idiomas_top5,
+    preprocessar_textos,
+    registrar_execucao,
+    VADER_MIN_PARALELO,
+)
+from armazenamento import PARQUET_AVAILABLE, salvar_parquet
+from agregados import obter_agregados
+from instrumentacao import CONTADORES_API, CONTADORES_CACHE, Instrumentacao
+from quota import QuotaExcedida, ajustar_ao_saldo, obter_livro
+
+CRITERIOS = {
+    "recentes": listar_videos_recentes,
+    "vistos": listar_videos_mais_vistos,
+    "comentados": listar_videos_mais_comentados,
+}
+
+
+# ============================================================
+#   ENTRADAS E CHECKPOINT
+# ============================================================
+def ler_entradas(caminho: str) -> List[str]:
+    with open(caminho, encoding="utf-8-sig") as f:
+        linhas = [l.strip() for l in f]
+    return [l for l in linhas if l and not l.startswith("#")]
+
+
+def pasta_checkpoint(arquivo_entrada: str, saida: str) -> str:
+    nome = os.path.splitext(os.path.basename(arquivo_entrada))[0]
+    return os.path.join(saida, "checkpoints", nome)
+
+
+def gravar_checkpoint(df: pd.DataFrame, destino: str) -> None:
+    """Grava em arquivo temporário e renomeia: um checkpoint nunca fica pela metade."""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    df.to_csv(destino + ".tmp", index=False, encoding="utf-8-sig")
+    os.replace(destino + ".tmp", destino)
+
+
+def ler_checkpoint(caminho: str) -> pd.DataFrame:
+    return pd.read_csv(caminho, encoding="utf-8-sig", keep_default_na=False)
+
+
+def resolver_videos(entrada: str, criterio: str, max_videos: int) -> Tuple[str, List[Dict]]:
+    """
+    Devolve (canal_id, vídeos). Um link de vídeo vira um único vídeo; qualquer
+    outra entrada é tratada como canal.
+    """
+    canal_id = extrair_channel_id(entrada)
+    video_id = extrair_video_id(entrada)
+    if video_id:
+        return canal_id, [{"video_id": video_id}]
+    return canal_id, CRITERIOS[criterio](canal_id, max_videos=max_videos)
+
+
+def planejar(
+    entradas: List[str], criterio: str, max_videos: int, checkpoint: str
+) -> List[Tuple[str, str, str]]:
+    """
+    Resolve todas as entradas em (entrada, video_id, canal_id), reaproveitando o
+    plano salvo no checkpoint para que a retomada processe exatamente os mesmos
+    vídeos (e não precise resolver os canais de novo).
+    """
+    caminho_plano = os.path.join(checkpoint, "plano.json")
+    if os.path.exists(caminho_plano):
+        with open(caminho_plano, encoding="utf-8") as f:
+            salvo = [tuple(p) for p in json.load(f)]
+        # Planos antigos não guardavam o canal: resolve uma vez por entrada
+        canais: Dict[str, str] = {}
+        for p in salvo:
+            if len(p) == 2 and p[0] not in canais:
+                canais[p[0]] = extrair_channel_id(p[0]) or "desconhecido"
+        return [p if len(p) == 3 else (p[0], p[1], canais[p[0]]) for p in salvo]
+
+    plano: List[Tuple[str, str, str]] = []
+    vistos = set()
+    for entrada in entradas:
+        try:
+            canal_id, videos = resolver_videos(entrada, criterio, max_videos)
+        except QuotaExcedida:
+            raise  # sem quota o plano ficaria incompleto; melhor não salvá-lo
+        except Exception as e:
+            print(f"⚠ Entrada ignorada ({entrada}): {e}")
+            continue
+        for v in videos:
+            if v["video_id"] not in vistos:
+                vistos.add(v["video_id"])
+                plano.append((entrada, v["video_id"], canal_id or "desconhecido"))
+
+    os.makedirs(checkpoint, exist_ok=True)
+    with open(caminho_plano, "w", encoding="utf-8") as f:
+        json.dump(plano, f, ensure_ascii=False, indent=2)
+    return plano
+
+
+# ============================================================
+#   PROCESSAMENTO
+# ============================================================
+def executar(args: argparse.Namespace) -> int:
+    instrumentacao = Instrumentacao()
+    checkpoint = pasta_checkpoint(args.arquivo, args.saida)
+    if args.reiniciar and os.path.isdir(checkpoint):
+        shutil.rmtree(checkpoint)
+
+    try:
+        with instrumentacao.etapa("planejamento") as medicao:
+            plano = planejar(ler_entradas(args.arquivo), args.criterio, args.max_videos, checkpoint)
+            medicao.itens += len(plano)
+    except QuotaExcedida as e:
+        print(f"⛔ {e}")
+        return 1
+    # Dois checkpoints por vídeo: brutos/<vid>.csv (coleta, gravado assim que o
+    # vídeo termina de baixar) e <vid>.csv (já pontuado). Um vídeo com a coleta
+    # gravada nunca é baixado de novo, mesmo que a análise falhe ou seja interrompida.
+    pasta_brutos = os.path.join(checkpoint, "brutos")
+
+    def _pontuado(vid: str) -> str:
+        return os.path.join(checkpoint, f"{vid}.csv")
+
+    def _bruto(vid: str) -> str:
+        return os.path.join(pasta_brutos, f"{vid}.csv")
+
+    pendentes = [(entrada, vid) for entrada, vid, _ in plano if not os.path.exists(_pontuado(vid))]
+    coletados = [(entrada, vid) for entrada, vid in pendentes if os.path.exists(_bruto(vid))]
+    a_coletar = [(entrada, vid) for entrada, vid in pendentes if not os.path.exists(_bruto(vid))]
+    print(
+        f"▶️ {len(plano)} vídeos no plano, {len(plano) - len(pendentes)} já concluídos, "
+        f"{len(coletados)} já coletados aguardando análise, {len(a_coletar)} a coletar."
+    )
+
+    # Encaixa a coleta no saldo de quota do dia: os vídeos que não couberem ficam
+    # pendentes no checkpoint e são retomados na próxima execução
+    max_comments = args.max_comments
+    if a_coletar:
+        try:
+            orcamento = ajustar_ao_saldo(0, len(a_coletar), max_comments, obter_livro().restante())
+        except QuotaExcedida as e:
+            print(f"⛔ {e} Rode novamente quando a quota for renovada.")
+            return 1
+        if orcamento["degradado"]:
+            a_coletar = a_coletar[: orcamento["n_videos"]]
+            max_comments = orcamento["max_comments"]
+            print(
+                f"📒 Quota: restam {orcamento['restante']} unidades hoje; coletando {len(a_coletar)} vídeos "
+                f"com até {max_comments} comentários cada."
+            )
+
+    etapas = [
+        ("limpeza", preprocessar_textos),
+        ("idioma", detectar_idiomas),
+        ("vader", aplicar_vader),
+    ]
+    if not args.sem_bert:
+        etapas.append(("bert", aplicar_bert))
+
+    # A coleta (I/O) roda em paralelo; a pontuação roda na thread principal, à
+    # medida que as coletas terminam. Os vídeos coletados se acumulam até somar
+    # --lote-pontuacao comentários (ou a coleta acabar) e são pontuados juntos:
+    # com volume suficiente, VADER e idioma usam o pool de processos (veja
+    # VADER_MIN_PARALELO e IDIOMA_MIN_PARALELO). A etapa "coleta" vai do primeiro
+    # envio até o fim do último vídeo, medida à parte da pontuação.
+    coleta_aberta = instrumentacao.abrir_etapa("coleta", contar=CONTADORES_API) if a_coletar else None
+    restantes = [len(a_coletar)]
+    lock_coleta = threading.Lock()
+
+    def _coleta_concluida(futuro) -> None:
+        with lock_coleta:
+            if not futuro.exception():
+                coleta_aberta.medicao.itens += len(futuro.result())
+            restantes[0] -= 1
+            if restantes[0] == 0:
+                instrumentacao.fechar_etapa(coleta_aberta)
+
+    total = len(coletados) + len(a_coletar)
+    concluidos = [0]
+
+    def _pontuar_e_gravar(grupo: List[Tuple[str, str]]) -> None:
+        df = pd.concat([ler_checkpoint(_bruto(vid)) for _, vid in grupo], ignore_index=True)
+        try:
+            for nome, funcao in etapas:
+                with instrumentacao.etapa(nome, contar=CONTADORES_CACHE) as medicao:
+                    df = funcao(df)
+                    medicao.itens += len(df)
+        except Exception as e:
+            if len(grupo) > 1:
+                # Isola o vídeo com problema: os demais do grupo seguem normalmente
+                for item in grupo:
+                    _pontuar_e_gravar([item])
+                return
+            concluidos[0] += 1
+            print(f"⚠ [{concluidos[0]}/{total}] {grupo[0][1]}: erro na análise; a coleta está salva "
+                  f"e a análise será refeita na próxima execução ({e})")
+            return
+        por_video = dict(tuple(df.groupby("video_id", sort=False)))
+        for _, vid in grupo:
+            parte = por_video.get(vid, df.iloc[0:0])
+            gravar_checkpoint(parte, _pontuado(vid))
+            os.remove(_bruto(vid))
+            concluidos[0] += 1
+            print(f"✅ [{concluidos[0]}/{total}] {vid}: {len(parte)} comentários")
+
+    grupo: List[Tuple[str, str]] = []
+    tamanho_grupo = [0]
+
+    def _enfileirar(entrada: str, vid: str, n_comentarios: int) -> None:
+        nonlocal grupo
+        grupo.append((entrada, vid))
+        tamanho_grupo[0] += n_comentarios
+        if tamanho_grupo[0] >= args.lote_pontuacao:
+            _pontuar_e_gravar(grupo)
+            grupo, tamanho_grupo[0] = [], 0
+
+    # Com --incremental, só os comentários novos de cada vídeo são baixados (armazém local)
+    coletar = coletar_comentarios_incremental if args.incremental else coletar_comentarios_video
+    with ThreadPoolExecutor(max_workers=max(1, args.paralelo)) as executor:
+        futuros = {
+            executor.submit(coletar, vid, max_comments): (entrada, vid)
+            for entrada, vid in a_coletar
+        }
+        for futuro in futuros:
+            futuro.add_done_callback(_coleta_concluida)
+        # Coletas de execuções anteriores entram primeiro, enquanto os downloads andam
+        for entrada, vid in coletados:
+            _enfileirar(entrada, vid, len(ler_checkpoint(_bruto(vid))))
+        for futuro in as_completed(futuros):
+            entrada, vid = futuros[futuro]
+            try:
+                comentarios = pd.DataFrame(futuro.result(), columns=COLUNAS_COMENTARIOS)
+            except Exception as e:
+                concluidos[0] += 1
+                print(f"⚠ [{concluidos[0]}/{total}] {vid}: erro, será tentado na próxima execução ({e})")
+                continue
+            comentarios.insert(0, "entrada", entrada)
+            gravar_checkpoint(comentarios, _bruto(vid))
+            _enfileirar(entrada, vid, len(comentarios))
+        if grupo:
+            _pontuar_e_gravar(grupo)
+
+    faltando = [vid for _, vid, _ in plano if not os.path.exists(_pontuado(vid))]
+    if faltando:
+        print(f"⚠ {len(faltando)} vídeos não concluídos (erro ou falta de quota); rode novamente para retomar.")
+        return 1
+
+    canais = {entrada: canal_id for entrada, _, canal_id in plano}
+    with instrumentacao.etapa("gravacao") as medicao:
+        partes = [
+            ler_checkpoint(_pontuado(vid))
+            for _, vid, _ in plano
+        ]
+        df_final = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+        os.makedirs(args.saida, exist_ok=True)
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        arquivo_saida = os.path.join(args.saida, f"analise_lote_{ts}.csv")
+        df_final.to_csv(arquivo_saida, index=False, encoding="utf-8-sig")
+
+        if not args.sem_parquet and not df_final.empty:
+            if PARQUET_AVAILABLE:
+                for entrada, df_entrada in df_final.groupby("entrada", sort=False):
+                    df_entrada = df_entrada.drop(columns="entrada")
+                    salvar_parquet(df_entrada[COLUNAS_COMENTARIOS], canais[entrada], tipo="comentarios")
+                    salvar_parquet(df_entrada, canais[entrada], tipo="analises")
+            else:
+                print("⚠ pyarrow não está instalado: o Parquet não foi gravado (instale-o ou use --sem-parquet).")
+        medicao.itens += len(df_final)
+
+    # Agregados por canal/vídeo/dia para as consultas de tendência
+    if not df_final.empty:
+        with instrumentacao.etapa("agregados", contar=()) as medicao:
+            for entrada, df_entrada in df_final.groupby("entrada", sort=False):
+                medicao.itens += obter_agregados().registrar(df_entrada, canais[entrada])
+
+    instrumentacao.concluir()
+    registrar_execucao(
+        df_final,
+        arquivo_entrada=args.arquivo,
+        arquivo_saida=arquivo_saida,
+        idiomas_top5=idiomas_top5(df_final),
+        metricas=instrumentacao.resumo_log(),
+    )
+    instrumentacao.exportar_prometheus(rotulos={"origem": "lote"})
+    shutil.rmtree(checkpoint, ignore_errors=True)
+
+    print(f"📦 {len(df_final)} comentários salvos em {arquivo_saida}")
+    print(instrumentacao.tabela().to_string(index=False))
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("arquivo", help="arquivo com um canal ou vídeo por linha")
+    parser.add_argument("--criterio", choices=sorted(CRITERIOS), default="recentes",
+                        help="como escolher os vídeos de cada canal (padrão: recentes)")
+    parser.add_argument("--max-videos", type=int, default=5, help="vídeos por canal (padrão: 5)")
+    parser.add_argument("--max-comments", type=int, default=200, help="comentários por vídeo (padrão: 200)")
+    parser.add_argument("--paralelo", type=int, default=4, help="vídeos coletados ao mesmo tempo (padrão: 4)")
+    parser.add_argument("--saida", default="resultados", help="pasta de saída (padrão: resultados)")
+    parser.add_argument("--sem-bert", action="store_true", help="roda só o VADER")
+    parser.add_argument("--sem-parquet", action="store_true",
+                        help="não grava os comentários e as análises em Parquet particionado por canal/data")
+    # Antes o Parquet era opcional; a opção antiga continua aceita e não faz nada
+    parser.add_argument("--parquet", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--lote-pontuacao", type=int, default=VADER_MIN_PARALELO,
+                        help="comentários acumulados antes de pontuar; lotes grandes usam vários processos "
+                             f"(padrão: {VADER_MIN_PARALELO})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="baixa só os comentários novos desde a última coleta de cada vídeo")
+    parser.add_argument("--reiniciar", action="store_true", help="descarta o progresso salvo e recomeça")
+    return executar(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+# Arquivo opcional onde as métricas da última execução são gravadas no formato
+# texto do Prometheus (ex.: para o textfile collector do node_exporter)
+PROMETHEUS_ARQUIVO = os.getenv("PROMETHEUS_ARQUIVO", "")
+
+# Intervalo de amostragem da memória (RSS) enquanto há etapas abertas
+INTERVALO_AMOSTRA_MEMORIA = float(os.getenv("INSTRUMENTACAO_INTERVALO_MEMORIA", 0.05))
+
+
+# ============================================================
+#   CONTADORES GLOBAIS DO PROCESSO
+# ============================================================
+# Chamadas à API e unidades de quota, acumuladas desde o início do processo.
+# As etapas guardam a diferença entre o início e o fim (veja Instrumentacao.etapa).
+_contadores: Counter = Counter()
+_contadores_lock = threading.Lock()
+
+CONTADORES_API = ("chamadas_api", "quota_unidades")
+CONTADORES_CACHE = ("cache_hits", "cache_misses")
+
+
+def registrar_chamada_api(recurso: str, unidades: int) -> None:
+    """Chamado pelo cliente HTTP a cada requisição feita à API do YouTube."""
+    with _contadores_lock:
+        _contadores["chamadas_api"] += 1
+        _contadores[f"chamadas_api:{recurso}"] += 1
+        _contadores["quota_unidades"] += unidades
+
+
+def contadores_processo() -> Dict[str, int]:
+    """Cópia dos contadores globais, somando hits/misses de todos os caches SQLite."""
+    from cache import totais_caches
+
+    with _contadores_lock:
+        copia = dict(_contadores)
+    copia.update(totais_caches())
+    return copia
+
+
+# ============================================================
+#   MEMÓRIA
+# ============================================================
+def rss_atual_mb() -> Optional[float]:
+    """RSS atual do processo em MB (Linux via /proc; senão psutil, se instalado)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil  # type: ignore
+
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        return None
+
+
+# ============================================================
+#   MEDIÇÃO POR ETAPA
+# ============================================================
+class MedicaoEtapa:
+    """Acumulado de uma etapa (pode ser medida várias vezes, ex.: uma vez por lote)."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.segundos = 0.0
+        self.execucoes = 0
+        self.itens = 0
+        self.contadores: Counter = Counter()
+        self.pico_memoria_mb: Optional[float] = None
+
+    def observar_memoria(self, rss: Optional[float]) -> None:
+        if rss is not None and (self.pico_memoria_mb is None or rss > self.pico_memoria_mb):
+            self.pico_memoria_mb = rss
+
+    def como_dict(self) -> Dict:
+        return {
+            "etapa": self.nome,
+            "segundos": round(self.segundos, 4),
+            "execucoes": self.execucoes,
+            "itens": self.itens,
+            "itens_por_s": round(self.itens / self.segundos, 1) if self.segundos else None,
+            "chamadas_api": self.contadores["chamadas_api"],
+            "quota_unidades": self.contadores["quota_unidades"],
+            "cache_hits": self.contadores["cache_hits"],
+            "cache_misses": self.contadores["cache_misses"],
+            "pico_memoria_mb": round(self.pico_memoria_mb, 1) if self.pico_memoria_mb is not None else None,
+        }
+
+
+class EtapaAberta(NamedTuple):
+    medicao: MedicaoEtapa
+    contar: Tuple[str, ...]
+    antes: Dict[str, int]
+    inicio: float
+
+
+class Instrumentacao:
+    """
+    Registra, por etapa de uma execução, tempo de parede, nº de itens, chamadas à
+    API, unidades de quota, hits/misses de cache e pico de memória (RSS).
+
+        inst = Instrumentacao()
+        with inst.etapa("vader") as m:
+            df = aplicar_vader(df)
+            m.itens += len(df)
+
+    Chamadas à API e acessos a cache são contados pela diferença dos contadores do
+    processo entre a entrada e a saída da etapa. Quando etapas rodam ao mesmo
+    tempo (coleta em threads enquanto os lotes são pontuados), restrinja 'contar'
+    ao que cada uma de fato faz (CONTADORES_API na coleta, CONTADORES_CACHE na
+    análise) para nada ser contado duas vezes. Os contadores são do processo:
+    sessões simultâneas do dashboard se misturam.
+
+    A memória é amostrada por uma thread a cada INTERVALO_AMOSTRA_MEMORIA segundos
+    enquanto houver etapas abertas; cada etapa guarda o maior RSS visto.
+    """
+
+    def __init__(self):
+        self.etapas: Dict[str, MedicaoEtapa] = {}
+        self.inicio = time.perf_counter()
+        self.fim: Optional[float] = None
+        self._abertas: List[MedicaoEtapa] = []
+        self._lock = threading.Lock()
+        self._amostrador: Optional[threading.Thread] = None
+
+    def _amostrar(self) -> None:
+        while True:
+            rss = rss_atual_mb()
+            with self._lock:
+                if not self._abertas:
+                    self._amostrador = None
+                    return
+                for medicao in self._abertas:
+                    medicao.observar_memoria(rss)
+            time.sleep(INTERVALO_AMOSTRA_MEMORIA)
+
+    def abrir_etapa(
+        self, nome: str, contar: Tuple[str, ...] = CONTADORES_API + CONTADORES_CACHE
+    ) -> "EtapaAberta":
+        """
+        Começa a medir uma etapa. Prefira o contexto etapa(); esta forma serve quando
+        o fim acontece em outra thread (ex.: no callback do último futuro da coleta).
+        """
+        with self._lock:
+            medicao = self.etapas.setdefault(nome, MedicaoEtapa(nome))
+            self._abertas.append(medicao)
+            if self._amostrador is None:
+                self._amostrador = threading.Thread(target=self._amostrar, daemon=True)
+                self._amostrador.start()
+        medicao.observar_memoria(rss_atual_mb())
+        return EtapaAberta(medicao, contar, contadores_processo(), time.perf_counter())
+
+    def fechar_etapa(self, aberta: "EtapaAberta") -> None:
+        duracao = time.perf_counter() - aberta.inicio
+        depois = contadores_processo()
+        medicao = aberta.medicao
+        medicao.observar_memoria(rss_atual_mb())
+        with self._lock:
+            self._abertas.remove(medicao)
+            medicao.segundos += duracao
+            medicao.execucoes += 1
+            for chave in aberta.contar:
+                medicao.contadores[chave] += depois.get(chave, 0) - aberta.antes.get(chave, 0)
+
+    @contextmanager
+    def etapa(
+        self, nome: str, contar: Tuple[str, ...] = CONTADORES_API + CONTADORES_CACHE
+    ) -> Iterator[MedicaoEtapa]:
+        aberta = self.abrir_etapa(nome, contar)
+        try:
+            yield aberta.medicao
+        finally:
+            self.fechar_etapa(aberta)
+
+    def concluir(self) -> "Instrumentacao":
+        """Fixa o fim da execução (o tempo total deixa de correr)."""
+        self.fim = time.perf_counter()
+        return self
+
+    # --------------------------------------------------------
+    #   Saídas
+    # --------------------------------------------------------
+    def tabela(self) -> pd.DataFrame:
+        """Uma linha por etapa, na ordem em que as etapas começaram."""
+        colunas = list(MedicaoEtapa("").como_dict())
+        return pd.DataFrame([m.como_dict() for m in self.etapas.values()], columns=colunas)
+
+    def totais(self) -> Dict:
+        linhas = [m.como_dict() for m in self.etapas.values()]
+        picos = [l["pico_memoria_mb"] for l in linhas if l["pico_memoria_mb"] is not None]
+        return {
+            "tempo_total_s": round((self.fim or time.perf_counter()) - self.inicio, 3),
+            "chamadas_api": sum(l["chamadas_api"] for l in linhas),
+            "quota_unidades": sum(l["quota_unidades"] for l in linhas),
+            "cache_hits": sum(l["cache_hits"] for l in linhas),
+            "cache_misses": sum(l["cache_misses"] for l in linhas),
+            "pico_memoria_mb": max(picos) if picos else None,
+        }
+
+    def resumo_log(self) -> Dict:
+        """Colunas extras de logs/analises.csv: totais + tempo de cada etapa."""
+        resumo = self.totais()
+        resumo["tempos_etapas"] = "; ".join(
+            f"{m.nome}:{m.segundos:.2f}s" for m in self.etapas.values()
+        )
+        return resumo
+
+    def prometheus(self, prefixo: str = "yt_sentimento", rotulos: Optional[Dict[str, str]] = None) -> str:
+        """Métricas da execução no formato texto de exposição do Prometheus."""
+        extras = "".join(f',{k}="{_escapar(v)}"' for k, v in (rotulos or {}).items())
+        metricas = [
+            ("etapa_segundos", "gauge", "Tempo de parede da etapa", "segundos"),
+            ("etapa_itens", "gauge", "Itens processados na etapa", "itens"),
+            ("etapa_chamadas_api", "gauge", "Requisições à API do YouTube na etapa", "chamadas_api"),
+            ("etapa_quota_unidades", "gauge", "Unidades de quota gastas na etapa", "quota_unidades"),
+            ("etapa_cache_hits", "gauge", "Acertos de cache na etapa", "cache_hits"),
+            ("etapa_cache_misses", "gauge", "Faltas de cache na etapa", "cache_misses"),
+            ("etapa_pico_memoria_bytes", "gauge", "Maior RSS observado durante a etapa", "pico_memoria_mb"),
+        ]
+        linhas_etapas = [m.como_dict() for m in self.etapas.values()]
+        saida: List[str] = []
+        for nome, tipo, ajuda, campo in metricas:
+            saida.append(f"# HELP {prefixo}_{nome} {ajuda}")
+            saida.append(f"# TYPE {prefixo}_{nome} {tipo}")
+            for linha in linhas_etapas:
+                valor = linha[campo]
+                if valor is None:
+                    continue
+                if campo == "pico_memoria_mb":
+                    valor = int(valor * 1024 * 1024)
+                saida.append(f'{prefixo}_{nome}{{etapa="{_escapar(linha["etapa"])}"{extras}}} {valor}')
+
+        # Contadores acumulados do processo, por recurso da API
+        saida.append(f"# HELP {prefixo}_api_chamadas_total Requisições à API do YouTube desde o início do processo")
+        saida.append(f"# TYPE {prefixo}_api_chamadas_total counter")
+        for chave, valor in sorted(contadores_processo().items()):
+            if chave.startswith("chamadas_api:"):
+                recurso = chave.split(":", 1)[1]
+                saida.append(f'{prefixo}_api_chamadas_total{{recurso="{_escapar(recurso)}"}} {valor}')
+        return "\n".join(saida) + "\n"
+
+    def exportar_prometheus(self, caminho: str = PROMETHEUS_ARQUIVO, **kwargs) -> Optional[str]:
+        """
+        Grava prometheus() em 'caminho' (padrão: PROMETHEUS_ARQUIVO) de forma atômica.
+        Sem caminho configurado, não faz nada e devolve None.
+        """
+        if not caminho:
+            return None
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.prometheus(**kwargs))
+        os.replace(caminho + ".tmp", caminho)
+        return caminho
+
+
+def medir(
+    instrumentacao: Optional[Instrumentacao],
+    nome: str,
+    contar: Tuple[str, ...] = CONTADORES_API + CONTADORES_CACHE,
+):
+    """instrumentacao.etapa(nome) ou, sem instrumentação, um contexto que só descarta as medições."""
+    if instrumentacao is None:
+        return nullcontext(MedicaoEtapa(nome))
+    return instrumentacao.etapa(nome, contar=contar)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
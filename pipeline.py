@@ -0,0 +1,178 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from coleta import (
+    MAX_WORKERS_COLETA,
+    COLUNAS_COMENTARIOS,
+    coletar_comentarios_incremental,
+    iterar_paginas_comentarios,
+)
+from analise import aplicar_bert, aplicar_sentimento_roteado, aplicar_vader, preprocessar_textos
+from instrumentacao import CONTADORES_API, CONTADORES_CACHE, Instrumentacao, medir
+
+# Tamanho dos micro-lotes enviados aos modelos e nº de páginas que podem ficar
+# aguardando entre a coleta e a análise (acima disso a coleta espera)
+TAMANHO_LOTE = 200
+MAX_PAGINAS_PENDENTES = 8
+
+_FIM = object()
+
+
+# ============================================================
+#   PIPELINE EM FLUXO: COLETA -> LIMPEZA -> PONTUAÇÃO
+# ============================================================
+def processar_em_fluxo(
+    videos: List[Dict],
+    max_comments_por_video: int,
+    tamanho_lote: int = TAMANHO_LOTE,
+    max_paginas_pendentes: int = MAX_PAGINAS_PENDENTES,
+    max_workers: Optional[int] = None,
+    usar_bert: bool = True,
+    roteado: bool = False,
+    incremental: bool = False,
+    instrumentacao: Optional[Instrumentacao] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Coleta, limpa e pontua comentários em micro-lotes, à medida que as páginas chegam.
+
+    Threads de coleta (uma por vídeo, até 'max_workers') colocam cada página numa
+    fila limitada; este gerador consome a fila, junta 'tamanho_lote' comentários,
+    roda preprocessar_textos + aplicar_vader (+ aplicar_bert) e entrega o lote já
+    pontuado. Se os modelos ficarem para trás, a fila enche e a coleta pausa
+    (backpressure), de modo que a memória fica limitada a poucos lotes.
+
+    Com roteado=True, cada lote passa por aplicar_sentimento_roteado (BERT só em
+    textos não ingleses ou ambíguos para o VADER).
+
+    Com incremental=True, cada vídeo é sincronizado com o armazém local de
+    comentários (só os novos são baixados) e entra no fluxo como uma página só,
+    com os 'max_comments_por_video' mais recentes do armazém.
+
+    Os lotes saem na ordem de chegada; para a ordem da lista de vídeos, use
+    ordenar_por_videos() no DataFrame final.
+
+    Com 'instrumentacao', a coleta é medida como uma etapa só (do início ao fim
+    das threads, com as chamadas à API) e cada etapa de análise acumula o tempo
+    gasto em todos os lotes.
+    """
+    fila: queue.Queue = queue.Queue(maxsize=max(1, max_paginas_pendentes))
+    parar = threading.Event()
+
+    def _colocar(item) -> bool:
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _coletar(v: Dict) -> int:
+        total = 0
+        if incremental:
+            paginas = iter([coletar_comentarios_incremental(v["video_id"], max_comments=max_comments_por_video)])
+        else:
+            paginas = iterar_paginas_comentarios(v["video_id"], max_comments=max_comments_por_video)
+        for pagina in paginas:
+            if not _colocar(pagina):
+                break
+            total += len(pagina)
+        return total
+
+    def _produzir() -> None:
+        try:
+            n_workers = max(1, min(max_workers or MAX_WORKERS_COLETA, len(videos) or 1))
+            with medir(instrumentacao, "coleta", contar=CONTADORES_API) as medicao:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    for futuro in [executor.submit(_coletar, v) for v in videos]:
+                        medicao.itens += futuro.result()
+        except BaseException as erro:  # repassado ao consumidor
+            _colocar(erro)
+        finally:
+            _colocar(_FIM)
+
+    produtor = threading.Thread(target=_produzir, daemon=True)
+    produtor.start()
+
+    def _pontuar(linhas: List[Dict]) -> pd.DataFrame:
+        lote = pd.DataFrame(linhas, columns=COLUNAS_COMENTARIOS)
+        etapas = [("limpeza", preprocessar_textos)]
+        if roteado:
+            etapas.append(("sentimento_roteado", aplicar_sentimento_roteado))
+        else:
+            etapas.append(("vader", aplicar_vader))
+            if usar_bert:
+                etapas.append(("bert", aplicar_bert))
+        for nome, funcao in etapas:
+            with medir(instrumentacao, nome, contar=CONTADORES_CACHE) as medicao:
+                lote = funcao(lote)
+                medicao.itens += len(lote)
+        return lote
+
+    buffer: List[Dict] = []
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            buffer.extend(item)
+            while len(buffer) >= tamanho_lote:
+                linhas, buffer = buffer[:tamanho_lote], buffer[tamanho_lote:]
+                yield _pontuar(linhas)
+        if buffer:
+            yield _pontuar(buffer)
+    finally:
+        parar.set()
+
+
+def ordenar_por_videos(df: pd.DataFrame, videos: List[Dict]) -> pd.DataFrame:
+    """Reordena (de forma estável) as linhas segundo a ordem da lista de vídeos."""
+    if df.empty:
+        return df
+    posicao = {v["video_id"]: i for i, v in enumerate(videos)}
+    chave = df["video_id"].map(posicao)
+    return df.iloc[chave.argsort(kind="stable")].reset_index(drop=True)
+
+
+# ============================================================
+#   TOTAIS PARCIAIS
+# ============================================================
+class TotaisSentimento:
+    """Contagens acumuladas por modelo e rótulo, atualizadas a cada lote."""
+
+    def __init__(self):
+        self.total = 0
+        self.contagens: Dict[str, Dict[str, int]] = {"vader": {}, "bert": {}}
+        self.linhas = 0
+        self.textos_unicos = 0
+        self.roteamento = {"vader": 0, "bert": 0, "tempo_economizado_s": 0.0}
+
+    def atualizar(self, lote: pd.DataFrame) -> None:
+        self.total += len(lote)
+        for modelo in ("vader", "bert"):
+            coluna = f"{modelo}_label"
+            if coluna not in lote.columns:
+                continue
+            # No modo roteado, bert_label fica vazio nas linhas decididas pelo VADER
+            for rotulo, qtd in lote.loc[lote[coluna] != "", coluna].value_counts().items():
+                self.contagens[modelo][rotulo] = self.contagens[modelo].get(rotulo, 0) + int(qtd)
+        dedup = lote.attrs.get("deduplicacao", {}).get("vader")
+        if dedup:
+            self.linhas += dedup["linhas"]
+            self.textos_unicos += dedup["textos_unicos"]
+        for chave, valor in lote.attrs.get("roteamento", {}).items():
+            if chave in self.roteamento:
+                self.roteamento[chave] += valor
+
+    def percentual(self, modelo: str, rotulo: str) -> float:
+        """Percentual sobre as linhas rotuladas por 'modelo' (no modo roteado, parte do total)."""
+        rotuladas = sum(self.contagens[modelo].values())
+        if not rotuladas:
+            return 0.0
+        return self.contagens[modelo].get(rotulo, 0) / rotuladas * 100
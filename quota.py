@@ -0,0 +1,207 @@
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+# Orçamento diário de unidades da YouTube Data API (0 = sem limite, só contabiliza)
+QUOTA_DIARIA = int(os.getenv("YT_QUOTA_DIARIA", 10_000))
+
+# O que fazer quando a execução planejada não cabe no saldo do dia:
+# "degradar" (menos comentários e, se preciso, menos vídeos) ou "recusar"
+POLITICA_QUOTA = os.getenv("YT_QUOTA_POLITICA", "degradar")
+
+# Livro-caixa persistente com as unidades gastas por dia e recurso
+LIVRO_QUOTA = os.getenv("YT_LIVRO_QUOTA", os.path.join("data", "quota.sqlite"))
+
+# Custo em unidades de cada recurso da API (leituras custam 1; search, 100)
+CUSTO_QUOTA = {"search": 100}
+CUSTO_QUOTA_PADRAO = 1
+
+try:
+    from zoneinfo import ZoneInfo
+
+    # A quota da API é zerada à meia-noite do horário do Pacífico
+    _FUSO_QUOTA = ZoneInfo("America/Los_Angeles")
+except Exception:  # sem base de fusos (ex.: Windows sem tzdata)
+    _FUSO_QUOTA = timezone(timedelta(hours=-8))
+
+
+class QuotaExcedida(Exception):
+    """A requisição ou a execução planejada passaria do orçamento diário de quota."""
+
+
+def custo_requisicao(recurso: str) -> int:
+    return CUSTO_QUOTA.get(recurso, CUSTO_QUOTA_PADRAO)
+
+
+def dia_quota(momento: Optional[datetime] = None) -> str:
+    """Dia de contabilização da quota (AAAA-MM-DD no horário do Pacífico)."""
+    return (momento or datetime.now(timezone.utc)).astimezone(_FUSO_QUOTA).strftime("%Y-%m-%d")
+
+
+# ============================================================
+#   LIVRO-CAIXA DE QUOTA (SQLite)
+# ============================================================
+class LivroQuota:
+    """
+    Unidades de quota gastas por dia e recurso, persistidas em SQLite e
+    compartilhadas entre o dashboard, a CLI e processos paralelos.
+
+    reservar() verifica o saldo e lança o gasto numa única transação, de modo que
+    dois processos não ultrapassam juntos o orçamento. Com orcamento=0 o livro só
+    contabiliza, sem bloquear nada.
+    """
+
+    def __init__(self, caminho: str = LIVRO_QUOTA, orcamento: int = QUOTA_DIARIA):
+        self.caminho = caminho
+        self.orcamento = orcamento
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uso (
+                    dia TEXT NOT NULL,
+                    recurso TEXT NOT NULL,
+                    chamadas INTEGER NOT NULL,
+                    unidades INTEGER NOT NULL,
+                    PRIMARY KEY (dia, recurso)
+                )
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def reservar(self, recurso: str, unidades: Optional[int] = None) -> None:
+        """Lança uma requisição no dia corrente; lança QuotaExcedida se não houver saldo."""
+        unidades = custo_requisicao(recurso) if unidades is None else unidades
+        dia = dia_quota()
+        with self._lock:
+            conn = self._conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.orcamento:
+                    usado = conn.execute(
+                        "SELECT COALESCE(SUM(unidades), 0) FROM uso WHERE dia = ?", (dia,)
+                    ).fetchone()[0]
+                    if usado + unidades > self.orcamento:
+                        raise QuotaExcedida(
+                            f"Quota diária esgotada: {usado} de {self.orcamento} unidades usadas em {dia}; "
+                            f"'{recurso}' custaria mais {unidades}."
+                        )
+                conn.execute(
+                    "INSERT INTO uso (dia, recurso, chamadas, unidades) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (dia, recurso) DO UPDATE SET "
+                    "chamadas = chamadas + 1, unidades = unidades + excluded.unidades",
+                    (dia, recurso, unidades),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def usado(self, dia: Optional[str] = None) -> int:
+        with self._lock:
+            return self._conexao().execute(
+                "SELECT COALESCE(SUM(unidades), 0) FROM uso WHERE dia = ?", (dia or dia_quota(),)
+            ).fetchone()[0]
+
+    def restante(self) -> Optional[int]:
+        """Saldo do dia corrente (None quando não há orçamento configurado)."""
+        if not self.orcamento:
+            return None
+        return max(0, self.orcamento - self.usado())
+
+    def por_recurso(self, dia: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            linhas = self._conexao().execute(
+                "SELECT recurso, chamadas, unidades FROM uso WHERE dia = ? ORDER BY unidades DESC",
+                (dia or dia_quota(),),
+            ).fetchall()
+        return {r: {"chamadas": c, "unidades": u} for r, c, u in linhas}
+
+
+_livro: Optional[LivroQuota] = None
+_livro_lock = threading.Lock()
+
+
+def obter_livro() -> LivroQuota:
+    global _livro
+    if _livro is None:
+        with _livro_lock:
+            if _livro is None:
+                _livro = LivroQuota()
+    return _livro
+
+
+# ============================================================
+#   PLANEJAMENTO DE EXECUÇÕES
+# ============================================================
+def paginas(itens: int, por_pagina: int) -> int:
+    return max(1, math.ceil(itens / por_pagina)) if itens > 0 else 0
+
+
+def ajustar_ao_saldo(
+    custo_fixo: int,
+    n_videos: int,
+    max_comments: int,
+    restante: Optional[int],
+    politica: str = POLITICA_QUOTA,
+) -> Dict:
+    """
+    Encaixa uma execução (custo_fixo para achar os vídeos + páginas de 100
+    comentários por vídeo) no saldo do dia.
+
+    Dentro do saldo, nada muda. Fora dele, com politica="recusar" lança
+    QuotaExcedida; com "degradar" corta primeiro os comentários por vídeo (até uma
+    página) e depois o número de vídeos. Se nem um vídeo com uma página couber,
+    lança QuotaExcedida.
+    """
+    def _custo(videos: int, comentarios: int) -> int:
+        return custo_fixo + videos * paginas(comentarios, 100)
+
+    estimativa = _custo(n_videos, max_comments)
+    plano = {
+        "estimativa": estimativa,
+        "restante": restante,
+        "n_videos": n_videos,
+        "max_comments": max_comments,
+        "degradado": False,
+    }
+    if restante is None or estimativa <= restante:
+        return plano
+    if politica == "recusar":
+        raise QuotaExcedida(
+            f"A execução custaria ~{estimativa} unidades de quota, mas restam {restante} hoje."
+        )
+
+    por_video = max(0, (restante - custo_fixo) // max(1, n_videos))
+    if por_video >= 1:
+        comentarios = min(max_comments, por_video * 100)
+        videos = n_videos
+    else:
+        comentarios = min(max_comments, 100)
+        videos = max(0, restante - custo_fixo)
+    if videos < 1:
+        raise QuotaExcedida(
+            f"Restam {restante} unidades de quota hoje; nem um vídeo com uma página de comentários "
+            f"cabe (mínimo ~{_custo(1, 1)})."
+        )
+    plano.update(
+        {
+            "estimativa": _custo(videos, comentarios),
+            "n_videos": videos,
+            "max_comments": comentarios,
+            "degradado": True,
+        }
+    )
+    return plano
@@ -0,0 +1,503 @@
+"""
+Execução das análises do dashboard em segundo plano.
+
+O dashboard não coleta nem pontua na thread da sessão: ele submete os parâmetros
+a um ExecutorTarefas, que roda a análise completa (seleção de vídeos, coleta,
+VADER/BERT, agregados, log) num pool de processos e acompanha cada tarefa numa
+tabela SQLite persistente (estado, etapa atual e progresso).
+
+- Pedidos idênticos (mesmos parâmetros) enquanto um deles ainda está pendente
+  ou executando viram uma única tarefa, compartilhada entre as sessões.
+- Os modelos ficam carregados nos processos do pool e são reaproveitados de uma
+  tarefa para a outra (com BERT_AQUECER=1, já na criação de cada processo).
+- O resultado de cada tarefa concluída é gravado em TAREFAS_RESULTADOS/<id>.pkl
+  e pode ser reaberto pelo id (ex.: app com ?tarefa=<id>).
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Tabela de tarefas e pasta com o resultado de cada tarefa concluída
+TAREFAS_ARQUIVO = os.getenv("YT_TAREFAS", os.path.join("data", "tarefas.sqlite"))
+TAREFAS_RESULTADOS = os.getenv("YT_TAREFAS_RESULTADOS", os.path.join("data", "tarefas"))
+
+# Processos que executam análises ao mesmo tempo (cada um carrega seus modelos)
+TAREFAS_PROCESSOS = int(os.getenv("TAREFAS_PROCESSOS", 1))
+
+# Por quantos dias os resultados das tarefas ficam disponíveis pelo id
+TAREFAS_RETENCAO_DIAS = float(os.getenv("TAREFAS_RETENCAO_DIAS", 7))
+
+# Intervalo mínimo entre duas gravações de progresso de uma mesma tarefa
+INTERVALO_PROGRESSO = float(os.getenv("TAREFAS_INTERVALO_PROGRESSO", 0.5))
+
+# Batimento: cada executor marca periodicamente as tarefas ativas que acompanha;
+# tarefas ativas sem batimento há mais de TOLERANCIA_BATIMENTO segundos ficaram
+# órfãs (o servidor que as executava parou) e são interrompidas
+INTERVALO_BATIMENTO = float(os.getenv("TAREFAS_INTERVALO_BATIMENTO", 10))
+TOLERANCIA_BATIMENTO = float(os.getenv("TAREFAS_TOLERANCIA_BATIMENTO", 60))
+
+ESTADOS_ATIVOS = ("pendente", "executando")
+
+
+def chave_tarefa(parametros: Dict) -> str:
+    """Pedidos com os mesmos parâmetros têm a mesma chave (e podem ser unidos)."""
+    texto = json.dumps(parametros, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+#   TABELA DE TAREFAS (SQLite)
+# ============================================================
+class TabelaTarefas:
+    """
+    Estado de cada tarefa, compartilhado entre o dashboard e os processos do pool.
+    Cada processo abre a própria conexão; o SQLite em WAL deixa as sessões lerem o
+    progresso enquanto os workers escrevem.
+    """
+
+    def __init__(self, caminho: str = TAREFAS_ARQUIVO):
+        self.caminho = caminho
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id TEXT PRIMARY KEY,
+                    chave TEXT NOT NULL,
+                    parametros TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    etapa TEXT,
+                    progresso TEXT,
+                    erro TEXT,
+                    arquivo TEXT,
+                    criada_em REAL NOT NULL,
+                    iniciada_em REAL,
+                    concluida_em REAL,
+                    executor TEXT,
+                    batimento REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tarefas_chave ON tarefas (chave, estado);
+                """
+            )
+            # Tabelas criadas antes do batimento dos executores
+            colunas = {c[1] for c in conn.execute("PRAGMA table_info(tarefas)")}
+            for coluna, tipo in (("executor", "TEXT"), ("batimento", "REAL")):
+                if coluna not in colunas:
+                    conn.execute(f"ALTER TABLE tarefas ADD COLUMN {coluna} {tipo}")
+            self._conn = conn
+        return self._conn
+
+    def _executar(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conexao().execute(sql, params)
+
+    def criar_ou_juntar(self, parametros: Dict, executor: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Devolve (id, nova). Se já houver tarefa ativa com os mesmos parâmetros,
+        devolve o id dela com nova=False; senão cria uma tarefa pendente,
+        acompanhada pelo 'executor' informado.
+        """
+        chave = chave_tarefa(parametros)
+        with self._lock:
+            conn = self._conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                linha = conn.execute(
+                    "SELECT id FROM tarefas WHERE chave = ? AND estado IN (?, ?) ORDER BY criada_em LIMIT 1",
+                    (chave, *ESTADOS_ATIVOS),
+                ).fetchone()
+                if linha is not None:
+                    conn.execute("COMMIT")
+                    return linha[0], False
+                tarefa_id = uuid.uuid4().hex[:12]
+                agora = time.time()
+                conn.execute(
+                    "INSERT INTO tarefas (id, chave, parametros, estado, criada_em, executor, batimento) "
+                    "VALUES (?, ?, ?, 'pendente', ?, ?, ?)",
+                    (tarefa_id, chave, json.dumps(parametros, ensure_ascii=False), agora, executor, agora),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return tarefa_id, True
+
+    def iniciar(self, tarefa_id: str) -> None:
+        self._executar(
+            "UPDATE tarefas SET estado = 'executando', iniciada_em = ? WHERE id = ?", (time.time(), tarefa_id)
+        )
+
+    def atualizar(self, tarefa_id: str, etapa: str, progresso: Dict) -> None:
+        self._executar(
+            "UPDATE tarefas SET etapa = ?, progresso = ? WHERE id = ?",
+            (etapa, json.dumps(progresso, ensure_ascii=False, default=str), tarefa_id),
+        )
+
+    def concluir(self, tarefa_id: str, arquivo: str) -> None:
+        self._executar(
+            "UPDATE tarefas SET estado = 'concluida', etapa = NULL, arquivo = ?, concluida_em = ? WHERE id = ?",
+            (arquivo, time.time(), tarefa_id),
+        )
+
+    def falhar(self, tarefa_id: str, erro: str) -> None:
+        self._executar(
+            "UPDATE tarefas SET estado = 'erro', erro = ?, concluida_em = ? WHERE id = ? AND estado IN (?, ?)",
+            (erro, time.time(), tarefa_id, *ESTADOS_ATIVOS),
+        )
+
+    def cancelar(self, tarefa_id: str) -> None:
+        self._executar(
+            "UPDATE tarefas SET estado = 'cancelada', concluida_em = ? WHERE id = ? AND estado IN (?, ?)",
+            (time.time(), tarefa_id, *ESTADOS_ATIVOS),
+        )
+
+    def bater(self, executor: str) -> int:
+        """Renova o batimento das tarefas ativas acompanhadas por 'executor'."""
+        with self._lock:
+            cursor = self._conexao().execute(
+                "UPDATE tarefas SET batimento = ? WHERE executor = ? AND estado IN (?, ?)",
+                (time.time(), executor, *ESTADOS_ATIVOS),
+            )
+            return cursor.rowcount
+
+    def interromper_orfas(self, tolerancia: float = TOLERANCIA_BATIMENTO) -> int:
+        """
+        Marca como erro as tarefas ativas sem batimento há mais de 'tolerancia'
+        segundos (o executor que as acompanhava parou, ex.: servidor reiniciado).
+        Tarefas de executores vivos, neste ou em outro processo, não são tocadas.
+        """
+        with self._lock:
+            cursor = self._conexao().execute(
+                "UPDATE tarefas SET estado = 'erro', erro = 'interrompida: o servidor que a executava parou', "
+                "concluida_em = ? WHERE estado IN (?, ?) AND COALESCE(batimento, criada_em) < ?",
+                (time.time(), *ESTADOS_ATIVOS, time.time() - tolerancia),
+            )
+            return cursor.rowcount
+
+    def obter(self, tarefa_id: str) -> Optional[Dict]:
+        with self._lock:
+            conn = self._conexao()
+            cursor = conn.execute("SELECT * FROM tarefas WHERE id = ?", (tarefa_id,))
+            linha = cursor.fetchone()
+            colunas = [c[0] for c in cursor.description]
+        if linha is None:
+            return None
+        tarefa = dict(zip(colunas, linha))
+        tarefa["parametros"] = json.loads(tarefa["parametros"])
+        tarefa["progresso"] = json.loads(tarefa["progresso"]) if tarefa["progresso"] else {}
+        return tarefa
+
+    def recentes(self, limite: int = 20) -> pd.DataFrame:
+        with self._lock:
+            linhas = self._conexao().execute(
+                "SELECT id, estado, etapa, parametros, criada_em, concluida_em, erro "
+                "FROM tarefas ORDER BY criada_em DESC LIMIT ?",
+                (limite,),
+            ).fetchall()
+        df = pd.DataFrame(linhas, columns=["id", "estado", "etapa", "parametros", "criada_em", "concluida_em", "erro"])
+        for coluna in ("criada_em", "concluida_em"):
+            df[coluna] = pd.to_datetime(df[coluna], unit="s")
+        return df
+
+    def remover_antigas(self, dias: float = TAREFAS_RETENCAO_DIAS) -> int:
+        """Apaga tarefas encerradas há mais de 'dias' dias, com os arquivos de resultado."""
+        limite = time.time() - dias * 86400
+        with self._lock:
+            conn = self._conexao()
+            antigas = conn.execute(
+                "SELECT id, arquivo FROM tarefas WHERE concluida_em IS NOT NULL AND concluida_em < ?", (limite,)
+            ).fetchall()
+            for tarefa_id, arquivo in antigas:
+                if arquivo and os.path.exists(arquivo):
+                    os.remove(arquivo)
+                conn.execute("DELETE FROM tarefas WHERE id = ?", (tarefa_id,))
+        return len(antigas)
+
+
+def carregar_resultado(tarefa: Dict) -> Optional[Dict]:
+    """Resultado gravado de uma tarefa concluída (None se o arquivo já foi removido)."""
+    arquivo = tarefa.get("arquivo")
+    if tarefa.get("estado") != "concluida" or not arquivo or not os.path.exists(arquivo):
+        return None
+    with open(arquivo, "rb") as f:
+        return pickle.load(f)
+
+
+# ============================================================
+#   ANÁLISE COMPLETA (roda num processo do pool)
+# ============================================================
+def selecionar_videos(parametros: Dict, instrumentacao) -> Tuple[Optional[str], List[Dict], Dict]:
+    """
+    Decide se analisa um único vídeo ou múltiplos vídeos do canal.
+    Antes de listar, encaixa a execução no saldo de quota do dia (pode reduzir
+    vídeos e comentários por vídeo, ou recusar).
+    Retorna (channel_id, lista_de_videos, plano_de_quota)
+    """
+    from coleta import (
+        extrair_channel_id,
+        extrair_video_id,
+        listar_videos_mais_comentados,
+        listar_videos_mais_vistos,
+        listar_videos_recentes,
+        planejar_quota,
+    )
+
+    link = parametros["link"]
+    max_comments = parametros["max_comments"]
+
+    # Modo "apenas este vídeo"
+    if parametros["modo"] == "video":
+        vid = extrair_video_id(link)
+        if not vid:
+            raise ValueError("Não consegui extrair o ID do vídeo. Verifique o link informado.")
+        with instrumentacao.etapa("canal"):
+            canal_id = extrair_channel_id(link)
+        plano = planejar_quota(canal_id, None, 1, max_comments)
+        return canal_id, [{"video_id": vid, "video_title": "Vídeo único", "video_published_at": None}], plano
+
+    # Modos que usam múltiplos vídeos do canal
+    listar = {
+        "recentes": listar_videos_recentes,
+        "vistos": listar_videos_mais_vistos,
+        "comentados": listar_videos_mais_comentados,
+    }[parametros["criterio"]]
+    with instrumentacao.etapa("canal"):
+        canal_id = extrair_channel_id(link)
+        plano = planejar_quota(canal_id, parametros["criterio"], parametros["max_videos"], max_comments)
+
+    with instrumentacao.etapa("videos") as medicao:
+        videos = listar(canal_id, max_videos=plano["n_videos"])
+        medicao.itens += len(videos)
+
+    return canal_id, videos, plano
+
+
+def analisar(parametros: Dict, ao_progredir: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """
+    Seleção de vídeos + coleta e pontuação em fluxo + agregados + log da execução.
+    'ao_progredir(etapa, progresso)' é chamado a cada lote pontuado.
+    Devolve o resultado exibido pelo dashboard.
+    """
+    from agregados import obter_agregados
+    from analise import IndicePalavras, idiomas_top5, registrar_execucao
+    from armazenamento import PARQUET_AVAILABLE, salvar_parquet
+    from coleta import COLUNAS_COMENTARIOS
+    from instrumentacao import Instrumentacao
+    from pipeline import TotaisSentimento, ordenar_por_videos, processar_em_fluxo
+
+    avisar = ao_progredir or (lambda etapa, progresso: None)
+    instrumentacao = Instrumentacao()
+
+    def _progresso(**extras) -> Dict:
+        return {"etapas": instrumentacao.tabela().to_dict("records"), **extras}
+
+    avisar("videos", _progresso())
+    canal_id, videos, plano = selecionar_videos(parametros, instrumentacao)
+    resultado: Dict = {
+        "canal_id": canal_id,
+        "videos": videos,
+        "plano": plano,
+        "roteado": parametros["roteado"],
+        "df": None,
+    }
+    if not videos:
+        return resultado
+
+    totais = TotaisSentimento()
+    indice_palavras = IndicePalavras()
+    lotes = []
+    estimativa = len(videos) * plano["max_comments"]
+    for lote in processar_em_fluxo(
+        videos,
+        max_comments_por_video=plano["max_comments"],
+        roteado=parametros["roteado"],
+        incremental=parametros.get("incremental", False),
+        instrumentacao=instrumentacao,
+    ):
+        lotes.append(lote)
+        totais.atualizar(lote)
+        with instrumentacao.etapa("indice_palavras", contar=()) as medicao:
+            indice_palavras.adicionar(lote)
+            medicao.itens += len(lote)
+        avisar(
+            "coleta e análise",
+            _progresso(
+                comentarios=totais.total,
+                estimativa=estimativa,
+                positivos_vader=totais.percentual("vader", "positivo"),
+                positivos_bert=totais.percentual("bert", "positivo"),
+            ),
+        )
+
+    if not lotes:
+        return resultado
+
+    df = ordenar_por_videos(pd.concat(lotes, ignore_index=True), videos)
+
+    avisar("agregados", _progresso(comentarios=totais.total, estimativa=estimativa))
+    with instrumentacao.etapa("agregados", contar=()) as medicao:
+        medicao.itens += obter_agregados().registrar(df, canal_id or "desconhecido")
+
+    instrumentacao.concluir()
+    registrar_execucao(
+        df,
+        arquivo_entrada=parametros["link"],
+        arquivo_saida="",
+        idiomas_top5=idiomas_top5(df),
+        metricas=instrumentacao.resumo_log(),
+    )
+    instrumentacao.exportar_prometheus(rotulos={"origem": "dashboard"})
+
+    # Histórico em Parquet particionado por canal/data: comentários coletados e linhas pontuadas
+    if PARQUET_AVAILABLE and os.getenv("YT_SALVAR_PARQUET", "1") == "1":
+        salvar_parquet(df[COLUNAS_COMENTARIOS], canal_id or "desconhecido", tipo="comentarios")
+        salvar_parquet(df, canal_id or "desconhecido", tipo="analises")
+
+    resultado.update(
+        {
+            "df": df,
+            "indice_palavras": indice_palavras,
+            "totais": totais,
+            "diagnostico": {
+                "etapas": instrumentacao.tabela(),
+                "totais": instrumentacao.totais(),
+                "prometheus": instrumentacao.prometheus(rotulos={"origem": "dashboard"}),
+            },
+        }
+    )
+    return resultado
+
+
+def _iniciar_processo() -> None:
+    """Com BERT_AQUECER=1, cada processo do pool já nasce com os modelos carregados."""
+    if os.getenv("BERT_AQUECER", "0") == "1":
+        from analise import aquecer_modelos
+
+        aquecer_modelos()
+
+
+def executar_tarefa(tarefa_id: str, parametros: Dict, caminho_tabela: str, pasta_resultados: str) -> None:
+    """Ponto de entrada no processo do pool: roda a análise e registra cada passo na tabela."""
+    tabela = TabelaTarefas(caminho_tabela)
+    tabela.iniciar(tarefa_id)
+    ultima = {"etapa": None, "momento": 0.0}
+
+    def _ao_progredir(etapa: str, progresso: Dict) -> None:
+        # Troca de etapa é gravada sempre; dentro da etapa, no máximo a cada INTERVALO_PROGRESSO
+        agora = time.monotonic()
+        if etapa != ultima["etapa"] or agora - ultima["momento"] >= INTERVALO_PROGRESSO:
+            ultima.update(etapa=etapa, momento=agora)
+            tabela.atualizar(tarefa_id, etapa, progresso)
+
+    try:
+        resultado = analisar(parametros, _ao_progredir)
+        os.makedirs(pasta_resultados, exist_ok=True)
+        arquivo = os.path.join(pasta_resultados, f"{tarefa_id}.pkl")
+        # Grava em arquivo temporário e renomeia: o resultado nunca fica pela metade
+        with open(arquivo + ".tmp", "wb") as f:
+            pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(arquivo + ".tmp", arquivo)
+        tabela.concluir(tarefa_id, arquivo)
+    except Exception as e:
+        tabela.falhar(tarefa_id, f"{type(e).__name__}: {e}")
+
+
+# ============================================================
+#   EXECUTOR (no processo do dashboard)
+# ============================================================
+class ExecutorTarefas:
+    """
+    Pool de processos (spawn) + tabela de tarefas. Uma instância por servidor
+    (no app, via st.cache_resource), compartilhada por todas as sessões.
+    Uma thread renova o batimento das tarefas desta instância; ao ser criada,
+    a instância interrompe só as tarefas órfãs (sem batimento recente).
+
+        executor = ExecutorTarefas()
+        tarefa_id = executor.submeter({"link": ..., "modo": "canal", ...})
+        executor.tabela.obter(tarefa_id)["estado"]
+    """
+
+    def __init__(
+        self,
+        caminho: str = TAREFAS_ARQUIVO,
+        pasta_resultados: str = TAREFAS_RESULTADOS,
+        processos: int = TAREFAS_PROCESSOS,
+    ):
+        self.tabela = TabelaTarefas(caminho)
+        self.pasta_resultados = pasta_resultados
+        self.processos = max(1, processos)
+        self.id = uuid.uuid4().hex
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self.tabela.interromper_orfas()
+        self.tabela.remover_antigas()
+        threading.Thread(target=self._bater, daemon=True).start()
+
+    def _bater(self) -> None:
+        while not self._parar.wait(INTERVALO_BATIMENTO):
+            try:
+                self.tabela.bater(self.id)
+            except sqlite3.Error:
+                pass  # banco ocupado: tenta no próximo batimento
+
+    def _obter_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_processo,
+            )
+        return self._pool
+
+    def submeter(self, parametros: Dict) -> str:
+        """Cria a tarefa (ou junta-se a uma idêntica em andamento) e devolve o id."""
+        tarefa_id, nova = self.tabela.criar_ou_juntar(parametros, executor=self.id)
+        if not nova:
+            return tarefa_id
+        args = (executar_tarefa, tarefa_id, parametros, self.tabela.caminho, self.pasta_resultados)
+        with self._lock:
+            try:
+                futuro = self._obter_pool().submit(*args)
+            except BrokenProcessPool:
+                # Um processo morreu (ex.: falta de memória): recria o pool
+                self._pool = None
+                futuro = self._obter_pool().submit(*args)
+        futuro.add_done_callback(lambda f: self._ao_terminar(tarefa_id, f))
+        return tarefa_id
+
+    def _ao_terminar(self, tarefa_id: str, futuro: Future) -> None:
+        if futuro.cancelled():
+            # Cancelada por encerrar() antes de começar
+            self.tabela.cancelar(tarefa_id)
+            return
+        # executar_tarefa registra os próprios erros; aqui só chega o que derrubou o processo
+        erro = futuro.exception()
+        if erro is not None:
+            self.tabela.falhar(tarefa_id, f"{type(erro).__name__}: {erro}")
+
+    def encerrar(self) -> None:
+        self._parar.set()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from agregados import AgregadosSentimento, importar_parquet
+from armazenamento import salvar_parquet
+
+
+def _analisado(roteado: bool) -> pd.DataFrame:
+    df = pd.DataFrame(
+        {
+            "video_id": "v1",
+            "author": ["a", "b", "c", "d"],
+            "comment": ["ótimo", "ruim", "bom", "péssimo"],
+            "published_at": "2026-01-10T12:00:00Z",
+            "vader_label": ["positivo", "negativo", "positivo", "negativo"],
+            "vader_compound": [0.8, -0.7, 0.6, -0.9],
+        }
+    )
+    if roteado:
+        df["modelo_label"] = ["bert", "bert", "vader", "vader"]
+        # Análises antigas repetiam o rótulo do VADER em bert_label nas linhas não roteadas
+        df["bert_label"] = ["neutro", "negativo", "positivo", "negativo"]
+        df["bert_estrelas"] = [3.0, 1.0, None, None]
+    return df
+
+
+def test_rollup_do_bert_conta_so_linhas_roteadas_ao_bert(tmp_path):
+    agregados = AgregadosSentimento(str(tmp_path / "agregados.sqlite"))
+    assert agregados.registrar(_analisado(roteado=True), "UC1") == 4
+
+    por_modelo = agregados.consultar("UC1", por=("modelo", "rotulo"))
+    contagem = {(m, r): c for m, r, c in por_modelo[["modelo", "rotulo", "comentarios"]].itertuples(index=False)}
+    assert contagem == {
+        ("vader", "positivo"): 2,
+        ("vader", "negativo"): 2,
+        ("bert", "neutro"): 1,
+        ("bert", "negativo"): 1,
+    }
+
+
+def test_importar_parquet_sem_colunas_do_bert(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    salvar_parquet(_analisado(roteado=False), "UC1", tipo="analises")
+    agregados = AgregadosSentimento(str(tmp_path / "agregados.sqlite"))
+
+    assert importar_parquet(agregados) == 4
+    assert set(agregados.consultar("UC1", por=("modelo",))["modelo"]) == {"vader"}
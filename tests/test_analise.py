@@ -0,0 +1,140 @@
+import glob
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import analise
+from analise import aplicar_sentimento_roteado, limpar_texto, limpar_textos, preprocessar_textos, registrar_execucao
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _comentarios() -> pd.DataFrame:
+    textos = [
+        "I love this video, amazing work!",
+        "This is the worst thing I have ever seen.",
+        "ok",
+        "Adorei o vídeo, muito bom mesmo!",
+        "Que vídeo horrível, não gostei nada.",
+        "Me gusta mucho este canal",
+    ]
+    return pd.DataFrame({"video_id": "v", "author": "a", "comment": textos, "like_count": 0, "published_at": ""})
+
+
+def test_roteado_sem_transformers_fica_com_o_vader(monkeypatch, tmp_path):
+    monkeypatch.setattr(analise, "BERT_AVAILABLE", False)
+    df = aplicar_sentimento_roteado(preprocessar_textos(_comentarios()), usar_cache=False)
+
+    assert (df["modelo_label"] == "vader").all()
+    assert (df["bert_label"] == "").all()
+    assert (analise.rotulo_final(df) == df["vader_label"]).all()
+    assert df.attrs["roteamento"]["bert"] == 0
+
+    linha = registrar_execucao(df, "entrada", "", caminho=str(tmp_path / "analises.csv"))
+    assert linha["modelo_utilizado"] == "vaderSentiment"
+    esperado = round((df["vader_label"] == "positivo").mean() * 100, 3)
+    assert linha["pct_positivo"] == esperado
+
+
+def test_roteado_com_indice_repetido(monkeypatch, tmp_path):
+    def bert_falso(df, usar_cache=None):
+        df["bert_label_raw"] = "5 stars"
+        df["bert_estrelas"] = 5.0
+        df["bert_label"] = [f"bert-{c}" for c in df["comment"]]
+        return df
+
+    monkeypatch.setattr(analise, "BERT_AVAILABLE", True)
+    monkeypatch.setattr(analise, "aplicar_bert", bert_falso)
+    entrada = preprocessar_textos(_comentarios())
+    entrada.index = [0, 0, 1, 1, 2, 2]
+    df = aplicar_sentimento_roteado(entrada, usar_cache=False)
+
+    do_bert = df["modelo_label"] == "bert"
+    assert do_bert.any() and not do_bert.all()
+    assert (df.loc[do_bert, "bert_label"] == "bert-" + df.loc[do_bert, "comment"]).all()
+    assert (df.loc[~do_bert, "bert_label"] == "").all()
+
+    linha = registrar_execucao(df, "entrada", "", caminho=str(tmp_path / "analises.csv"))
+    assert linha["modelo_utilizado"].startswith("vaderSentiment + ")
+
+
+def test_registro_sem_bert_usa_o_vader(monkeypatch, tmp_path):
+    monkeypatch.setattr(analise, "BERT_AVAILABLE", False)
+    df = analise.aplicar_bert(analise.aplicar_vader(preprocessar_textos(_comentarios()), usar_cache=False))
+    linha = registrar_execucao(df, "entrada", "", caminho=str(tmp_path / "analises.csv"))
+    assert linha["modelo_utilizado"] == "vaderSentiment"
+
+
+def test_classificador_separado_por_max_length(monkeypatch):
+    carregados = []
+
+    def carregar(modelo, backend):
+        carregados.append((modelo, backend))
+        return SimpleNamespace(model=object())
+
+    monkeypatch.setattr(analise, "_MODELOS", {})
+    monkeypatch.setattr(analise, "_carregar_pipeline", carregar)
+    monkeypatch.setattr(
+        analise, "_com_truncagem", lambda clf, max_length: SimpleNamespace(model=clf.model, max_length=max_length)
+    )
+
+    curto = analise.obter_classificador("m", backend="pytorch", max_length=128)
+    longo = analise.obter_classificador("m", backend="pytorch", max_length=512)
+
+    assert curto.max_length == 128 and longo.max_length == 512
+    assert curto.model is longo.model  # mesmos pesos
+    assert carregados == [("m", "pytorch")]
+    assert analise.obter_classificador("m", backend="pytorch", max_length=128) is curto
+
+
+def test_cache_de_scores_separado_por_max_length():
+    assert analise._id_modelo_cache("m", "pytorch", 512) == "m"
+    assert analise._id_modelo_cache("m", "pytorch", 128) != analise._id_modelo_cache("m", "pytorch", 512)
+
+
+def _comentarios_gravados() -> pd.Series:
+    """Comentários reais do repositório, mais casos de borda da limpeza."""
+    partes = []
+    for padrao, coluna in (
+        ("comentarios_sentimentos_pt.csv", "comentario"),
+        (os.path.join("data", "*.csv"), "comentario"),
+        (os.path.join("resultados", "*.csv"), "comment"),
+    ):
+        for caminho in sorted(glob.glob(os.path.join(RAIZ, padrao))):
+            df = pd.read_csv(caminho, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+            if coluna in df.columns:
+                partes.append(df[coluna])
+    bordas = [
+        "İstanbul ΣΑΣ ß ǅ ﬁ",
+        "link http://x.com/a\xa0depois www.site.com.br/p?q=1 fim",
+        "@user_é #tag2024 @Ünïcode ok",
+        "x\x1cy\u2028z\u3000w \t\n ",
+        "١٢٣ ٤ abc 10/10 !!!",
+        "kkkk 😂😂 ❤️",
+        "",
+        None,
+        42,
+    ]
+    return pd.concat(partes + [pd.Series(bordas, dtype=object)], ignore_index=True)
+
+
+def test_indice_palavras_sem_colunas_de_agrupamento():
+    indice = analise.IndicePalavras()
+    indice.adicionar(pd.DataFrame({"texto_limpo": ["bom video", "video ruim", None]}))
+
+    top = indice.top(3)
+    assert dict(zip(top.iloc[:, 0], top.iloc[:, 1])) == {"video": 2, "bom": 1, "ruim": 1}
+    assert indice.top(3, bert_label="negativo").empty
+
+
+@pytest.mark.parametrize("pyarrow", [True, False])
+def test_limpar_textos_identica_a_limpar_texto(monkeypatch, pyarrow):
+    monkeypatch.setattr(analise, "PYARROW_AVAILABLE", pyarrow)
+    serie = _comentarios_gravados()
+    esperado = serie.apply(limpar_texto).tolist()
+    obtido = limpar_textos(serie).tolist()
+    divergencias = [(serie[i], a, b) for i, (a, b) in enumerate(zip(esperado, obtido)) if a != b]
+    assert len(obtido) == len(esperado)
+    assert not divergencias, divergencias[:5]
@@ -0,0 +1,30 @@
+import io
+
+import pandas as pd
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from armazenamento import arquivo_csv, csv_em_partes
+
+
+def _df(n: int = 7) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "video_id": [f"v{i % 3}" for i in range(n)],
+            "comment": [f"comentário, com vírgula {i}" for i in range(n)],
+            "like_count": list(range(n)),
+        }
+    )
+
+
+def test_csv_em_partes_igual_ao_to_csv():
+    df = _df(7)
+    esperado = "\ufeff" + df.to_csv(index=False)
+    assert b"".join(csv_em_partes(df, linhas_por_parte=3)).decode("utf-8") == esperado
+
+
+def test_arquivo_csv_aceito_pelo_download_button():
+    df = _df(5)
+    # Mesma conversão que o st.download_button aplica ao retorno do callable
+    gerar = lambda: arquivo_csv(df)  # noqa: E731
+    dados, _ = convert_data_to_bytes_and_infer_mime(gerar(), RuntimeError("tipo não suportado"))
+    assert pd.read_csv(io.BytesIO(dados), encoding="utf-8-sig").equals(df)
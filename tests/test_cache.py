@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import CacheSQLite
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1_000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: agora[0]))
+    return agora
+
+
+def test_item_vencido_conta_como_miss_e_e_removido(tmp_path, relogio):
+    c = CacheSQLite(str(tmp_path / "c.sqlite"))
+    c.set("curto", 1, ttl=10)
+    c.set("sem_ttl", 2)
+
+    relogio[0] += 9
+    assert c.get("curto") == 1
+    relogio[0] += 2
+    assert c.get("curto") is None
+    assert c.get("sem_ttl") == 2
+    assert (c.hits, c.misses) == (2, 1)
+
+    c.set("outro", 3)  # a escrita despeja os vencidos
+    assert c.estatisticas()["itens"] == 2
+
+
+def test_despejo_lru_por_itens_preserva_os_acessados(tmp_path, relogio):
+    c = CacheSQLite(str(tmp_path / "c.sqlite"), max_itens=3)
+    for chave in ("a", "b", "c"):
+        relogio[0] += 1
+        c.set(chave, chave)
+    relogio[0] += 1
+    c.get("a")  # "b" passa a ser o menos recente
+
+    relogio[0] += 1
+    c.set("d", "d")
+    assert set(c.get_muitos(["a", "b", "c", "d"])) == {"a", "c", "d"}
+
+
+def test_despejo_lru_por_bytes(tmp_path, relogio):
+    valor = "x" * 100  # 102 bytes em JSON
+    c = CacheSQLite(str(tmp_path / "c.sqlite"), max_itens=None, max_bytes=250)
+    for chave in ("a", "b", "c"):
+        relogio[0] += 1
+        c.set(chave, valor)
+
+    assert set(c.get_muitos(["a", "b", "c"])) == {"b", "c"}
+    assert c.estatisticas()["bytes"] <= 250
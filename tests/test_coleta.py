@@ -0,0 +1,257 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+import coleta
+from coleta import (
+    ArmazemComentarios,
+    ClienteYouTube,
+    LimitadorTaxa,
+    coletar_comentarios_incremental,
+    sincronizar_comentarios_video,
+)
+from quota import LivroQuota, QuotaExcedida
+
+INICIO = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class _Resposta:
+    def __init__(self, status_code, dados):
+        self.status_code = status_code
+        self._dados = dados
+        self.text = str(dados)
+
+    def json(self):
+        return self._dados
+
+
+class ClienteFalso:
+    """commentThreads com order=time sobre uma lista de comentários, em páginas de 'por_pagina'."""
+
+    def __init__(self, por_pagina=3):
+        self.n = 0
+        self.por_pagina = por_pagina
+        self.chamadas = 0
+        self.tokens_invalidos = set()
+
+    def publicar(self, quantidade):
+        self.n += quantidade
+
+    def get(self, recurso, params, limitador=None):
+        self.chamadas += 1
+        token = params.get("pageToken")
+        if token in self.tokens_invalidos:
+            return _Resposta(400, {"error": "pageToken inválido"})
+        inicio = int(token or 0)
+        ordem = list(range(self.n - 1, -1, -1))  # mais recentes primeiro
+        pagina = ordem[inicio : inicio + self.por_pagina]
+        dados = {"items": [self._item(i) for i in pagina]}
+        if inicio + self.por_pagina < len(ordem):
+            dados["nextPageToken"] = str(inicio + self.por_pagina)
+        return _Resposta(200, dados)
+
+    @staticmethod
+    def _item(i):
+        momento = (INICIO + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        snippet = {"authorDisplayName": "a", "textDisplay": f"c{i}", "likeCount": 0, "publishedAt": momento}
+        return {"id": f"c{i}", "snippet": {"topLevelComment": {"id": f"c{i}", "snippet": snippet}}}
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    falso = ClienteFalso()
+    monkeypatch.setattr(coleta, "obter_cliente", lambda: falso)
+    return falso
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    return ArmazemComentarios(str(tmp_path / "comentarios.sqlite"))
+
+
+def _armazenados(armazem):
+    return set(armazem.carregar(["v"])["comment"])
+
+
+def test_sincronizacao_incremental_busca_so_os_novos(cliente, armazem):
+    cliente.publicar(5)
+    assert sincronizar_comentarios_video("v", armazem=armazem) == 5
+    cliente.publicar(2)
+    assert sincronizar_comentarios_video("v", armazem=armazem) == 2
+    assert _armazenados(armazem) == {f"c{i}" for i in range(7)}
+    assert armazem.marca("v")["comment_id"] == "c6"
+    assert armazem.marca("v")["cursor"] is None
+
+
+def test_corte_por_max_novos_nao_perde_comentarios(cliente, armazem):
+    cliente.publicar(4)
+    sincronizar_comentarios_video("v", armazem=armazem)
+
+    # 10 novos, mas só 4 por sincronização: a marca fica em c3 até a lacuna fechar
+    cliente.publicar(10)
+    assert sincronizar_comentarios_video("v", max_novos=4, armazem=armazem) == 4
+    assert armazem.marca("v")["comment_id"] == "c3"
+    assert armazem.marca("v")["cursor"] is not None
+
+    # Chegam mais 2 enquanto a lacuna está aberta
+    cliente.publicar(2)
+    while armazem.marca("v")["cursor"] is not None:
+        sincronizar_comentarios_video("v", max_novos=4, armazem=armazem)
+
+    assert _armazenados(armazem) == {f"c{i}" for i in range(16)}
+    assert armazem.marca("v")["comment_id"] == "c15"
+
+
+def test_cursor_invalido_recomeca_a_lacuna_do_inicio(cliente, armazem):
+    cliente.publicar(2)
+    sincronizar_comentarios_video("v", armazem=armazem)
+    cliente.publicar(9)
+    sincronizar_comentarios_video("v", max_novos=4, armazem=armazem)
+    cursor = armazem.marca("v")["cursor"]
+    assert cursor
+
+    cliente.tokens_invalidos.add(cursor)
+    sincronizar_comentarios_video("v", max_novos=4, armazem=armazem)
+    assert armazem.marca("v")["cursor"] == ""
+    cliente.tokens_invalidos.clear()
+    while armazem.marca("v")["cursor"] is not None:
+        sincronizar_comentarios_video("v", max_novos=4, armazem=armazem)
+    assert _armazenados(armazem) == {f"c{i}" for i in range(11)}
+
+
+def test_coleta_incremental_devolve_os_mais_recentes(cliente, armazem):
+    cliente.publicar(6)
+    linhas = coletar_comentarios_incremental("v", max_comments=3, armazem=armazem)
+    assert [l["comment"] for l in linhas] == ["c5", "c4", "c3"]
+    assert set(linhas[0]) == set(coleta.COLUNAS_COMENTARIOS)
+
+
+# ============================================================
+#   CLIENTE HTTP: novas tentativas e backoff
+# ============================================================
+class TransporteFalso(BaseAdapter):
+    """Devolve as respostas da fila, na ordem; uma exceção na fila é lançada no envio."""
+
+    def __init__(self, respostas):
+        super().__init__()
+        self.respostas = list(respostas)
+        self.enviadas = 0
+
+    def send(self, request, **kwargs):
+        self.enviadas += 1
+        item = self.respostas.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        status, corpo, cabecalhos = item
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(corpo).encode("utf-8")
+        resp.headers.update(cabecalhos)
+        resp.request, resp.url = request, request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def _erro_403(motivo):
+    return (403, {"error": {"errors": [{"reason": motivo}]}}, {})
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    registro = []
+    monkeypatch.setattr(coleta.time, "sleep", registro.append)
+    monkeypatch.setattr(coleta.random, "uniform", lambda a, b: b)  # jitter no teto
+    return registro
+
+
+def _cliente_http(tmp_path, respostas, orcamento=0, **opcoes):
+    transporte = TransporteFalso(respostas)
+    livro = LivroQuota(str(tmp_path / "quota.sqlite"), orcamento=orcamento)
+    cliente = ClienteYouTube(
+        api_key="k", limitador=LimitadorTaxa(0), transporte=transporte, livro=livro, **opcoes
+    )
+    return cliente, transporte, livro
+
+
+def test_429_respeita_retry_after_e_repete(tmp_path, esperas):
+    cliente, transporte, livro = _cliente_http(tmp_path, [(429, {}, {"Retry-After": "2"}), (200, {"items": []}, {})])
+    assert cliente.get("videos", {}).status_code == 200
+    assert esperas == [2.0]
+    assert livro.por_recurso()["videos"]["chamadas"] == 2
+
+
+def test_backoff_exponencial_limitado_e_ultima_resposta_devolvida(tmp_path, esperas):
+    respostas = [(503, {}, {})] * 4
+    cliente, transporte, _ = _cliente_http(tmp_path, respostas, max_tentativas=4, backoff_base=1, backoff_max=3)
+    assert cliente.get("videos", {}).status_code == 503
+    assert transporte.enviadas == 4
+    assert esperas == [1, 2, 3]
+
+
+def test_403_so_repete_limite_de_taxa(tmp_path, esperas):
+    cliente, transporte, _ = _cliente_http(tmp_path, [_erro_403("quotaExceeded")])
+    assert cliente.get("videos", {}).status_code == 403
+    assert transporte.enviadas == 1 and esperas == []
+
+    cliente, transporte, _ = _cliente_http(tmp_path, [_erro_403("rateLimitExceeded"), (200, {}, {})])
+    assert cliente.get("videos", {}).status_code == 200
+    assert transporte.enviadas == 2
+
+
+def test_falha_de_conexao_sobe_ao_esgotar_tentativas(tmp_path, esperas):
+    falhas = [requests.ConnectionError("recusada")] * 3
+    cliente, transporte, _ = _cliente_http(tmp_path, falhas, max_tentativas=3)
+    with pytest.raises(requests.ConnectionError):
+        cliente.get("videos", {})
+    assert transporte.enviadas == 3 and len(esperas) == 2
+
+
+def test_sem_saldo_de_quota_nao_envia(tmp_path, esperas):
+    cliente, transporte, _ = _cliente_http(tmp_path, [(200, {}, {})], orcamento=50)
+    with pytest.raises(QuotaExcedida):
+        cliente.get("search", {})
+    assert transporte.enviadas == 0
+
+
+# ============================================================
+#   TOP-N POR ESTATÍSTICA (varredura do catálogo)
+# ============================================================
+class ClienteEstatisticas:
+    """videos.list com viewCount/commentCount derivados do número do vídeo."""
+
+    def __init__(self):
+        self.lotes = []
+
+    def get(self, recurso, params, limitador=None):
+        ids = params["id"].split(",")
+        self.lotes.append(len(ids))
+        itens = [
+            {"id": vid, "statistics": {"viewCount": str((int(vid[1:]) * 37) % 101), "commentCount": vid[1:]}}
+            for vid in ids
+        ]
+        return _Resposta(200, {"items": itens})
+
+
+def test_top_n_por_estatistica_varre_o_catalogo_em_lotes(monkeypatch, tmp_path):
+    estatisticas = ClienteEstatisticas()
+    monkeypatch.setattr(coleta, "obter_cliente", lambda: estatisticas)
+    monkeypatch.setattr(coleta, "_cache_coleta", coleta.CacheSQLite(str(tmp_path / "coleta.sqlite")))
+    catalogo = [{"video_id": f"v{i}", "video_title": "", "video_published_at": ""} for i in range(120)]
+    monkeypatch.setattr(coleta, "iterar_uploads", lambda canal, limite=None: iter(catalogo))
+
+    top = coleta._mais_por_estatistica("UC1", "viewCount", 5)
+    esperado = sorted(range(120), key=lambda i: (i * 37) % 101, reverse=True)[:5]
+    assert [v["viewCount"] for v in top] == [(i * 37) % 101 for i in esperado]
+    assert estatisticas.lotes == [50, 50, 20]
+
+    # Mesma consulta vem do cache, sem nova varredura
+    assert coleta._mais_por_estatistica("UC1", "viewCount", 5) == top
+    assert estatisticas.lotes == [50, 50, 20]
+
+    comentados = coleta._mais_por_estatistica("UC1", "commentCount", 3)
+    assert [v["video_id"] for v in comentados] == ["v119", "v118", "v117"]
@@ -0,0 +1,49 @@
+import re
+
+from instrumentacao import Instrumentacao, registrar_chamada_api
+
+# Linha de amostra do formato texto do Prometheus: nome{rótulos} valor
+AMOSTRA = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)\{((?:[a-zA-Z_]\w*="(?:[^"\\]|\\.)*",?)*)\} (-?[0-9.e+]+)$')
+
+
+def _amostras(texto):
+    amostras = {}
+    for linha in texto.splitlines():
+        if linha.startswith("#"):
+            continue
+        casamento = AMOSTRA.match(linha)
+        assert casamento, f"linha fora do formato: {linha!r}"
+        nome, rotulos, valor = casamento.groups()
+        amostras[(nome, rotulos)] = float(valor)
+    return amostras
+
+
+def test_exportacao_prometheus(tmp_path):
+    inst = Instrumentacao()
+    with inst.etapa("coleta") as m:
+        registrar_chamada_api("commentThreads", 1)
+        m.itens += 40
+    with inst.etapa('lote "A"\\1', contar=()) as m:
+        m.itens += 3
+    inst.concluir()
+
+    caminho = inst.exportar_prometheus(str(tmp_path / "metricas" / "yt.prom"), rotulos={"origem": "teste"})
+    texto = open(caminho, encoding="utf-8").read()
+    amostras = _amostras(texto)
+
+    assert amostras[("yt_sentimento_etapa_itens", 'etapa="coleta",origem="teste"')] == 40
+    assert amostras[("yt_sentimento_etapa_chamadas_api", 'etapa="coleta",origem="teste"')] == 1
+    assert amostras[("yt_sentimento_etapa_itens", 'etapa="lote \\"A\\"\\\\1",origem="teste"')] == 3
+    assert amostras[("yt_sentimento_api_chamadas_total", 'recurso="commentThreads"')] >= 1
+    memoria = [v for (nome, _), v in amostras.items() if nome == "yt_sentimento_etapa_pico_memoria_bytes"]
+    assert all(v == int(v) for v in memoria)
+
+    # HELP e TYPE uma vez por métrica, antes das amostras
+    for nome in {n for n, _ in amostras}:
+        assert texto.count(f"# TYPE {nome} ") == 1
+        assert texto.index(f"# TYPE {nome} ") < texto.index(f"\n{nome}{{")
+    assert not list(tmp_path.glob("metricas/*.tmp"))
+
+
+def test_sem_arquivo_configurado_nao_exporta():
+    assert Instrumentacao().exportar_prometheus("") is None
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import quota
+from quota import LivroQuota, QuotaExcedida, ajustar_ao_saldo, dia_quota
+
+
+@pytest.mark.parametrize(
+    "momento_utc, dia",
+    [
+        (datetime(2026, 1, 10, 7, 59, tzinfo=timezone.utc), "2026-01-09"),  # 23:59 PST
+        (datetime(2026, 1, 10, 8, 0, tzinfo=timezone.utc), "2026-01-10"),
+        (datetime(2026, 7, 10, 6, 59, tzinfo=timezone.utc), "2026-07-09"),  # 23:59 PDT
+        (datetime(2026, 7, 10, 7, 0, tzinfo=timezone.utc), "2026-07-10"),
+    ],
+)
+def test_dia_da_quota_vira_a_meia_noite_do_pacifico(momento_utc, dia):
+    if isinstance(quota._FUSO_QUOTA, timezone) and momento_utc.month == 7:
+        pytest.skip("sem base de fusos: horário de verão não é aplicado")
+    assert dia_quota(momento_utc) == dia
+
+
+def test_livro_recomeca_o_saldo_no_dia_seguinte(tmp_path, monkeypatch):
+    dia = ["2026-01-09"]
+    monkeypatch.setattr(quota, "dia_quota", lambda momento=None: dia[0])
+    livro = LivroQuota(str(tmp_path / "quota.sqlite"), orcamento=150)
+
+    livro.reservar("search")
+    livro.reservar("videos", unidades=50)
+    assert livro.restante() == 0
+    with pytest.raises(QuotaExcedida):
+        livro.reservar("videos")
+
+    dia[0] = "2026-01-10"
+    assert livro.restante() == 150
+    livro.reservar("search")
+    assert livro.usado("2026-01-09") == 150
+    assert livro.por_recurso() == {"search": {"chamadas": 1, "unidades": 100}}
+
+
+def test_ajuste_dentro_do_saldo_nao_muda_nada():
+    plano = ajustar_ao_saldo(100, 10, 500, restante=150)
+    assert (plano["n_videos"], plano["max_comments"], plano["degradado"]) == (10, 500, False)
+    assert ajustar_ao_saldo(100, 10, 500, restante=None)["estimativa"] == 150
+
+
+def test_ajuste_degrada_comentarios_e_depois_videos():
+    # 100 do search + 10 vídeos x 5 páginas = 150; restam 130: 3 páginas por vídeo
+    plano = ajustar_ao_saldo(100, 10, 500, restante=130, politica="degradar")
+    assert (plano["n_videos"], plano["max_comments"], plano["estimativa"]) == (10, 300, 130)
+    assert plano["degradado"]
+
+    # Restam 105: nem uma página por vídeo; fica uma página em 5 vídeos
+    plano = ajustar_ao_saldo(100, 10, 500, restante=105, politica="degradar")
+    assert (plano["n_videos"], plano["max_comments"], plano["estimativa"]) == (5, 100, 105)
+
+    with pytest.raises(QuotaExcedida):
+        ajustar_ao_saldo(100, 10, 500, restante=100, politica="degradar")
+
+
+def test_ajuste_com_politica_recusar():
+    with pytest.raises(QuotaExcedida):
+        ajustar_ao_saldo(100, 10, 500, restante=149, politica="recusar")
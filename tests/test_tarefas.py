@@ -0,0 +1,53 @@
+from concurrent.futures import Future
+
+import pytest
+
+from tarefas import ExecutorTarefas
+
+PARAMETROS = {"link": "https://youtu.be/abc", "modo": "video", "max_comments": 20}
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = ExecutorTarefas(str(tmp_path / "tarefas.sqlite"), str(tmp_path / "resultados"))
+    yield executor
+    executor.encerrar()
+
+
+def test_novo_executor_nao_interrompe_tarefas_de_executor_vivo(executor, tmp_path):
+    tarefa_id, _ = executor.tabela.criar_ou_juntar(PARAMETROS, executor=executor.id)
+
+    # Outro servidor (ou o cache_resource recriado) abrindo a mesma tabela
+    outro = ExecutorTarefas(executor.tabela.caminho, str(tmp_path / "resultados"))
+    try:
+        assert outro.tabela.obter(tarefa_id)["estado"] == "pendente"
+    finally:
+        outro.encerrar()
+
+
+def test_tarefa_sem_batimento_e_interrompida(executor):
+    tarefa_id, _ = executor.tabela.criar_ou_juntar(PARAMETROS, executor="executor-que-parou")
+    executor.tabela._executar("UPDATE tarefas SET batimento = batimento - 3600 WHERE id = ?", (tarefa_id,))
+
+    assert executor.tabela.bater(executor.id) == 0
+    assert executor.tabela.interromper_orfas(tolerancia=60) == 1
+    tarefa = executor.tabela.obter(tarefa_id)
+    assert tarefa["estado"] == "erro"
+    assert "interrompida" in tarefa["erro"]
+
+
+def test_batimento_mantem_a_tarefa_viva(executor):
+    tarefa_id, _ = executor.tabela.criar_ou_juntar(PARAMETROS, executor=executor.id)
+    executor.tabela._executar("UPDATE tarefas SET batimento = batimento - 3600 WHERE id = ?", (tarefa_id,))
+
+    assert executor.tabela.bater(executor.id) == 1
+    assert executor.tabela.interromper_orfas(tolerancia=60) == 0
+
+
+def test_futuro_cancelado_marca_tarefa_como_cancelada(executor):
+    tarefa_id, _ = executor.tabela.criar_ou_juntar(PARAMETROS, executor=executor.id)
+    futuro = Future()
+    futuro.cancel()
+
+    executor._ao_terminar(tarefa_id, futuro)
+    assert executor.tabela.obter(tarefa_id)["estado"] == "cancelada"